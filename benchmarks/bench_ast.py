@@ -0,0 +1,92 @@
+""" Benchmark the memory held by the abstract syntax tree of a large program.
+
+Compares the same statements in three layouts:
+    dict:        the former AST classes, plain dataclasses with a __dict__ per instance.
+    dict + meta: the same, with a Lark Meta per statement, as keeping positions
+        through propagate_positions would.
+    slots:       the current slotted AST classes, whose positions are created on access.
+
+Only the statement objects are measured. Their field values are shared by all
+three layouts.
+
+    python benchmarks/bench_ast.py --hosts 1000 --links 100000
+"""
+import argparse
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from lark.tree import Meta
+from midori.parser import Parser
+
+def make_program (hosts: int, links: int) -> str:
+    """ Hosts on a switch each, with links spread over the switches. """
+    lines = [ 'remote_controller c0 host "onos" port 6633' ]
+    lines.append ("switch " + " ".join ([ f"s{i}" for i in range(hosts) ]))
+    for i in range(hosts):
+        lines.append (f'host h{i} ip "10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256 + 1}" ' +
+                      f'image "ubuntu:trusty" mac "02:00:00:{i // 65536 % 256:02x}:{i // 256 % 256:02x}:{i % 256:02x}"')
+        lines.append (f"link h{i}s{i} src h{i} dst s{i}")
+    for i in range(links - hosts):
+        lines.append (f"link l{i} src s{i % hosts} dst s{(i * 7 + 1) % hosts} delay \"1ms\" bw 100")
+    lines.append ("up")
+    lines.append ("down")
+    return "\n".join (lines) + "\n"
+
+legacy_classes = {}
+
+def get_legacy_class (cls: type) -> type:
+    """ A dataclass with the same fields as an AST class, and no slots. """
+    if cls not in legacy_classes:
+        legacy_classes[cls] = make_dataclass (cls.__name__, [ (f.name, f.type) for f in fields (cls) ])
+    return legacy_classes[cls]
+
+def build_dict (rows: list) -> list:
+    return [ get_legacy_class (cls)(*values) for cls, values, position in rows ]
+
+def build_dict_meta (rows: list) -> list:
+    statements = []
+    for cls, values, position in rows:
+        statement = get_legacy_class (cls)(*values)
+        statement.meta = meta = Meta ()
+        meta.line, meta.column = position
+        meta.end_line, meta.end_column = position
+        meta.start_pos = meta.end_pos = 0
+        meta.empty = False
+        statements.append (statement)
+    return statements
+
+def build_slots (rows: list) -> list:
+    statements = []
+    for cls, values, position in rows:
+        statement = cls(*values)
+        statement._line, statement._column = position
+        statements.append (statement)
+    return statements
+
+def measure (build, rows: list) -> int:
+    """ Return the bytes held by the statements built. """
+    tracemalloc.start ()
+    statements = build (rows)
+    held, peak = tracemalloc.get_traced_memory ()
+    tracemalloc.stop ()
+    return held
+
+def main () -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark AST memory')
+    arg_parser.add_argument('--hosts', help="Hosts in the program", type=int, default=1000)
+    arg_parser.add_argument('--links', help="Links in the program", type=int, default=100000)
+    args = arg_parser.parse_args ()
+
+    source = make_program (args.hosts, max(args.links, args.hosts))
+    start = time.perf_counter ()
+    ast = Parser().parse (source)
+    print (f"parsed {len(ast.statements)} statements in {time.perf_counter () - start:.2f}s")
+    rows = [ (type(s), [ getattr(s, f.name) for f in fields (s) ], tuple(s.meta)) for s in ast.statements ]
+    for cls, values, position in rows:
+        get_legacy_class (cls)
+    for name, build in [ ("dict", build_dict), ("dict + meta", build_dict_meta), ("slots", build_slots) ]:
+        held = measure (build, rows)
+        print (f"{name:>11}: {held / 1024 / 1024:6.1f} MiB, {held / len(rows):5.0f} bytes/statement")
+
+if __name__ == '__main__':
+    main ()
@@ -0,0 +1,149 @@
+""" Benchmark writing and deleting a large topology in the graph database.
+
+Compares the former single CREATE query built by redis-py's Graph.commit to the
+batched, parameterized queries MidoriGraph.commit sends.
+
+Also compares rewriting the whole topology to MidoriGraph.sync, which writes only
+what changed since the previous simulation.
+
+Without --live, queries are built but not sent, reporting their number and the
+size of the largest one, or for sync, their total size. With --live, the topology is written to and deleted from
+the configured RedisGraph instance, reporting throughput.
+
+    python benchmarks/bench_graph.py --nodes 10000
+    python benchmarks/bench_graph.py --nodes 10000 --changes 100
+    python benchmarks/bench_graph.py --nodes 10000 --live --batch-sizes 100 1000 5000
+"""
+import argparse
+import time
+from redis.commands.graph import Graph
+from redis.commands.graph.edge import Edge
+from midori.graph import MidoriGraph, get_topology_graph
+from midori.topology import Topology
+
+class OfflinePipeline:
+    """ Collects pipelined commands instead of sending them. """
+    def __init__(self, sink: list) -> None:
+        self.sink = sink
+    def execute_command(self, *args) -> None:
+        self.sink.append(args[2])
+    def execute(self, raise_on_error: bool = True) -> list:
+        return [ [] for command in self.sink ]
+
+class OfflineClient:
+    def __init__(self) -> None:
+        self.queries = []
+    def pipeline(self, transaction: bool = True) -> OfflinePipeline:
+        return OfflinePipeline(self.queries)
+
+def build_topology (graph: MidoriGraph, nodes: int) -> None:
+    """ Add hosts, each linked to one of a chain of switches. """
+    switches = [ graph.add_switch (f"s{i}") for i in range(max(1, nodes // 10)) ]
+    for a, b in zip(switches, switches[1:]):
+        graph.add_edge (a, "linked_to", b, { "delay" : "1ms", "bw" : 100 })
+    for i in range(nodes - len(switches)):
+        host = graph.add_host (f"h{i}", {
+            "ip" : f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "mac" : f"02:00:00:{i // 65536 % 256:02x}:{i // 256 % 256:02x}:{i % 256:02x}",
+            "image" : "ubuntu:trusty", "cmd" : [] })
+        graph.add_edge (host, "linked_to", switches[i % len(switches)], { "port1" : 1, "port2" : i })
+
+def build_topology_model (nodes: int, changes: int = 0) -> Topology:
+    """ The same network as build_topology, with the first hosts readdressed. """
+    graph = MidoriGraph (pipeline=True)
+    build_topology (graph, nodes)
+    topology = Topology ()
+    for node in graph.nodes:
+        if "Host" in node.labels:
+            topology.add_host (node.alias, node.properties)
+        else:
+            topology.add_switch (node.alias)
+    for edge in graph.edges:
+        topology.add_link (edge.src_node.alias, edge.dest_node.alias, edge.properties)
+    for name in list(topology.hosts)[:changes]:
+        topology.add_host (name, { **topology.hosts[name], "ip" : "10.255.255.255" })
+    return topology
+
+def legacy_query (graph: MidoriGraph) -> str:
+    """ The single query redis-py's Graph.commit would have sent. """
+    query = "CREATE " + ",".join([ str(node) for node in graph.nodes ])
+    edges = []
+    for edge in graph.edges:
+        edges.append (str(Edge (edge.src_node, edge.relation, edge.dest_node, properties=edge.properties)))
+    return query + "," + ",".join(edges)
+
+def offline (nodes: int, batch_sizes: list) -> None:
+    graph = MidoriGraph (batch_size=batch_sizes[0], pipeline=True)
+    build_topology (graph, nodes)
+    start = time.perf_counter ()
+    query = legacy_query (graph)
+    print (f"legacy:       1 query, largest {len(query) / 1024:.0f} KiB, built in {time.perf_counter () - start:.3f}s")
+    for batch_size in batch_sizes:
+        graph = MidoriGraph (batch_size=batch_size, pipeline=True)
+        graph.client = OfflineClient ()
+        build_topology (graph, nodes)
+        start = time.perf_counter ()
+        graph.commit ()
+        elapsed = time.perf_counter () - start
+        largest = max(len(q) for q in graph.client.queries)
+        print (f"batch {batch_size:>6}: {len(graph.client.queries)} queries, " +
+               f"largest {largest / 1024:.0f} KiB, built in {elapsed:.3f}s")
+
+def offline_sync (nodes: int, changes: int, batch_size: int) -> None:
+    """ Compare the bytes sent to rewrite a changed topology to those sent to sync it. """
+    previous = get_topology_graph (build_topology_model (nodes))
+    topology = build_topology_model (nodes, changes)
+    graph = MidoriGraph (batch_size=batch_size, pipeline=True)
+    graph.client = OfflineClient ()
+    build_topology (graph, nodes)
+    graph.commit ()
+    rewrite = sum(len(q) for q in graph.client.queries)
+    graph = MidoriGraph (batch_size=batch_size, pipeline=True)
+    graph.client = OfflineClient ()
+    graph.read = lambda: previous
+    start = time.perf_counter ()
+    diff = graph.sync (topology)
+    elapsed = time.perf_counter () - start
+    synced = sum(len(q) for q in graph.client.queries)
+    print (f"rewrite {changes} changed of {nodes}: {rewrite / 1024:.0f} KiB after a clean")
+    print (f"sync    {changes} changed of {nodes}: {synced / 1024:.1f} KiB ({diff}), diffed in {elapsed:.3f}s")
+
+def live (nodes: int, batch_sizes: list) -> None:
+    graph = MidoriGraph (batch_size=max(batch_sizes), pipeline=True)
+    graph.clean ()
+    build_topology (graph, nodes)
+    edges = len(graph.edges)
+    legacy = Graph (client=graph.client, name=graph.graph.name)
+    start = time.perf_counter ()
+    legacy.query (legacy_query (graph))
+    elapsed = time.perf_counter () - start
+    print (f"legacy write:       {nodes / elapsed:>10.0f} nodes/s ({nodes} nodes, {edges} edges, {elapsed:.2f}s)")
+    for batch_size in batch_sizes:
+        graph = MidoriGraph (batch_size=batch_size, pipeline=True)
+        start = time.perf_counter ()
+        graph.clean ()
+        elapsed = time.perf_counter () - start
+        print (f"batch {batch_size:>6} clean: {nodes / elapsed:>10.0f} nodes/s ({elapsed:.2f}s)")
+        build_topology (graph, nodes)
+        start = time.perf_counter ()
+        graph.commit ()
+        elapsed = time.perf_counter () - start
+        print (f"batch {batch_size:>6} write: {nodes / elapsed:>10.0f} nodes/s ({elapsed:.2f}s)")
+    graph.clean ()
+
+def main () -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark graph writes')
+    arg_parser.add_argument('-n', '--nodes', help="Nodes in the topology", type=int, default=10000)
+    arg_parser.add_argument('-b', '--batch-sizes', help="Batch sizes to compare", type=int, nargs="+",
+                            default=[ 100, 1000, 5000 ])
+    arg_parser.add_argument('-c', '--changes', help="Hosts changed between simulations, for sync", type=int, default=100)
+    arg_parser.add_argument('--live', help="Write to the configured RedisGraph", action="store_true")
+    args = arg_parser.parse_args ()
+    if args.live:
+        live (args.nodes, args.batch_sizes)
+    else:
+        offline (args.nodes, args.batch_sizes)
+        offline_sync (args.nodes, args.changes, args.batch_sizes[0])
+
+if __name__ == '__main__':
+    main ()
@@ -0,0 +1,46 @@
+""" Benchmark the cost of importing midori.parser and parsing a first program.
+
+Each measurement runs in a fresh interpreter. Compares building the LALR parser
+from the grammar, as importing the module formerly did, to loading its tables
+from the parser cache, and reports the import alone now that the parser and
+transformer are built on first use.
+
+    python benchmarks/bench_import.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPTS = {
+    "import only" : "import midori.parser",
+    "build tables" : "import midori.parser as p; p.get_parser (cache=False); p.get_transformer ()",
+    "load tables" : "import midori.parser as p; p.get_parser (cache=True); p.get_transformer ()"
+}
+""" Work timed in each fresh interpreter. Dependencies are imported first, so only midori.parser is timed. """
+
+PRELUDE = "import time, lark, midori.config; start = time.perf_counter (); "
+
+def measure (script: str, runs: int) -> float:
+    """ Return the median seconds the script takes in a fresh interpreter. """
+    env = { **os.environ, "PYTHONPATH" : os.path.join (os.path.dirname (__file__), "..", "src") }
+    times = []
+    for run in range(runs):
+        output = subprocess.run ([ sys.executable, "-c", PRELUDE + script + "; print (time.perf_counter () - start)" ],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+        times.append (float (output.strip ().splitlines ()[-1]))
+    return statistics.median (times)
+
+def main () -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark parser import time')
+    arg_parser.add_argument('-r', '--runs', help="Fresh interpreters per measurement", type=int, default=10)
+    args = arg_parser.parse_args ()
+
+    subprocess.run ([ sys.executable, "-m", "midori.parser" ], check=True, capture_output=True,
+                    env={ **os.environ, "PYTHONPATH" : os.path.join (os.path.dirname (__file__), "..", "src") })
+    for name, script in SCRIPTS.items ():
+        print (f"{name:>12}: {measure (script, args.runs) * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main ()
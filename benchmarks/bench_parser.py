@@ -0,0 +1,75 @@
+""" Benchmark parsing large synthetic Midori programs.
+
+Compares:
+    two pass: the former Parser.parse, which built a Lark parse tree, transformed
+        it to the AST, and looped over the statements again to fill defaults.
+    whole:    Parser.parse, which transforms rules as the LALR parser reduces them.
+    stream:   Parser.parse_stream, which reads a file and yields statements as
+        they are recognized.
+Reports time and peak memory allocated by Python.
+
+    python benchmarks/bench_parser.py --hosts 20000
+"""
+import argparse
+import io
+import time
+import tracemalloc
+from lark import Lark
+from midori.parser import Defaults, Parser, get_transformer, grammar
+
+def make_program (hosts: int) -> str:
+    """ A host per line and a link per host, with a switch for every 100 hosts. """
+    lines = [ 'remote_controller c0 host "onos" port 6633' ]
+    switches = max(1, hosts // 100)
+    lines.append ("switch " + " ".join ([ f"s{i}" for i in range(switches) ]))
+    for i in range(hosts):
+        lines.append (f'host h{i} ip "10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" image "ubuntu:trusty" ' +
+                      f'mac "02:00:00:{i // 65536 % 256:02x}:{i // 256 % 256:02x}:{i % 256:02x}" ' +
+                      f'env {{ "INDEX" : "{i}" }} cmd [ "echo {i}" ]')
+        lines.append (f"link l{i} src h{i} dst s{i % switches} port1 1 delay \"1ms\"")
+    lines += [ "up", "down" ]
+    return "\n".join (lines) + "\n"
+
+tree_parser = Lark (grammar, parser="lalr")
+""" Builds parse trees, as Parser.parse formerly did. """
+
+def parse_two_pass (source: str) -> int:
+    tree = tree_parser.parse (source)
+    ast = get_transformer ().transform (tree)
+    defaults = Defaults ()
+    for statement in ast.statements:
+        defaults.fill (statement)
+    return len(ast.statements)
+
+def parse_whole (source: str) -> int:
+    return len(Parser ().parse (source).statements)
+
+def parse_stream (source: str) -> int:
+    """ Count statements without keeping them. """
+    return sum(1 for statement in Parser ().parse_stream (io.StringIO (source)))
+
+def measure (parse, source: str) -> tuple:
+    """ Return seconds, peak MiB, and statements parsed. Memory is traced in a
+    second run, so tracing does not slow the timed one. """
+    start = time.perf_counter ()
+    statements = parse (source)
+    elapsed = time.perf_counter () - start
+    tracemalloc.start ()
+    parse (source)
+    current, peak = tracemalloc.get_traced_memory ()
+    tracemalloc.stop ()
+    return elapsed, peak / 2**20, statements
+
+def main () -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark parsing')
+    arg_parser.add_argument('-n', '--hosts', help="Hosts in the synthetic program", type=int, default=20000)
+    args = arg_parser.parse_args ()
+
+    source = make_program (args.hosts)
+    print (f"program: {source.count(chr(10))} lines, {len(source) / 2**20:.1f} MiB")
+    for name, parse in [ ("two pass", parse_two_pass), ("whole", parse_whole), ("stream", parse_stream) ]:
+        elapsed, peak, statements = measure (parse, source)
+        print (f"{name:>8}: {elapsed:.2f}s, peak {peak:.1f} MiB above the source, {statements} statements")
+
+if __name__ == '__main__':
+    main ()
@@ -0,0 +1,54 @@
+""" Benchmark the cost of rendering a compiled program through network.jinja2.
+
+Compares compiling the template on every render (the former behavior of
+Resource.render) to reusing the compiled template from the shared environment.
+
+    python benchmarks/bench_render.py --iterations 200
+"""
+import argparse
+import os
+import time
+import midori.utils
+from jinja2 import Template
+from midori.parser import Parser
+from midori.utils import Resource
+
+EXAMPLES = os.path.join (os.path.dirname (__file__), "..", "examples")
+
+def render_uncached (context: dict) -> str:
+    """ Read and compile the template for every render. """
+    template_path = os.path.join (os.path.dirname (midori.utils.__file__), "network.jinja2")
+    template = Template (Resource.read_file (template_path))
+    return template.render (**context)
+
+def render_cached (context: dict) -> str:
+    """ Render through the template registry. """
+    return Resource.render (template_path="network.jinja2", context=context)
+
+def measure (render, context: dict, iterations: int) -> float:
+    """ Return the mean seconds per render. """
+    start = time.perf_counter ()
+    for i in range(iterations):
+        render (context)
+    return (time.perf_counter () - start) / iterations
+
+def main () -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark template rendering')
+    arg_parser.add_argument('-s', '--source', help="The program's source file",
+                            default=os.path.join (EXAMPLES, "onos-alpha.midori"))
+    arg_parser.add_argument('-i', '--iterations', help="Renders per measurement", type=int, default=200)
+    args = arg_parser.parse_args ()
+
+    ast = Parser().parse (Resource.read_file (args.source))
+    context = { "ast" : ast }
+    assert render_uncached (context) == render_cached (context)
+
+    uncached = measure (render_uncached, context, args.iterations)
+    cached = measure (render_cached, context, args.iterations)
+    print (f"source:   {args.source}")
+    print (f"uncached: {uncached * 1000:.3f} ms/compile")
+    print (f"cached:   {cached * 1000:.3f} ms/compile")
+    print (f"speedup:  {uncached / cached:.1f}x")
+
+if __name__ == '__main__':
+    main ()
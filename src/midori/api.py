@@ -6,9 +6,11 @@ from dataclasses import dataclass, field
 from fastapi import FastAPI
 from midori.config import get_config
 from midori.messaging import get_producer
+from midori.results import ResultWaiter, get_result_key
 from midori.utils import LoggingUtil
 from pydantic import BaseModel, BaseSettings
 from redis import Redis
+import redis.asyncio
 from uuid import uuid4
 from typing import Any, Optional
 from fastapi.logger import logger
@@ -64,6 +66,12 @@ class NetworkSchema(BaseModel):
     """ An optional description of the network. """
     description: Optional[str] = None
 
+    """ How the worker executes the network: interpret or codegen. Defaults to the worker's configuration. """
+    mode: Optional[str] = None
+
+    """ Change the running simulation into this network instead of starting a new one, if one is running. """
+    reconfigure: bool = False
+
 class Settings(BaseSettings):
     """ FastAPI application settings. """
     redis_host: str = config.get("redis", "host")
@@ -73,6 +81,7 @@ class Settings(BaseSettings):
     midori_api_host: str = config.get("api", "host")
     midori_api_port: int = config.getint("api", "port")
     reload: bool = config.getboolean("api", "reload")
+    result_wait_timeout: float = config.getfloat("api", "result_wait_timeout")
     
 settings = Settings()
 """ Settings values controlling the API's deployment behavior. """
@@ -87,6 +96,11 @@ class Context:
             host=settings.redis_host,
             port=settings.redis_port)
         """ Connect to the Redis cache. """
+        self.results = ResultWaiter(
+            redis.asyncio.Redis(
+                host=settings.redis_host,
+                port=settings.redis_port))
+        """ Wait for results stored in the cache. """
 
 class Services:
     def __init__(self) -> None:
@@ -97,6 +111,12 @@ services = Services ()
 @app.on_event("startup")
 async def startup_event():
     services.context = Context()
+    await services.context.results.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if services.context:
+        await services.context.results.stop()
     
 @app.post("/network/queue", tags=["networks"])
 async def create_network(network: NetworkSchema):
@@ -112,14 +132,24 @@ async def create_network(network: NetworkSchema):
             "id" : key,
             "type" : "simulation",
             "source" : network.source,
-            "description" : network.description
+            "description" : network.description,
+            "mode" : network.mode,
+            "reconfigure" : network.reconfigure
         })
     return key
 
 @app.get("/network/result", tags=["networks"])
 async def get_network_result(network_id):
     """ Get network simulation result. """
-    value = services.context.cache.get(f"{network_id}.result")
+    value = services.context.cache.get(get_result_key(network_id))
+    return json.loads(value) if value else None
+
+@app.get("/network/result/wait", tags=["networks"])
+async def wait_network_result(network_id, timeout: float = settings.result_wait_timeout):
+    """ Get network simulation result, waiting up to timeout seconds for it to be stored.
+    Returns null if it was not stored in time, so the client can ask again. """
+    timeout = max(0, min(timeout, settings.result_wait_timeout))
+    value = await services.context.results.wait(network_id, timeout)
     return json.loads(value) if value else None
 
 @app.get("/network/list", tags=["networks"])
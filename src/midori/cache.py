@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import marshal
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import CodeType
+from midori.config import get_config
+from midori.parser import Program
+from midori.utils import LoggingUtil
+from typing import Optional
+
+LoggingUtil.setup_logging ()
+
+logger = logging.getLogger (__name__)
+
+config = get_config ()
+
+@dataclass
+class CompileResult:
+    """ The products of compiling one program. """
+    ast: Program
+    python: str = None
+    """ Python generated from the AST. None if the program has only been parsed. """
+    bytecode: bytes = None
+    """ The Python output compiled to a code object and marshalled. """
+    code: CodeType = field(default=None, compare=False, repr=False)
+    """ The code object, unmarshalled from bytecode when first needed. """
+
+    def get_code(self) -> CodeType:
+        """ Get the code object for the Python output, unmarshalling it at most once.
+
+        Returns:
+            CodeType: A code object ready to execute.
+        """
+        if not self.code:
+            object.__setattr__ (self, "code", marshal.loads (self.bytecode))
+        return self.code
+
+    def __getstate__(self) -> dict:
+        """ Code objects are not picklable. Keep only the marshalled bytes. """
+        state = dict(self.__dict__)
+        state["code"] = None
+        return state
+
+class CompileCache:
+    """ A content addressed cache of compiled programs.
+
+    Entries are keyed by a hash of the source text, the versions of the
+    grammar and template used to compile it, and the address settings. Recently used entries are kept
+    in memory. If a directory is configured, entries are also written there
+    so that other workers, and this one after a restart, can reuse them. """
+    def __init__(self,
+                 size: int = config.getint("compiler", "cache_size"),
+                 path: str = config.get("compiler", "cache_dir")
+    ) -> None:
+        """ Initialize the cache.
+
+        Args:
+            size (int): Maximum number of entries held in memory.
+            path (str): Directory for the on-disk tier. None or empty disables it.
+        """
+        self.size = size
+        self.path = path if path else None
+        self.entries = OrderedDict ()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock ()
+        if self.path:
+            os.makedirs (self.path, exist_ok=True)
+
+    def key(self, source: str, *versions: str) -> str:
+        """ Compute the key for a source text.
+
+        Args:
+            source (str): Program source text.
+            versions (str): Versions of everything else the output depends on.
+
+        Returns:
+            str: A hex digest.
+        """
+        digest = hashlib.sha256 ()
+        for version in versions:
+            digest.update (version.encode ())
+            digest.update (b"\0")
+        digest.update (source.encode ())
+        return digest.hexdigest ()
+
+    def get(self, key: str) -> Optional[CompileResult]:
+        """ Look up an entry, checking memory first and then disk.
+
+        Args:
+            key (str): A key produced by key().
+
+        Returns:
+            CompileResult: The cached result or None.
+        """
+        with self._lock:
+            result = self.entries.get (key)
+            if result:
+                self.entries.move_to_end (key)
+        if not result:
+            result = self._read (key)
+            if result:
+                self._remember (key, result)
+        with self._lock:
+            if result:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return result
+
+    def put(self, key: str, result: CompileResult) -> None:
+        """ Add an entry to memory and, if enabled, to disk.
+
+        Args:
+            key (str): A key produced by key().
+            result (CompileResult): The compiled program.
+        """
+        self._remember (key, result)
+        self._write (key, result)
+
+    def clear(self) -> None:
+        """ Empty the in-memory tier and reset the counters. """
+        with self._lock:
+            self.entries.clear ()
+            self.hits = 0
+            self.misses = 0
+
+    def _remember(self, key: str, result: CompileResult) -> None:
+        with self._lock:
+            self.entries[key] = result
+            self.entries.move_to_end (key)
+            while len(self.entries) > self.size:
+                self.entries.popitem (last=False)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join (self.path, f"{key}.pickle")
+
+    def _read(self, key: str) -> Optional[CompileResult]:
+        result = None
+        if self.path:
+            path = self._get_path (key)
+            try:
+                with open (path, 'rb') as stream:
+                    result = pickle.load (stream)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                logger.warning (f"ignoring unreadable cache entry {path}", exc_info=True)
+        return result
+
+    def _write(self, key: str, result: CompileResult) -> None:
+        if self.path:
+            """ Write to a temporary file and rename so readers never see a partial entry. """
+            fd, temp_path = tempfile.mkstemp (dir=self.path, suffix=".tmp")
+            try:
+                with os.fdopen (fd, 'wb') as stream:
+                    pickle.dump (result, stream)
+                os.replace (temp_path, self._get_path (key))
+            except Exception:
+                logger.warning (f"unable to write cache entry {key}", exc_info=True)
+                if os.path.exists (temp_path):
+                    os.remove (temp_path)
+
+compile_cache = None
+def get_compile_cache() -> CompileCache:
+    """ Get the compile cache shared by compilers in this process. """
+    global compile_cache
+    if not compile_cache:
+        compile_cache = CompileCache ()
+    return compile_cache
@@ -0,0 +1,235 @@
+import logging
+import re
+import socket
+from dataclasses import dataclass, field
+from midori.parser import (
+    Program, Controller, Host, Switch, Link, Intent, Ping, Position, _Ast
+)
+from midori.utils import LoggingUtil
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+LoggingUtil.setup_logging ()
+
+logger = logging.getLogger (__name__)
+
+@dataclass
+class SemanticError:
+    """ A problem with a program that parses but can not run. """
+    message: str
+    position: Optional[Position] = None
+    """ Where the statement with the problem begins, if known. """
+
+    def __str__(self) -> str:
+        return f"line {self.position.line}: {self.message}" if self.position else self.message
+
+class SemanticException(Exception):
+    """ A program has semantic errors. All of them are reported together. """
+    def __init__(self, errors: List[SemanticError]) -> None:
+        self.errors = errors
+        super().__init__("\n".join([ f"{len(errors)} semantic error(s):" ] + [ f"  {e}" for e in errors ]))
+
+@dataclass
+class Symbol:
+    """ A name declared by a statement. """
+    kind: str
+    """ host, switch, link, or controller. """
+    statement: _Ast
+
+    @property
+    def where(self) -> str:
+        """ Where the name is declared, for messages. """
+        position = self.statement.meta
+        return f"line {position.line}" if position else "an earlier statement"
+
+@dataclass
+class SymbolTable:
+    """ Names declared so far, and the addresses and ports claimed by them. """
+    nodes: Dict[str, Symbol] = field(default_factory=dict)
+    """ Hosts and switches, which share a namespace since links may join either. """
+    links: Dict[str, Symbol] = field(default_factory=dict)
+    controllers: Dict[str, Symbol] = field(default_factory=dict)
+    ips: Dict[bytes, Host] = field(default_factory=dict)
+    """ Hosts by packed IP address. """
+    macs: Dict[int, Host] = field(default_factory=dict)
+    """ Hosts by MAC address. """
+    link_ports: Dict[Tuple[str, int], Link] = field(default_factory=dict)
+    """ Links by the node and port number they attach to. """
+    bound_ports: Dict[int, Host] = field(default_factory=dict)
+    """ Hosts by the port on the machine their container binds. """
+
+def pack_ip(address: str) -> Optional[bytes]:
+    """ Get the bytes of an IPv4 or IPv6 address, ignoring any prefix length, or
+    None if it is not valid. The lengths differ, so versions never compare equal. """
+    address = address.split("/")[0]
+    for family in [ socket.AF_INET, socket.AF_INET6 ]:
+        try:
+            return socket.inet_pton(family, address)
+        except OSError:
+            pass
+    return None
+
+mac_address = re.compile(r"[0-9a-f]{2}([:-][0-9a-f]{2}){5}", re.IGNORECASE)
+
+class Checker:
+    """ Finds the errors that would otherwise surface only when a program runs,
+    after containers have been created: references to undeclared hosts and
+    switches, duplicate names, ports used twice, and addresses shared by hosts.
+
+    Statements are checked in order with a symbol table of what they declare,
+    so a program is checked in linear time, and a stream of statements can be
+    checked as it passes. A statement may only refer to names declared before it,
+    as when the program runs. """
+    def __init__(self) -> None:
+        self.symbols = SymbolTable ()
+        self.errors: List[SemanticError] = []
+        self.unresolved: List[Tuple[str, str, _Ast]] = []
+        """ References to names not declared yet: the name, what it must be, and the statement. """
+
+    def check(self, program: Program) -> List[SemanticError]:
+        """ Check a whole program.
+
+        Args:
+            program (Program): The program's abstract syntax tree, with defaults filled.
+
+        Returns:
+            List[SemanticError]: Every error found, in the order of the statements.
+        """
+        for statement in program.statements:
+            self.visit(statement)
+        return self.finish()
+
+    def check_stream(self, statements: Iterable[_Ast]) -> Iterator[_Ast]:
+        """ Check statements as they pass, for example from Parser.parse_stream.
+
+        Args:
+            statements (Iterable[_Ast]): The program's statements in order.
+
+        Returns:
+            Iterator[_Ast]: The same statements.
+
+        Raises:
+            SemanticException: After the last statement, if there were errors.
+        """
+        for statement in statements:
+            self.visit(statement)
+            yield statement
+        errors = self.finish()
+        if errors:
+            raise SemanticException(errors)
+
+    def finish(self) -> List[SemanticError]:
+        """ Report references that were never resolved, noting names declared too late. """
+        for name, kind, statement in self.unresolved:
+            symbol = self.symbols.nodes.get(name)
+            if symbol and self.is_kind(symbol, kind):
+                self.error(statement, f"{self.describe(statement)} refers to {name} before it is declared at {symbol.where}")
+            else:
+                self.error(statement, f"{self.describe(statement)} refers to undeclared {kind} {name}")
+        self.unresolved = []
+        self.errors.sort(key=lambda e: e.position.line if e.position else 0)
+        return self.errors
+
+    def error(self, statement: _Ast, message: str) -> None:
+        self.errors.append(SemanticError(message, getattr(statement, "meta", None)))
+
+    def describe(self, statement: _Ast) -> str:
+        """ Name a statement in a message, like "link l1". """
+        kind = statement.__class__.__name__.lower()
+        name = statement.name if isinstance(statement.name, str) else " ".join(statement.name)
+        return f"{kind} {name}"
+
+    def is_kind(self, symbol: Symbol, kind: str) -> bool:
+        return kind == "host or switch" or symbol.kind == kind
+
+    def declare(self, table: Dict[str, Symbol], name: str, kind: str, statement: _Ast) -> None:
+        """ Add a name to the symbol table, reporting it if it is already declared. """
+        if name in table:
+            earlier = table[name]
+            also = f" as a {earlier.kind}" if earlier.kind != kind else ""
+            self.error(statement, f"{kind} {name} is already declared{also} at {earlier.where}")
+        else:
+            table[name] = Symbol(kind, statement)
+
+    def refer(self, name: str, kind: str, statement: _Ast) -> None:
+        """ Check a reference to a host, or to a host or switch. """
+        symbol = self.symbols.nodes.get(name)
+        if not symbol:
+            self.unresolved.append((name, kind, statement))
+        elif not self.is_kind(symbol, kind):
+            self.error(statement, f"{self.describe(statement)} refers to {name}, a {symbol.kind}, not a {kind}")
+
+    def claim(self, table: Dict, key: object, statement: _Ast) -> Optional[_Ast]:
+        """ Record an address or port for a host or link.
+
+        Returns:
+            _Ast: The other host or link that already has it, if any.
+        """
+        owner = table.setdefault(key, statement)
+        return owner if owner is not statement else None
+
+    def visit(self, statement: _Ast) -> None:
+        """ Check one statement and add its declarations to the symbol table. """
+        visitor = getattr(self, f"visit_{statement.__class__.__name__}", None)
+        if visitor:
+            visitor(statement)
+
+    def visit_Controller(self, statement: Controller) -> None:
+        self.declare(self.symbols.controllers, statement.name, "controller", statement)
+
+    visit_RemoteController = visit_Controller
+
+    def visit_Host(self, statement: Host) -> None:
+        self.declare(self.symbols.nodes, statement.name, "host", statement)
+        owner = f"host {statement.name}"
+        if statement.ip_addr:
+            ip = pack_ip(statement.ip_addr)
+            other = self.claim(self.symbols.ips, ip, statement) if ip else None
+            if not ip:
+                self.error(statement, f"{owner} has an invalid IP address {statement.ip_addr}")
+            elif other:
+                self.error(statement, f"{owner}'s IP address {statement.ip_addr} is also used by {self.describe(other)}")
+        if statement.mac:
+            valid = mac_address.fullmatch(statement.mac)
+            other = self.claim(self.symbols.macs, int(re.sub(r"[:-]", "", statement.mac), 16), statement) if valid else None
+            if not valid:
+                self.error(statement, f"{owner} has an invalid MAC address {statement.mac}")
+            elif other:
+                self.error(statement, f"{owner}'s MAC address {statement.mac} is also used by {self.describe(other)}")
+        for container_port, host_port in statement.port_bindings:
+            other = self.claim(self.symbols.bound_ports, host_port, statement)
+            if other:
+                self.error(statement, f"port {host_port}, bound by {owner}, is also used by {self.describe(other)}")
+
+    def visit_Switch(self, statement: Switch) -> None:
+        for name in statement.name:
+            self.declare(self.symbols.nodes, name, "switch", statement)
+
+    def visit_Link(self, statement: Link) -> None:
+        self.declare(self.symbols.links, statement.name, "link", statement)
+        for node, port in [ (statement.src, statement.port1), (statement.dst, statement.port2) ]:
+            self.refer(node, "host or switch", statement)
+            other = self.claim(self.symbols.link_ports, (node, port), statement) if port else None
+            if other:
+                self.error(statement, f"port {port} of {node}, used by link {statement.name}, " +
+                           f"is also used by {self.describe(other)}")
+
+    def visit_Intent(self, statement: Intent) -> None:
+        for name in statement.name:
+            self.refer(name, "host", statement)
+
+    def visit_Ping(self, statement: Ping) -> None:
+        for name in statement.name:
+            self.refer(name, "host", statement)
+
+def check(program: Program) -> None:
+    """ Check a program, raising an exception that lists every error.
+
+    Args:
+        program (Program): The program's abstract syntax tree, with defaults filled.
+
+    Raises:
+        SemanticException: If the program has errors.
+    """
+    errors = Checker ().check(program)
+    if errors:
+        raise SemanticException(errors)
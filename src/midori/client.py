@@ -22,6 +22,10 @@ class MidoriClient:
         self.protocol=protocol
         self.host=host
         self.port = port
+        self.session = requests.Session ()
+        """ Keep the connection alive across requests for results. """
+        self.long_poll = True
+        """ Whether the API waits for results. Cleared if it can not, to poll instead. """
         
     def get_operation(self, name: str) -> str:
         """ Normalize the construction of URLs. 
@@ -29,8 +33,11 @@ class MidoriClient:
         @param name: Name of the operation, path relative to the API URI."""        
         return f"{self.protocol}://{self.host}:{self.port}/{name}"
 
-    def create_network(self, source: str, net_id: int=0) -> Dict:
-        """ Create a network given a source file, send it to the API, and track progress. """
+    def create_network(self, source: str, net_id: int=0, reconfigure: bool=False, timeout: float=160) -> Dict:
+        """ Create a network given a source file, send it to the API, and track progress.
+
+        With reconfigure, a simulation still running is changed into this network instead of being replaced.
+        The result is returned as soon as it is stored, or None after timeout seconds. """
         network = Resource.read_file(source)
 
         url = self.get_operation("network/queue")
@@ -40,21 +47,47 @@ class MidoriClient:
             json={
                 "id" : net_id,
                 "source" : json.dumps(network),
-                "description" : "Source for an emulated network."
+                "description" : "Source for an emulated network.",
+                "reconfigure" : reconfigure
             }).json ()
     
         logger.debug(f"Queued network simulation job {source} with job_id {job_id} for execution.")
-        start = time.time ()
-        result = None
+        return self.get_result(job_id, timeout=timeout)
+
+    def get_result(self, job_id: str, timeout: float=160, poll_interval: float=5) -> Dict:
+        """ Get a simulation's result, waiting up to timeout seconds for it.
+
+        The API holds each request until the result is stored or its own limit passes.
+        Against an API without that endpoint, or if a request is cut off on the way,
+        the result is polled for every poll_interval seconds instead. """
+        deadline = time.time () + timeout
         while True:
-            result = requests.get (
-                url=self.get_operation(f"network/result?network_id={job_id}")).json ()
-            now = time.time ()
-            if result or now - start > 160:
-                break
-            time.sleep (5)
-        
-        return result
+            remaining = max(0, deadline - time.time ())
+            if self.long_poll:
+                result = self.wait_result(job_id, remaining)
+            if not self.long_poll:
+                result = self.session.get (
+                    url=self.get_operation("network/result"),
+                    params={ "network_id" : job_id }).json ()
+            if result or time.time () >= deadline:
+                return result
+            if not self.long_poll:
+                time.sleep (min(poll_interval, max(0, deadline - time.time ())))
+
+    def wait_result(self, job_id: str, timeout: float) -> Dict:
+        """ Ask the API to wait for a result. Clears long_poll if it can not. """
+        try:
+            response = self.session.get (
+                url=self.get_operation("network/result/wait"),
+                params={ "network_id" : job_id, "timeout" : timeout },
+                timeout=timeout + 10)
+        except requests.exceptions.Timeout:
+            response = None
+        if response is None or response.status_code in (404, 405, 502, 504):
+            logger.info(f"The API did not wait for the result of {job_id}. Polling for results instead.")
+            self.long_poll = False
+            return None
+        return response.json ()
 
 def check_positive(value):
     ivalue = int(value)
@@ -73,6 +106,7 @@ def main() -> None:
     
     arg_parser.add_argument('-s', '--source', help="The program's source file", default="examples/onos-alpha.midori")
     arg_parser.add_argument('-i', '--iterations', help="Number of iterations to run", type=check_positive, default=1)
+    arg_parser.add_argument('-r', '--reconfigure', help="Change the running simulation instead of starting a new one", action="store_true")
     
     args = arg_parser.parse_args ()
     if args.source:
@@ -81,7 +115,8 @@ def main() -> None:
             port=config.get("api", "port"))
         for iteration in range(0, args.iterations):
             response = client.create_network(source=args.source,
-                                             net_id=iteration)
+                                             net_id=iteration,
+                                             reconfigure=args.reconfigure)
             print(json.dumps(response, indent=2))
 
 if __name__ == '__main__':
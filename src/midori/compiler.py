@@ -1,33 +1,68 @@
 import argparse
+import glob
+import hashlib
+import importlib.util
+import json
 import logging
+import marshal
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from midori.cache import CompileCache, CompileResult, get_compile_cache
+from midori.config import get_config
+from midori.checker import Checker, SemanticException, check
 from midori.utils import LoggingUtil, Resource
-from midori.parser import Parser, Program
-from typing import List, Dict
+from midori.parser import Parser, Program, get_defaults_version, grammar_version
+from typing import List, Dict, TextIO
 
 LoggingUtil.setup_logging ()
 
 logger = logging.getLogger (__name__)
 
+config = get_config ()
+
+def get_compile_versions (template_path: str) -> List[str]:
+    """ Get the versions of everything besides the source that compiled output depends
+    on: the grammar, the template, and the address settings.
+
+    Args:
+        template_path (str): The template projecting the AST to Python.
+
+    Returns:
+        List[str]: The versions, in a fixed order.
+    """
+    return [ grammar_version, Resource.get_template_version (template_path), get_defaults_version () ]
+
 class Compiler:
     """ The compiler accepts a domain specific language (DSL) describing
     a network including elements like SDN controllers, hosts as containers,
     switches, and links. The compiler parses the input source code into an
     abstract syntax tree, then projects that intermediate representation
     through a template to generate executable Containernet(Mininet) Python code. """
+    template_path = "network.jinja2"
+    """ The template projecting the AST to Python. """
+
     def __init__(self,
                  dry_run: bool = False,
-                 debug: bool = False
+                 debug: bool = False,
+                 cache: CompileCache = None
     ) -> None:
         """ Initialize the compiler. 
         Args:
             dry_run (bool): Compile but don't actually write output.
             debug (bool): Print verbose runtime information.
+            cache (CompileCache): Cache of compiled programs. Defaults to the process wide cache.
         """
         self.dry_run = dry_run
         self.debug = debug
         logger.debug (f"dry_run={self.dry_run}, debug={self.debug}")
         self._parser = Parser ()
         """ The lexical analyzer (parser) that will assemble tokens into an AST. """
+        self.cache = cache if cache else get_compile_cache ()
+        """ Compiled programs keyed by source, grammar, and template. """
         
     def _emit (self,
                ast: Program,
@@ -47,14 +82,14 @@ class Compiler:
         result = None
         if output_path:
             Resource.render_file (
-                template_path="network.jinja2",
+                template_path=self.template_path,
                 context={
                     "ast": ast
                 },
                 path=output_path)
         else:
             result = Resource.render (
-                template_path="network.jinja2",
+                template_path=self.template_path,
                 context={
                     "ast": ast
                 })
@@ -75,20 +110,332 @@ class Compiler:
         text = Resource.read_file (path)
         return self.process (source=text, output_path=output_path)
         
+    def compile (self, source: str, emit: bool = True) -> CompileResult:
+        """ Compile a block of source code to an AST, Python, and a Python code object,
+        using the cache if possible. The AST is checked before any code is generated.
+
+        Args:
+            source (str): Midori source code.
+            emit (bool): Generate Python. If false, only the AST is guaranteed.
+
+        Returns:
+            CompileResult: The AST and the executable output.
+
+        Raises:
+            SemanticException: If the program refers to undeclared names, declares
+            a name twice, or gives a port or address to more than one host or link.
+        """
+        key = self.cache.key (
+            source, *get_compile_versions (self.template_path), importlib.util.MAGIC_NUMBER.hex ())
+        result = self.cache.get (key)
+        if result and (result.python or not emit):
+            logger.debug (f"compile cache hit: {key}")
+        else:
+            if not result:
+                result = CompileResult (ast=self._parser.parse (source))
+                check (result.ast)
+            if emit:
+                result.python = self._emit (ast=result.ast)
+                code = compile (result.python, f"<midori:{key[:12]}>", "exec")
+                result.bytecode = marshal.dumps (code)
+            self.cache.put (key, result)
+        return result
+
+    def process_stream (self,
+                        stream: TextIO,
+                        output: TextIO) -> None:
+        """ Compile a program from a file object, writing Python as its statements are parsed.
+
+        Neither the source, the AST, nor the output is held in memory whole, so very
+        large programs compile in bounded memory. Streamed programs are not cached.
+        They are checked as they are written, and errors are raised after the last
+        statement.
+
+        Args:
+            stream (TextIO): Midori source code.
+            output (TextIO): Where to write executable output.
+        """
+        ast = Program (statements=Checker ().check_stream (self._parser.parse_stream (stream)))
+        for text in Resource.generate (template_path=self.template_path, context={ "ast" : ast }):
+            output.write (text)
+
     def process (self,
                  source: str,
                  output_path:str=None) -> str:
         """ Compile a block of source code, optionally writing to an output file.
 
         Args:
-            path (str): Path to the file to compile.
+            source (str): Midori source code.
             output_path (str): Path to the output file to write.
 
         Returns:
             str: Executable output.
         """
-        ast: Program = self._parser.parse (source)
-        return self._emit (ast=ast, output_path=output_path)
+        result = self.compile (source)
+        if output_path:
+            Resource.write_file (path=output_path, data=result.python)
+        return result.python
+
+@dataclass
+class FileResult:
+    """ The outcome of compiling one file in a batch. """
+    source: str
+    output: str
+    status: str
+    """ compiled, unchanged, or failed. """
+    seconds: float = 0.0
+    error: str = None
+
+def find_sources (patterns: List[str], warn: bool = True) -> List[str]:
+    """ Expand files, globs, and directories into Midori source files.
+
+    Args:
+        patterns (List[str]): Paths or glob patterns. ** matches any number of
+        directories. A directory stands for every .midori file beneath it.
+        warn (bool): Log patterns that match nothing.
+
+    Returns:
+        List[str]: Source paths, each once, in the order given.
+    """
+    sources = []
+    for pattern in patterns:
+        if os.path.isdir (pattern):
+            pattern = os.path.join (pattern, "**", "*.midori")
+        matches = sorted (glob.glob (pattern, recursive=True))
+        if not matches and warn:
+            logger.warning (f"no source files match {pattern}")
+        sources.extend (matches)
+    return list(dict.fromkeys (sources))
+
+def get_source_root (sources: List[str]) -> str:
+    """ Get the directory a set of sources have in common. """
+    return os.path.commonpath ([ os.path.dirname (os.path.abspath (source)) for source in sources ])
+
+def get_output_paths (sources: List[str], output_dir: str = None, root: str = None) -> Dict[str, str]:
+    """ Get where each source's Python is written. Without an output directory, it
+    is written next to the source. Otherwise, the sources' directories are recreated
+    under the output directory, relative to root, by default the directory they
+    have in common. """
+    if not output_dir:
+        return { source : os.path.splitext (source)[0] + ".py" for source in sources }
+    root = root or get_source_root (sources)
+    return {
+        source : os.path.join (output_dir, os.path.relpath (os.path.splitext (os.path.abspath (source))[0], root) + ".py")
+        for source in sources
+    }
+
+def get_source_hash (source: str) -> str:
+    """ Hash a program's source with the versions the compile cache is keyed by, so a
+    change to the grammar, the template, or the address settings compiles everything again. """
+    return hashlib.sha256 ("\0".join (
+        get_compile_versions (Compiler.template_path) + [ source ]).encode ()).hexdigest ()
+
+_batch_compiler: Compiler = None
+""" Each worker process's compiler, created for its first file. """
+
+def compile_file (source: str, output: str, stream: bool = False, dry_run: bool = False,
+                  debug: bool = False) -> FileResult:
+    """ Compile a file in a batch, recording the time taken and any error.
+
+    Args:
+        source (str): The program's source file.
+        output (str): The Python file to write.
+        stream (bool): Parse and write the program a statement at a time.
+        dry_run (bool): Compile without writing the output.
+        debug (bool): Print verbose runtime information.
+
+    Returns:
+        FileResult: The outcome.
+    """
+    global _batch_compiler
+    if not _batch_compiler or (_batch_compiler.dry_run, _batch_compiler.debug) != (dry_run, debug):
+        _batch_compiler = Compiler (dry_run=dry_run, debug=debug)
+    start = time.perf_counter ()
+    try:
+        if not dry_run:
+            os.makedirs (os.path.dirname (output) or ".", exist_ok=True)
+        if stream and dry_run:
+            with open (source, 'r') as stream_in, open (os.devnull, 'w') as stream_out:
+                _batch_compiler.process_stream (stream=stream_in, output=stream_out)
+        elif stream:
+            """ Write beside the output and move it into place once the whole program
+            has been checked, so a failed program leaves no partial output. """
+            partial = f"{output}.{os.getpid ()}.tmp"
+            try:
+                with open (source, 'r') as stream_in, open (partial, 'w') as stream_out:
+                    _batch_compiler.process_stream (stream=stream_in, output=stream_out)
+                os.replace (partial, output)
+            finally:
+                if os.path.exists (partial):
+                    os.remove (partial)
+        else:
+            _batch_compiler.process_file (path=source, output_path=None if dry_run else output)
+        return FileResult (source, output, "compiled", time.perf_counter () - start)
+    except Exception as e:
+        error = str(e) if isinstance(e, SemanticException) else traceback.format_exc ()
+        return FileResult (source, output, "failed", time.perf_counter () - start, error)
+
+def compile_files (sources: List[str],
+                   output_dir: str = None,
+                   jobs: int = None,
+                   force: bool = False,
+                   stream: bool = False,
+                   dry_run: bool = False,
+                   root: str = None,
+                   debug: bool = False) -> List[FileResult]:
+    """ Compile many files in one run, across a pool of processes.
+
+    A manifest in the output directory, or else the directory the sources have
+    in common, records the hash of each source compiled. A source whose hash has
+    not changed since, and whose output still exists, is skipped.
+
+    Args:
+        sources (List[str]): Source files.
+        output_dir (str): Where to write Python. Next to each source if not given.
+        jobs (int): Processes to compile in. One compiles in this process. Defaults
+        to the number of CPUs.
+        force (bool): Compile every source, changed or not.
+        stream (bool): Parse and write each program a statement at a time.
+        dry_run (bool): Compile without writing outputs or the manifest.
+        root (str): The directory output paths are relative to, and the manifest
+        is kept in without an output directory. By default, the directory the
+        sources have in common.
+        debug (bool): Print verbose runtime information.
+
+    Returns:
+        List[FileResult]: The outcome for each source, in order.
+    """
+    if not sources:
+        return []
+    root = root or get_source_root (sources)
+    outputs = get_output_paths (sources, output_dir, root)
+    manifest_dir = output_dir or root
+    manifest_path = os.path.join (manifest_dir, ".midori-manifest.json")
+    manifest = Resource.load_json (manifest_path) if os.path.exists (manifest_path) else {}
+    hashes = { source : get_source_hash (Resource.read_file (source)) for source in sources }
+    results = {}
+    pending = []
+    for source in sources:
+        key = os.path.abspath (source)
+        if not force and manifest.get (key) == hashes[source] and os.path.exists (outputs[source]):
+            results[source] = FileResult (source, outputs[source], "unchanged")
+        else:
+            pending.append (source)
+
+    jobs = min(jobs or os.cpu_count () or 1, len(pending)) if pending else 0
+    if jobs > 1:
+        with ProcessPoolExecutor (max_workers=jobs) as executor:
+            futures = [ executor.submit (compile_file, source, outputs[source], stream, dry_run, debug)
+                        for source in pending ]
+            for future in futures:
+                result = future.result ()
+                results[result.source] = result
+    else:
+        for source in pending:
+            results[source] = compile_file (source, outputs[source], stream, dry_run, debug)
+
+    if not dry_run and pending:
+        for source in pending:
+            key = os.path.abspath (source)
+            if results[source].status == "compiled":
+                manifest[key] = hashes[source]
+            else:
+                manifest.pop (key, None)
+        os.makedirs (manifest_dir, exist_ok=True)
+        Resource.write_file (manifest_path, json.dumps (manifest, indent=2, sort_keys=True))
+    return [ results[source] for source in sources ]
+
+class Watcher:
+    """ Compiles sources again whenever they change.
+
+    Sources are polled for changes to their modification time or size, and new
+    files matching the patterns are picked up. Changed sources are compiled in
+    this process, so the parser and template stay loaded and a small program
+    compiles in milliseconds. A change to the template or the address settings
+    compiles every source. """
+    def __init__(self,
+                 patterns: List[str],
+                 output_dir: str = None,
+                 stream: bool = False,
+                 dry_run: bool = False,
+                 debug: bool = False
+    ) -> None:
+        """ Initialize the watcher.
+
+        Args:
+            patterns (List[str]): Source files, glob patterns, or directories.
+            output_dir (str): Where to write Python. Next to each source if not given.
+            stream (bool): Parse and write each program a statement at a time.
+            dry_run (bool): Compile without writing outputs.
+            debug (bool): Print verbose runtime information.
+        """
+        self.patterns = patterns
+        self.output_dir = output_dir
+        self.stream = stream
+        self.dry_run = dry_run
+        self.debug = debug
+        self.stats: Dict[str, tuple] = {}
+        """ Modification time and size of each source when it was last compiled. """
+        self.versions: List[str] = None
+        """ Versions of the grammar, template, and address settings at the last poll. """
+
+    def poll (self) -> List[FileResult]:
+        """ Compile the sources that changed since the last poll. The first poll
+        compiles those that changed since the manifest was written.
+
+        Returns:
+            List[FileResult]: The outcome for each source compiled or found unchanged.
+        """
+        sources = find_sources (self.patterns, warn=not self.stats)
+        stats = {}
+        for source in sources:
+            try:
+                stat = os.stat (source)
+                stats[source] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                pass
+        versions = get_compile_versions (Compiler.template_path)
+        if versions != self.versions:
+            changed = list(stats)
+        else:
+            changed = [ source for source in stats if self.stats.get (source) != stats[source] ]
+        self.stats = stats
+        self.versions = versions
+        if not changed:
+            return []
+        return compile_files (changed, output_dir=self.output_dir, jobs=1, stream=self.stream,
+                              dry_run=self.dry_run, root=get_source_root (list(stats)), debug=self.debug)
+
+    def run (self, interval: float = config.getfloat ("compiler", "watch_interval")) -> None:
+        """ Poll until interrupted, printing a summary of each compile.
+
+        Args:
+            interval (float): Seconds between polls.
+        """
+        print (f"watching {' '.join (self.patterns)}. Press Ctrl-C to stop.")
+        try:
+            while True:
+                start = time.perf_counter ()
+                results = self.poll ()
+                if results:
+                    print (summarize (results, time.perf_counter () - start), flush=True)
+                time.sleep (interval)
+        except KeyboardInterrupt:
+            pass
+
+def summarize (results: List[FileResult], seconds: float, slowest: int = 5) -> str:
+    """ Describe a batch: counts, elapsed and compile time, the slowest files, and errors. """
+    compiled = [ r for r in results if r.status == "compiled" ]
+    failed = [ r for r in results if r.status == "failed" ]
+    unchanged = len(results) - len(compiled) - len(failed)
+    busy = sum([ r.seconds for r in results ])
+    lines = [ f"compiled {len(compiled)}, unchanged {unchanged}, failed {len(failed)} " +
+              f"in {seconds:.2f}s ({busy:.2f}s compiling)" ]
+    for result in sorted (compiled + failed, key=lambda r: r.seconds, reverse=True)[:slowest]:
+        lines.append (f"  {result.seconds * 1000:8.1f} ms  {result.source}")
+    for result in failed:
+        lines.append (f"failed: {result.source}\n{result.error}")
+    return "\n".join (lines)
 
 def main ():
     """ Run the compiler from the command line. """
@@ -100,8 +447,22 @@ def main ():
             prog,
             max_help_position=180))
     
+    arg_parser.add_argument('sources',
+                            help="Source files, glob patterns, or directories to compile.",
+                            nargs="*")
     arg_parser.add_argument('-s', '--source',
                             help="The program's source file")
+    arg_parser.add_argument('-o', '--output-dir',
+                            help="Directory to write Python to. Defaults to next to each source.",
+                            default=None)
+    arg_parser.add_argument('-j', '--jobs',
+                            help="Processes to compile in. Defaults to the number of CPUs.",
+                            type=int,
+                            default=None)
+    arg_parser.add_argument('-f', '--force',
+                            help="Compile sources even if they have not changed.",
+                            action="store_true",
+                            default=False)
     arg_parser.add_argument('--dry-run',
                              help="Don't write any output.",
                              action="store_true",
@@ -110,12 +471,35 @@ def main ():
                              help="Print very verbose runtime information.",
                              action="store_true",
                              default=False)
+    arg_parser.add_argument('-w', '--watch',
+                             help="Compile sources again whenever they change, until interrupted.",
+                             action="store_true",
+                             default=False)
+    arg_parser.add_argument('--stream',
+                             help="Parse and write the program a statement at a time, for very large programs.",
+                             action="store_true",
+                             default=False)
     
     args = arg_parser.parse_args ()
-    if args.source:
-        compiler = Compiler (dry_run=args.dry_run, debug=args.debug)
-        compiler.process_file (path=args.source,
-                               output_path=args.source.replace (".midori", ".py"))
+    patterns = args.sources + ([ args.source ] if args.source else [])
+    if patterns and args.watch:
+        Watcher (patterns=patterns,
+                 output_dir=args.output_dir,
+                 stream=args.stream,
+                 dry_run=args.dry_run,
+                 debug=args.debug).run ()
+    elif patterns:
+        start = time.perf_counter ()
+        results = compile_files (sources=find_sources (patterns),
+                                 output_dir=args.output_dir,
+                                 jobs=args.jobs,
+                                 force=args.force,
+                                 stream=args.stream,
+                                 dry_run=args.dry_run,
+                                 debug=args.debug)
+        print (summarize (results, time.perf_counter () - start))
+        if any([ result.status == "failed" for result in results ]):
+            sys.exit (1)
 
 if __name__ == '__main__':
     main ()
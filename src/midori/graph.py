@@ -1,33 +1,197 @@
 import json
 import jsonpickle
+import logging
 import redis
+from collections import defaultdict
+from dataclasses import dataclass, field
 from midori.config import get_config
+from midori.topology import Topology
+from midori.utils import LoggingUtil
 from redis.commands.graph.node import Node
 from redis.commands.graph.edge import Edge
 from redis.commands.graph.path import Path
 from redis.commands.graph import Graph
-from typing import Dict, List, Union, Any
-from string import Template
+from redis.exceptions import ResponseError
+from typing import Dict, List, Union, Any, Iterator, Tuple
+
+LoggingUtil.setup_logging ()
+
+logger = logging.getLogger (__name__)
 
 config = get_config()
 
+def chunk(items: List, size: int) -> Iterator[List]:
+    """ Split a list into consecutive lists of at most size items. """
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+def cypher_name(name: str) -> str:
+    """ Quote a label, relationship type, or property key for use in Cypher. """
+    return "`" + name.replace("`", "``") + "`"
+
+def cypher_value(value: Any) -> str:
+    """ Write a parameter value as a Cypher literal. """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join([ cypher_value(item) for item in value ]) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join([ f"{key}:{cypher_value(item)}" for key, item in value.items() ]) + "}"
+    return str(value)
+
+def get_params_header(params: Dict) -> str:
+    """ Get the prefix binding a query's parameters, which GRAPH.QUERY reads
+    before the query text, like CYPHER rows=[{name:"h1"}] . """
+    return "CYPHER " + "".join([ f"{key}={cypher_value(value)} " for key, value in params.items() ])
+
+EdgeKey = Tuple[str, str, str]
+""" An edge's source node name, relation, and destination node name. """
+
+GraphNodes = Dict[str, Tuple[Tuple[str, ...], Dict]]
+""" Node labels and properties by node name. """
+
+GraphEdges = Dict[EdgeKey, Dict]
+""" Edge properties by edge key. """
+
+def get_stored_properties(properties: Dict) -> Dict:
+    """ Get properties as the graph stores them. A null property is not stored. """
+    return { key : value for key, value in properties.items() if value is not None }
+
+def get_topology_graph(topology: Topology) -> Tuple[GraphNodes, GraphEdges]:
+    """ Get the nodes and edges representing a topology in the graph.
+
+    Hosts and switches are linked_to each other. Each intent is a node linked
+    from and to its hosts.
+
+    Args:
+        topology (Topology): The network.
+
+    Returns:
+        Tuple[GraphNodes, GraphEdges]: The graph's nodes and edges.
+    """
+    nodes = {}
+    for name, properties in topology.hosts.items():
+        nodes[name] = (("Host", "Node"), get_stored_properties(properties))
+    for name, properties in topology.switches.items():
+        nodes[name] = (("Switch", "Node"), get_stored_properties(properties))
+    edges = {}
+    for (src, dst), properties in topology.links.items():
+        edges[(src, "linked_to", dst)] = get_stored_properties(properties)
+    for (src, dst), properties in topology.intents.items():
+        name = properties["name"]
+        nodes[name] = (("Intent",), get_stored_properties(properties))
+        edges[(name, "from", src)] = {}
+        edges[(name, "to", dst)] = {}
+    return nodes, edges
+
+def get_changed_properties(old: Dict, new: Dict) -> Dict:
+    """ Get the properties that differ between two property sets. A removed property maps to None. """
+    return { key : new.get(key) for key in sorted(old.keys() | new.keys()) if old.get(key) != new.get(key) }
+
+@dataclass
+class GraphDiff:
+    """ The writes that make a stored graph match a topology. """
+    add_nodes: GraphNodes = field(default_factory=dict)
+    remove_nodes: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    """ Labels of removed nodes by name. Their edges are removed with them. """
+    update_nodes: GraphNodes = field(default_factory=dict)
+    """ Labels and changed properties of existing nodes. """
+    add_edges: GraphEdges = field(default_factory=dict)
+    remove_edges: List[EdgeKey] = field(default_factory=list)
+    update_edges: GraphEdges = field(default_factory=dict)
+    """ Changed properties of existing edges. """
+
+    def __bool__(self) -> bool:
+        return any([ self.add_nodes, self.remove_nodes, self.update_nodes,
+                     self.add_edges, self.remove_edges, self.update_edges ])
+
+    def __str__(self) -> str:
+        return f"nodes +{len(self.add_nodes)} -{len(self.remove_nodes)} ~{len(self.update_nodes)}, " + \
+            f"edges +{len(self.add_edges)} -{len(self.remove_edges)} ~{len(self.update_edges)}"
+
+def diff_graph(stored: Tuple[GraphNodes, GraphEdges], desired: Tuple[GraphNodes, GraphEdges]) -> GraphDiff:
+    """ Compute the writes that turn the stored graph into the desired one.
+
+    A node whose labels change is removed and added again, along with its edges.
+
+    Args:
+        stored (Tuple[GraphNodes, GraphEdges]): Nodes and edges in the graph.
+        desired (Tuple[GraphNodes, GraphEdges]): Nodes and edges it should have.
+
+    Returns:
+        GraphDiff: The additions, removals, and property changes.
+    """
+    stored_nodes, stored_edges = stored
+    nodes, edges = desired
+    diff = GraphDiff ()
+    for name, (labels, properties) in stored_nodes.items():
+        if name not in nodes or nodes[name][0] != labels:
+            diff.remove_nodes[name] = labels
+    for name, (labels, properties) in nodes.items():
+        if name not in stored_nodes or name in diff.remove_nodes:
+            diff.add_nodes[name] = (labels, properties)
+            continue
+        changed = get_changed_properties(stored_nodes[name][1], properties)
+        if changed:
+            diff.update_nodes[name] = (labels, changed)
+    for key, properties in stored_edges.items():
+        src, relation, dst = key
+        if src in diff.remove_nodes or dst in diff.remove_nodes:
+            """ Deleted with its node. """
+            continue
+        if key not in edges:
+            diff.remove_edges.append(key)
+            continue
+        changed = get_changed_properties(properties, edges[key])
+        if changed:
+            diff.update_edges[key] = changed
+    for key, properties in edges.items():
+        src, relation, dst = key
+        if key not in stored_edges or src in diff.remove_nodes or dst in diff.remove_nodes:
+            diff.add_edges[key] = properties
+    return diff
+
 class MidoriGraph:
     """ Interface to a graph database. To support experimentation with using
     Cypher as a DSL for manipulating data networks. """
     def __init__(self,
                  graph: str = config.get("redis", "graph"),
                  host: str = config.get("redis", "host"),
-                 port: int = config.getint("redis", "port")) -> None:
+                 port: int = config.getint("redis", "port"),
+                 batch_size: int = config.getint("redis", "batch_size"),
+                 pipeline: bool = config.getboolean("redis", "pipeline")) -> None:
         """ Initialze the graph.
+
+        Nodes and edges are buffered until commit. Commit writes them in chunks of
+        batch_size rows, one parameterized UNWIND query per chunk, so no single
+        query grows with the size of the topology.
         
         Args:
             graph (str): The name of the graph to create.
             host (str): The host Redis is on.
             port (int): The port Redis is listening on.
+            batch_size (int): Maximum nodes or edges written, or nodes deleted, per query.
+            pipeline (bool): Send all of a commit's queries in one round trip.
 
         """        
-        redis_client = redis.Redis(host=host, port=port)
-        self.graph = Graph(client=redis_client, name=graph)
+        self.client = redis.Redis(host=host, port=port)
+        self.graph = Graph(client=self.client, name=graph)
+        self.batch_size = batch_size
+        self.pipeline = pipeline
+        self.nodes: List[Node] = []
+        """ Nodes added since the last commit. """
+        self.edges: List[Edge] = []
+        """ Edges added since the last commit. """
+        self.indexed = set ()
+        """ Labels known to have an index on name. """
+        self.version = 0
+        """ Incremented whenever this object writes to the graph. """
+        self.results = {}
+        """ Prepared query results for the current version. """
 
     def add_node(self,
                  alias: str,
@@ -41,10 +205,10 @@ class MidoriGraph:
             properties (dict): Node properties. Values may be primitives or arrays.
             labels (list[str]): Labels describing the type of the node.
         Returns:
-            Returns a Redisgraph Node object.
+            Returns a Redisgraph Node object. Nodes are identified by name, which defaults to the alias.
         """
-        node = Node(alias=alias, label=labels, properties=properties)
-        self.graph.add_node(node)
+        node = Node(alias=alias, label=labels, properties={ "name" : alias, **properties })
+        self.nodes.append(node)
         return node
 
     def add_host(self, alias: str, properties: Dict = {}) -> Node:
@@ -66,25 +230,252 @@ class MidoriGraph:
                  properties: Dict = {}
     ) -> None:
         """ Create an edge linking subject and object via a predicate. """
-        edge = Edge(subject, predicate, object, properties)
-        self.graph.add_edge(edge)
+        edge = Edge(subject, predicate, object, properties=properties)
+        self.edges.append(edge)
         return edge
 
     def commit(self) -> None:
         """ Commit writes since the last commit.
         """
-        self.graph.commit ()
+        nodes, self.nodes = self.nodes, []
+        edges, self.edges = self.edges, []
+        queries = self._get_index_queries(nodes) + \
+            self._get_node_queries(nodes) + \
+            self._get_edge_queries(edges)
+        self._execute(queries)
+        if queries:
+            self._advance_version()
+
+    def read(self) -> Tuple[GraphNodes, GraphEdges]:
+        """ Read every node and edge in the graph.
+
+        Returns:
+            Tuple[GraphNodes, GraphEdges]: The graph's nodes and edges.
+        """
+        nodes = {}
+        for row in self.graph.query("MATCH (n) RETURN n", read_only=True).result_set:
+            node = row[0]
+            nodes[node.properties.get("name")] = (tuple(node.labels or []), node.properties)
+        edges = {}
+        query = "MATCH (a)-[e]->(b) RETURN a.name, type(e), b.name, e"
+        for src, relation, dst, edge in self.graph.query(query, read_only=True).result_set:
+            edges[(src, relation, dst)] = edge.properties
+        return nodes, edges
+
+    def sync(self, topology: Topology) -> GraphDiff:
+        """ Make the graph match a topology, writing only what differs.
+
+        The graph is read, compared to the topology, and the additions, removals,
+        and property changes are written in batches like commit. A job that
+        changes a few hosts of a large network writes a few rows instead of
+        deleting and recreating the whole graph.
+
+        Args:
+            topology (Topology): The network the graph should represent.
+
+        Returns:
+            GraphDiff: The changes written.
+        """
+        self.commit()
+        stored = self.read()
+        diff = diff_graph(stored, get_topology_graph(topology))
+        labels = { name : labels for name, (labels, properties) in stored[0].items() }
+        labels.update({ name : labels for name, (labels, properties) in diff.add_nodes.items() })
+        queries = self._get_edge_removal_queries(diff.remove_edges, labels) + \
+            self._get_node_removal_queries(diff.remove_nodes) + \
+            self._get_node_update_queries(diff.update_nodes)
+        nodes = [ Node(label=list(node_labels), properties=properties)
+                  for name, (node_labels, properties) in diff.add_nodes.items() ]
+        endpoints = { name : Node(label=list(node_labels), properties={ "name" : name })
+                      for name, node_labels in labels.items() }
+        edges = [ Edge(endpoints[src], relation, endpoints[dst], properties=properties)
+                  for (src, relation, dst), properties in diff.add_edges.items() ]
+        queries += self._get_index_queries(nodes) + \
+            self._get_node_queries(nodes) + \
+            self._get_edge_update_queries(diff.update_edges, labels) + \
+            self._get_edge_queries(edges)
+        self._execute(queries)
+        if queries:
+            self._advance_version()
+        logger.debug(f"synced graph: {diff}")
+        return diff
+
+    def _get_match_text(self, variable: str, labels: Tuple[str, ...], name: str) -> str:
+        """ Match a node by name on the label its index is on. """
+        label_text = f":{cypher_name(labels[0])}" if labels else ""
+        return f"({variable}{label_text} {{name: row.{name}}})"
+
+    def _get_set_text(self, variable: str, keys: Tuple[str, ...]) -> str:
+        """ Set properties from a row. Setting null removes a property. """
+        return ", ".join([ f"{variable}.{cypher_name(key)} = row.{cypher_name(key)}" for key in keys ])
 
-    def query(self, query: str) -> Any:
+    def _get_node_removal_queries(self, nodes: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, Dict]]:
+        """ Build queries deleting nodes, and with them their edges. """
+        groups = defaultdict(list)
+        for name, labels in nodes.items():
+            groups[labels[:1]].append({ "__name" : name })
+        queries = []
+        for labels, rows in groups.items():
+            query = f"UNWIND $rows AS row MATCH {self._get_match_text('n', labels, '__name')} DELETE n"
+            queries += [ (query, { "rows" : rows_chunk }) for rows_chunk in chunk(rows, self.batch_size) ]
+        return queries
+
+    def _get_node_update_queries(self, nodes: GraphNodes) -> List[Tuple[str, Dict]]:
+        """ Build queries setting changed node properties, grouped by label and keys. """
+        groups = defaultdict(list)
+        for name, (labels, properties) in nodes.items():
+            groups[(labels[:1], tuple(properties))].append({ "__name" : name, **properties })
+        queries = []
+        for (labels, keys), rows in groups.items():
+            query = f"UNWIND $rows AS row MATCH {self._get_match_text('n', labels, '__name')} " + \
+                f"SET {self._get_set_text('n', keys)}"
+            queries += [ (query, { "rows" : rows_chunk }) for rows_chunk in chunk(rows, self.batch_size) ]
+        return queries
+
+    def _get_edge_match_text(self, relation: str, src_labels: Tuple[str, ...], dst_labels: Tuple[str, ...]) -> str:
+        return f"MATCH {self._get_match_text('a', src_labels, '__src')}" + \
+            f"-[e:{cypher_name(relation)}]->{self._get_match_text('b', dst_labels, '__dst')}"
+
+    def _get_edge_removal_queries(self, edges: List[EdgeKey], labels: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, Dict]]:
+        """ Build queries deleting edges, grouped by endpoint labels and relation. """
+        groups = defaultdict(list)
+        for src, relation, dst in edges:
+            groups[(labels[src][:1], relation, labels[dst][:1])].append({ "__src" : src, "__dst" : dst })
+        queries = []
+        for (src_labels, relation, dst_labels), rows in groups.items():
+            query = f"UNWIND $rows AS row {self._get_edge_match_text(relation, src_labels, dst_labels)} DELETE e"
+            queries += [ (query, { "rows" : rows_chunk }) for rows_chunk in chunk(rows, self.batch_size) ]
+        return queries
+
+    def _get_edge_update_queries(self, edges: GraphEdges, labels: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, Dict]]:
+        """ Build queries setting changed edge properties, grouped by endpoint labels, relation, and keys. """
+        groups = defaultdict(list)
+        for (src, relation, dst), properties in edges.items():
+            key = (labels[src][:1], relation, labels[dst][:1], tuple(properties))
+            groups[key].append({ "__src" : src, "__dst" : dst, **properties })
+        queries = []
+        for (src_labels, relation, dst_labels, keys), rows in groups.items():
+            query = f"UNWIND $rows AS row {self._get_edge_match_text(relation, src_labels, dst_labels)} " + \
+                f"SET {self._get_set_text('e', keys)}"
+            queries += [ (query, { "rows" : rows_chunk }) for rows_chunk in chunk(rows, self.batch_size) ]
+        return queries
+
+    def _get_index_queries(self, nodes: List[Node]) -> List[Tuple[str, Dict]]:
+        """ Index the labels edges are matched on. """
+        labels = { node.label for node in nodes if node.label } - self.indexed
+        self.indexed |= labels
+        return [ (f"CREATE INDEX ON :{cypher_name(label)}(name)", None) for label in sorted(labels) ]
+
+    def _get_node_queries(self, nodes: List[Node]) -> List[Tuple[str, Dict]]:
+        """ Build queries creating nodes, grouped by labels and chunked. """
+        groups = defaultdict(list)
+        for node in nodes:
+            groups[tuple(node.labels or [])].append(node.properties)
+        queries = []
+        for labels, rows in groups.items():
+            keys = sorted({ key for row in rows for key in row })
+            label_text = "".join([ f":{cypher_name(label)}" for label in labels ])
+            property_text = ", ".join([ f"{cypher_name(key)}: row.{cypher_name(key)}" for key in keys ])
+            query = f"UNWIND $rows AS row CREATE (n{label_text} {{{property_text}}})"
+            queries += [ (query, { "rows" : rows_chunk }) for rows_chunk in chunk(rows, self.batch_size) ]
+        return queries
+
+    def _get_edge_queries(self, edges: List[Edge]) -> List[Tuple[str, Dict]]:
+        """ Build queries creating edges between existing nodes, grouped by
+        endpoint labels and relation and chunked. """
+        groups = defaultdict(list)
+        for edge in edges:
+            key = (edge.src_node.label, edge.relation, edge.dest_node.label)
+            groups[key].append({
+                "__src" : edge.src_node.properties["name"],
+                "__dst" : edge.dest_node.properties["name"],
+                **edge.properties
+            })
+        queries = []
+        for (src_label, relation, dst_label), rows in groups.items():
+            keys = sorted({ key for row in rows for key in row } - { "__src", "__dst" })
+            src_text = f":{cypher_name(src_label)}" if src_label else ""
+            dst_text = f":{cypher_name(dst_label)}" if dst_label else ""
+            property_text = ", ".join([ f"{cypher_name(key)}: row.{cypher_name(key)}" for key in keys ])
+            property_text = f" {{{property_text}}}" if property_text else ""
+            query = f"UNWIND $rows AS row " + \
+                f"MATCH (a{src_text} {{name: row.__src}}), (b{dst_text} {{name: row.__dst}}) " + \
+                f"CREATE (a)-[:{cypher_name(relation)}{property_text}]->(b)"
+            queries += [ (query, { "rows" : rows_chunk }) for rows_chunk in chunk(rows, self.batch_size) ]
+        return queries
+
+    def _execute(self, queries: List[Tuple[str, Dict]]) -> None:
+        """ Run write queries in order, pipelined if configured. """
+        if not queries:
+            return
+        if not self.pipeline:
+            for query, params in queries:
+                self._query_ignoring_existing_index(query, params)
+            return
+        pipeline = self.client.pipeline(transaction=False)
+        for query, params in queries:
+            text = get_params_header(params) + query if params else query
+            pipeline.execute_command("GRAPH.QUERY", self.graph.name, text, "--compact")
+        for (query, params), response in zip(queries, pipeline.execute(raise_on_error=False)):
+            if isinstance(response, Exception) and not self._is_existing_index(query, response):
+                raise response
+
+    def _query_ignoring_existing_index(self, query: str, params: Dict) -> None:
+        try:
+            self.graph.query(query, params)
+        except ResponseError as e:
+            if not self._is_existing_index(query, e):
+                raise
+
+    def _is_existing_index(self, query: str, error: Exception) -> bool:
+        return query.startswith("CREATE INDEX") and "already indexed" in str(error)
+
+    def query(self, query: str, params: Dict = None) -> Any:
         """ Query the database given a Cypher query. 
 
         Args:
             query (str): A cypher query.
+            params (dict): Values for parameters like $name in the query.
 
         Returns:
             Returns a query result binding to names in the input query.
         """
-        return self.graph.query(query)
+        return self.graph.query(query, params)
+
+    queries = {
+        "shortest_path" : """MATCH (src:Host {name: $src}), (dst:Host {name: $dst})
+            WITH src, dst
+            MATCH p=allShortestPaths((src)-[:linked_to*]->(dst))
+            RETURN nodes(p) as nodes""",
+        "neighbors" : """MATCH (n {name: $name})-[:linked_to]-(neighbor)
+            RETURN neighbor""",
+        "hosts_behind_switch" : """MATCH (switch:Switch {name: $switch})-[:linked_to]-(host:Host)
+            RETURN host"""
+    }
+    """ Prepared topology queries. Their text never changes, so Redis can reuse their plans. """
+
+    def run_query(self, name: str, params: Dict) -> Any:
+        """ Run a prepared read query, reusing its result until the graph is next written.
+
+        Results are cached by graph version, which advances on every commit and
+        clean by this object. Writes by other clients are not seen until then.
+
+        Args:
+            name (str): The name of a query in queries.
+            params (dict): The query's parameters.
+
+        Returns:
+            Returns the query result.
+        """
+        key = (name, tuple(sorted(params.items())))
+        if key not in self.results:
+            self.results[key] = self.graph.query(self.queries[name], params, read_only=True)
+        return self.results[key]
+
+    def _advance_version(self) -> None:
+        """ Record that the graph changed, discarding cached query results. """
+        self.version += 1
+        self.results = {}
 
     def get_shortest_path(self, src: str, dst: str) -> Any:
         """ Find the shortest path between two nodes where the names correspond to the input values.
@@ -96,15 +487,35 @@ class MidoriGraph:
         Returns:
             Returns the result of a shortest path query.
         """
-        query = Template(
-            """MATCH (src:Host {name: "$src_name"}), (dst:Host {name: "$dst_name"})
-            WITH src, dst
-            MATCH p=allShortestPaths((src)-[link:visited*]->(dst))
-            RETURN nodes(p) as nodes""").safe_substitute ({
-                "src_name" : src,
-                "dst_name" : dst
-            })
-        return self.graph.query(query)
+        return self.run_query("shortest_path", { "src" : src, "dst" : dst })
+
+    def get_neighbors(self, name: str) -> Any:
+        """ Find the hosts and switches linked to a node.
+
+        Args:
+            name (str): The name of the node.
+
+        Returns:
+            Returns the result of a neighbors query.
+        """
+        return self.run_query("neighbors", { "name" : name })
+
+    def get_hosts_behind_switch(self, switch: str) -> Any:
+        """ Find the hosts linked to a switch.
+
+        Args:
+            switch (str): The name of the switch.
+
+        Returns:
+            Returns the result of a hosts query.
+        """
+        return self.run_query("hosts_behind_switch", { "switch" : switch })
 
     def clean(self) -> None:
-        self.query("MATCH (n) DELETE n")
+        """ Delete every node, and with them every edge, batch_size nodes at a time. """
+        self.nodes, self.edges = [], []
+        self._advance_version()
+        while True:
+            result = self.query(f"MATCH (n) WITH n LIMIT {int(self.batch_size)} DELETE n")
+            if result.nodes_deleted < self.batch_size:
+                break
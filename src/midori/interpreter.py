@@ -0,0 +1,264 @@
+import importlib
+import logging
+import time
+from midori.parser import (
+    Program, Controller, RemoteController, Host, Switch, Link, Intent,
+    Up, Down, Ping, Sleep
+)
+from midori.config import get_config
+from midori.runtime import Context, Node, MidoriException
+from midori.topology import Topology, TopologyDiff, diff_topology, get_container
+from midori.utils import LoggingUtil
+from typing import Dict, Iterable, List
+
+LoggingUtil.setup_logging ()
+
+logger = logging.getLogger (__name__)
+
+config = get_config ()
+
+class Interpreter:
+    """ Executes a Midori program by walking its abstract syntax tree and
+    calling the runtime context directly. This does the same work as the code
+    generated from network.jinja2 without rendering or executing Python. """
+    def __init__(self, context: Context,
+                 batch_containers: bool = config.getboolean("runtime", "batch_containers"),
+                 stream_batch_size: int = config.getint("runtime", "stream_batch_size")
+    ) -> None:
+        """ Initialize the interpreter.
+
+        Args:
+            context (Context): The execution context the program runs in.
+            batch_containers (bool): Create hosts declared before up together via
+            Context.add_containers instead of one at a time.
+            stream_batch_size (int): Most consecutive hosts created together by run_stream.
+        """
+        self.context = context
+        self.batch_containers = batch_containers
+        self.stream_batch_size = stream_batch_size
+        self.nodes: Dict[str, Node] = {}
+        """ Runtime nodes (hosts and switches) by name. """
+        self.hosts: Dict[str, Host] = {}
+        """ Host statements by name, in declaration order. """
+        self.program: Program = None
+        """ The program the network was built from. """
+        self.running = False
+        """ Whether the network has been started and not stopped. """
+
+    def info(self, message: str) -> None:
+        """ Write an informational message.
+
+        Args:
+            message (str): A string message to write.
+        """
+        self.context.log(message)
+
+    def run(self, program: Program) -> None:
+        """ Execute each statement of a program in order.
+
+        Args:
+            program (Program): The program's abstract syntax tree.
+        """
+        if self.batch_containers:
+            self.add_hosts(self.get_hosts_before_up(program))
+        self.program = program
+        for statement in program.statements:
+            self.execute(statement)
+        self.context.flush_intents()
+
+    def run_stream(self, statements: Iterable) -> None:
+        """ Execute statements as they arrive, for example from Parser.parse_stream.
+
+        Only the statement being executed and up to stream_batch_size hosts are
+        held. Consecutive hosts declared before up are created together. A network
+        run from a stream can not be reconfigured.
+
+        Args:
+            statements (Iterable): The program's statements in order.
+        """
+        self.program = None
+        hosts = []
+        for statement in statements:
+            if self.batch_containers and isinstance(statement, Host) and not self.running:
+                hosts.append(statement)
+                if len(hosts) >= self.stream_batch_size:
+                    self.add_hosts(hosts)
+                    hosts = []
+                continue
+            if hosts:
+                self.add_hosts(hosts)
+                hosts = []
+            self.execute(statement)
+        if hosts:
+            self.add_hosts(hosts)
+        self.context.flush_intents()
+
+    def reconfigure(self, program: Program) -> TopologyDiff:
+        """ Change the network into the one a new program declares, without restarting it.
+
+        The topologies of the current and new programs are compared. Only hosts,
+        switches, links, and intents that differ are removed or added; a changed
+        one is removed and added again. The new program's pings, sleeps, and
+        down then run.
+
+        Args:
+            program (Program): The new program's abstract syntax tree.
+
+        Returns:
+            TopologyDiff: The changes made.
+        """
+        if not self.program:
+            raise MidoriException("the running network was not built from a whole program")
+        diff = diff_topology(Topology.from_program(self.program), Topology.from_program(program))
+        self.info(f"** Reconfiguring running network: {diff}\n")
+        hosts = { s.name : s for s in program.statements if isinstance(s, Host) }
+        links = { (s.src, s.dst) : s for s in program.statements if isinstance(s, Link) }
+
+        for source, dest in diff.remove_intents:
+            self.context.remove_host2host_intent(
+                src=self.get_node(source), src_mac=self.get_host(source).mac,
+                dst=self.get_node(dest), dst_mac=self.get_host(dest).mac)
+        for src, dst in diff.remove_links:
+            self.context.remove_link(self.get_node(src), self.get_node(dst))
+        for name in diff.remove_hosts:
+            self.context.remove_container(self.nodes.pop(name))
+            del self.hosts[name]
+        for name in diff.remove_switches:
+            self.context.remove_switch(self.nodes.pop(name))
+
+        for name in diff.add_switches:
+            self.nodes[name] = self.context.add_switch(name=name)
+        self.add_hosts([ hosts[name] for name in diff.add_hosts ])
+        added_links = [ self.visit_Link(links[key]) for key in diff.add_links ]
+        if self.running:
+            self.context.start_added(
+                switches=[ self.nodes[name] for name in diff.add_switches ],
+                hosts=[ self.nodes[name] for name in diff.add_hosts ],
+                links=[ link for link in added_links if link ])
+            for name in diff.add_hosts:
+                for command in self.hosts[name].cmd:
+                    self.nodes[name].node.cmd(command)
+        for source, dest in diff.add_intents:
+            self.add_intent(source, dest)
+        self.context.flush_intents()
+        self.context.commit()
+
+        self.program = program
+        for statement in self.get_actions(program):
+            self.execute(statement)
+        return diff
+
+    def get_actions(self, program: Program) -> List[object]:
+        """ Get the pings, sleeps, and down that follow up in a program. """
+        statements = program.statements
+        up = next((i for i, s in enumerate(statements) if isinstance(s, Up)), len(statements))
+        return [ s for s in statements[up + 1:] if isinstance(s, (Ping, Sleep, Down)) ]
+
+    def get_hosts_before_up(self, program: Program) -> List[Host]:
+        """ Get the hosts declared before the network is started. """
+        hosts = []
+        for statement in program.statements:
+            if isinstance(statement, Up):
+                break
+            if isinstance(statement, Host):
+                hosts.append(statement)
+        return hosts
+
+    def add_hosts(self, statements: List[Host]) -> None:
+        """ Create containers for several hosts at once. """
+        containers = [ get_container(statement) for statement in statements ]
+        for statement, node in zip(statements, self.context.add_containers(containers)):
+            self.nodes[statement.name] = node
+            self.hosts[statement.name] = statement
+
+    def execute(self, statement: object) -> None:
+        """ Execute one statement.
+
+        Args:
+            statement (object): A statement from the abstract syntax tree.
+        """
+        visitor = getattr(self, f"visit_{statement.__class__.__name__}", None)
+        if not visitor:
+            raise MidoriException(f"unmatched token: {statement}")
+        visitor(statement)
+
+    def get_node(self, name: str) -> Node:
+        """ Get a host or switch declared earlier in the program. """
+        if name not in self.nodes:
+            raise MidoriException(f"reference to undeclared host or switch: {name}")
+        return self.nodes[name]
+
+    def get_host(self, name: str) -> Host:
+        """ Get the statement declaring a host. """
+        if name not in self.hosts:
+            raise MidoriException(f"reference to undeclared host: {name}")
+        return self.hosts[name]
+
+    def get_link_class(self, name: str) -> type:
+        """ Resolve a link class name like TCLink to the Mininet class. """
+        module = importlib.import_module("mininet.link")
+        return getattr(module, name)
+
+    def visit_Controller(self, statement: Controller) -> None:
+        self.info(f"*** Using the context's controller for: {statement.name}\n")
+
+    def visit_RemoteController(self, statement: RemoteController) -> None:
+        self.info(f"*** Using the context's controller for: {statement.name}\n")
+
+    def visit_Host(self, statement: Host) -> None:
+        if self.hosts.get(statement.name) is statement:
+            """ Already created by add_hosts. """
+            return
+        self.nodes[statement.name] = self.context.add_container(
+            **get_container(statement))
+        self.hosts[statement.name] = statement
+
+    def visit_Switch(self, statement: Switch) -> None:
+        for name in statement.name:
+            self.nodes[name] = self.context.add_switch(name=name)
+
+    def visit_Link(self, statement: Link) -> object:
+        return self.context.add_link(
+            src=self.get_node(statement.src),
+            dst=self.get_node(statement.dst),
+            port1=statement.port1 if statement.port1 else None,
+            port2=statement.port2 if statement.port2 else None,
+            cls=self.get_link_class(statement.cls) if statement.cls else None,
+            delay=statement.delay if statement.delay else None,
+            bw=int(statement.bw) if statement.bw else None)
+
+    def visit_Intent(self, statement: Intent) -> None:
+        """ Currently, only host to host intents are supported. """
+        for source, dest in zip(statement.name, statement.name[1:]):
+            self.add_intent(source, dest)
+
+    def add_intent(self, source: str, dest: str) -> None:
+        """ Add an intent between two hosts. """
+        self.context.add_host2host_intent(
+            src=self.get_node(source), src_mac=self.get_host(source).mac,
+            dst=self.get_node(dest), dst_mac=self.get_host(dest).mac)
+
+    def visit_Up(self, statement: Up) -> None:
+        self.context.flush_intents()
+        self.info(f"** Committing property graph model.\n")
+        self.context.commit()
+        self.info(f"** Starting Containernet simulation network.\n")
+        self.context.start()
+        self.running = True
+        for host in self.hosts.values():
+            self.info(f"** Executing container initialization commands.\n")
+            for command in host.cmd:
+                self.nodes[host.name].node.cmd(command)
+
+    def visit_Ping(self, statement: Ping) -> None:
+        self.info(f"** Pinging hosts: {statement.name}\n")
+        self.context.net.ping([ self.get_node(name).node for name in statement.name ])
+
+    def visit_Sleep(self, statement: Sleep) -> None:
+        self.info(f"** Sleeping {statement.seconds} seconds.\n")
+        time.sleep(statement.seconds)
+
+    def visit_Down(self, statement: Down) -> None:
+        self.info(f"** Stopping Containernet simulation.\n")
+        self.context.stop()
+        self.running = False
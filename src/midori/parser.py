@@ -1,63 +1,118 @@
+import argparse
+import contextvars
+import hashlib
+import inspect
+import itertools
 import logging
-import random
+import os
+import re
 import ipaddress
 import sys
-from dataclasses import dataclass, field
-from lark import Lark, ast_utils, Transformer, v_args
-from lark.tree import Meta
-from midori.utils import LoggingUtil, Resource
-from typing import List, Optional
+from dataclasses import dataclass, field, fields
+from lark import Lark, Token, Transformer, v_args
+from lark.exceptions import UnexpectedEOF, UnexpectedInput, UnexpectedToken
+from midori.config import get_config
+from midori.utils import LoggingUtil
+from typing import Iterator, List, NamedTuple, Optional, TextIO, Union
 
 LoggingUtil.setup_logging ()
 
 logger = logging.getLogger (__name__)
 
+config = get_config ()
+
 this_module = sys.modules[__name__]
 
 #
 #   Define AST
 #
-class _Ast(ast_utils.Ast):
-    # This will be skipped by create_transformer(), because it starts with an underscore
-    pass
+#   AST classes are slotted dataclasses. Instances have no __dict__, so a program
+#   with many statements costs a few pointers per field. Each class is built from
+#   the grammar rule of the same name in snake case, unless ToAst defines the rule.
+#
+class Position(NamedTuple):
+    """ Where a statement begins in the program's source. """
+    line: int
+    column: int
 
-class _Statement(_Ast):
-    # This will be skipped by create_transformer(), because it starts with an underscore
-    pass
+class _Ast:
+    # This will be skipped when the transformer is built, because it starts with an underscore
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, children: list) -> "_Ast":
+        """ Create a node from the children of its grammar rule. """
+        return cls(children) if issubclass(cls, _AsList) else cls(*children)
+
+class _AsList:
+    """ Nodes of subclasses are created with their rule's children as a single list. """
+    __slots__ = ()
 
-@dataclass
-class Value(_Ast, ast_utils.WithMeta):
-    "Uses WithMeta to include line-number metadata in the meta attribute"
-    meta: Meta
+class _Statement(_Ast):
+    # This will be skipped when the transformer is built, because it starts with an underscore
+    __slots__ = ("_line", "_column")
+
+    @classmethod
+    def build(cls, children: list) -> "_Statement":
+        """ Create a statement, keeping the line and column of its keyword. """
+        keyword = children[0] if children and isinstance(children[0], Token) else None
+        if keyword is not None and keyword.type in statement_keywords:
+            children = children[1:]
+        statement = cls(children) if issubclass(cls, _AsList) else cls(*children)
+        if keyword is not None:
+            statement._line = keyword.line
+            statement._column = keyword.column
+        return statement
+
+    @property
+    def meta(self) -> Optional[Position]:
+        """ Where the statement begins in the source, or None if it was not parsed.
+        The position is created when it is asked for. """
+        line = getattr(self, "_line", None)
+        return Position(line, self._column) if line is not None else None
+
+    def __reduce__(self) -> tuple:
+        """ Keep the position when a statement is pickled, as in the compile cache. """
+        values = tuple(getattr(self, f.name) for f in fields(self))
+        return (_restore_statement, (self.__class__, values, self.meta))
+
+def _restore_statement(cls: type, values: tuple, position: Optional[Position]) -> _Statement:
+    statement = cls(*values)
+    if position:
+        statement._line, statement._column = position
+    return statement
+
+@dataclass(slots=True)
+class Value(_Ast):
     value: object
 
-@dataclass
+@dataclass(slots=True)
 class Name(_Ast):
     name: str
 
-@dataclass
-class Program(_Ast, ast_utils.AsList):
+@dataclass(slots=True)
+class Program(_Ast, _AsList):
     # Corresponds to code_block in the grammar
     statements: List[_Statement]
 
-@dataclass
+@dataclass(slots=True)
 class Controller(_Statement):
     name: Name
 
-@dataclass
+@dataclass(slots=True)
 class RemoteController(Controller):
     host: Name
     port: Value
     
-@dataclass
+@dataclass(slots=True)
 class IPAddr(Value):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Image(Value):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Host(_Statement):
     name: Name
     ip_addr: Value
@@ -67,12 +122,15 @@ class Host(_Statement):
     port_bindings: Optional[Value] = field(default_factory=list)
     env: Optional[Value] = field(default_factory=dict)
     cmd: Optional[Value] = None
+    generated_mac: bool = field(default=False, repr=False)
+    """ Whether the MAC address was allocated rather than given by the program. The
+    runtime moves allocated addresses into each simulation's block. """
 
-@dataclass
-class Switch(_Statement, ast_utils.AsList):
+@dataclass(slots=True)
+class Switch(_Statement, _AsList):
     name: List[Name]
     
-@dataclass
+@dataclass(slots=True)
 class Link(_Statement):
     name: Value
     src: Value
@@ -83,23 +141,23 @@ class Link(_Statement):
     delay: Optional[Value] = None
     bw: Optional[Value] = None
 
-@dataclass
-class Intent(_Statement, ast_utils.AsList):
+@dataclass(slots=True)
+class Intent(_Statement, _AsList):
     name: List[Name]
 
-@dataclass
-class Up(_Ast):
+@dataclass(slots=True)
+class Up(_Statement):
     pass
 
-@dataclass
-class Down(_Ast):
+@dataclass(slots=True)
+class Down(_Statement):
     pass
 
-@dataclass
-class Ping(_Statement, ast_utils.AsList):
+@dataclass(slots=True)
+class Ping(_Statement, _AsList):
     name: List[Name]
 
-@dataclass
+@dataclass(slots=True)
 class Sleep(_Statement):
     seconds: Value
     
@@ -117,6 +175,12 @@ class ToAst(Transformer):
     def start(self, x):
         return x
 
+    def program(self, statements):
+        """ Fill in defaults as the program is built, in the same pass. """
+        defaults = current_defaults.get() or Defaults ()
+        defaults.reserve(statements)
+        return Program([ defaults.fill(statement) for statement in statements ])
+
     def NAME(self, item):
         return item.value
     
@@ -143,53 +207,158 @@ class ToAst(Transformer):
     def int_object(self, items):
         return items
 
+def parse_mac(address: str) -> Optional[int]:
+    """ Get a MAC address as an integer, or None if it is not valid. """
+    try:
+        value = int(re.sub(r"[:-]", "", address), 16)
+    except ValueError:
+        return None
+    return value if value >> 48 == 0 else None
+
+def format_mac(value: int) -> str:
+    """ Write an integer as a MAC address, like 02:00:00:00:00:01. """
+    text = f"{value:012x}"
+    return ":".join([ text[i:i + 2] for i in range(0, 12, 2) ])
+
 class MACGenerator:
-    """ Generate sequentially increasing MAC addresses. """
-    def __init__(self) -> None:
-        """ Initialize all address positions to zeros. """
-        self.seed = [ 0, 0, 0, 0, 0, 0 ]
-        self.cell = len(self.seed) - 1
-        
+    """ Allocates MAC addresses under a prefix, in order. Each program gets its
+    own generator, so a program is given the same addresses each time it is
+    compiled. The runtime moves them into a block of addresses for each
+    simulation, so simulations do not share them. Addresses given to hosts
+    explicitly are reserved and skipped. """
+    def __init__(self, prefix: str = config.get("compiler", "mac_prefix")) -> None:
+        """ Initialize the prefix.
+
+        Args:
+            prefix (str): Leading octets of every address, like 02:00:00. The
+            addresses are unicast, and locally administered if the prefix's first
+            octet has the 0x02 bit set.
+        """
+        octets = bytes([ int(octet, 16) for octet in re.split(r"[:-]", prefix) ]) if prefix else b""
+        if len(octets) > 5:
+            raise ValueError(f"MAC address prefix {prefix} leaves no addresses")
+        if octets and octets[0] & 1:
+            raise ValueError(f"MAC address prefix {prefix} is multicast")
+        self.bits = 48 - 8 * len(octets)
+        """ Bits of each address after the prefix. """
+        self.prefix = int.from_bytes(octets, "big") << self.bits
+        self.counter = itertools.count(1)
+        """ Address suffixes. """
+        self.reserved = set()
+        """ Addresses assigned explicitly, as integers. """
+
     def next(self) -> str:
-        """ Generate the next MAC address. 
+        """ Generate the next MAC address that is not reserved.
 
         Returns:
            str: Returns the next MAC address.
         """
-        if self.seed[self.cell] >= 255:
-            if self.cell == 0:
+        while True:
+            suffix = next(self.counter)
+            if suffix >> self.bits:
                 raise ValueError("MAC address range exceeded")
-            else:
-                self.cell -= 1
-        self.seed[self.cell] += 1
-        return "%02x:%02x:%02x:%02x:%02x:%02x" % tuple(self.seed)
-            
+            value = self.prefix | suffix
+            if value not in self.reserved:
+                return format_mac(value)
+
+    def reserve(self, address: str) -> bool:
+        """ Keep an address assigned explicitly from being generated.
+
+        Args:
+            address (str): A MAC address. Addresses that are not valid are ignored.
+
+        Returns:
+            bool: False if the address was already reserved.
+        """
+        value = parse_mac(address)
+        if value is None:
+            return True
+        if value in self.reserved:
+            return False
+        self.reserved.add(value)
+        return True
+
 class IPGenerator:
-    """ Generates IP addresses in a range. """
-    def __init__(self, cidr: str="10.0.0.0/24") -> None:
-        """ Initialize the set with a CIDR. 
-        
+    """ Allocates IP addresses from one or more ranges, in order.
+
+    Addresses are computed from a counter rather than listed, so a range costs
+    the same however large it is. Addresses given to hosts explicitly are
+    reserved and skipped. """
+    def __init__(self, cidrs: Union[str, List[str]] = config.get("compiler", "ip_ranges").split()) -> None:
+        """ Initialize the ranges.
+
         Args:
-            cidr (str): An IP address range in CIDR notation.
+            cidrs (Union[str, List[str]]): IPv4 or IPv6 ranges in CIDR notation. The
+            network address, and the broadcast address of an IPv4 range, are not used.
         """
-        self.pool = [ str(ip) for ip in ipaddress.IPv4Network(cidr) ]
-        self.index = 0
-        
+        self.ranges = []
+        """ Version, first address, and last address of each range, as integers. """
+        for cidr in [ cidrs ] if isinstance(cidrs, str) else cidrs:
+            network = ipaddress.ip_network(cidr, strict=False)
+            first, last = int(network.network_address), int(network.broadcast_address)
+            if network.num_addresses > 2:
+                first += 1
+                last -= 1 if network.version == 4 else 0
+            self.ranges.append((network.version, first, last))
+        if not self.ranges:
+            raise ValueError("No IP address ranges are configured.")
+        self.current = 0
+        """ Index of the range addresses are allocated from. """
+        self.address = self.ranges[0][1]
+        """ The next address to allocate in the current range. """
+        self.reserved = { 4 : set(), 6 : set() }
+        """ Addresses assigned explicitly, by IP version. """
+
     def next(self) -> str:
-        """ Get the next address. 
+        """ Get the next address that is not reserved.
 
         Returns:
-            str: An IP address. 
+            str: An IP address.
         """
-        self.index += 1
-        if self.index >= len(self.pool):
-            raise ValueError("The pool of random IP addresses has been exhausted.")
-        return self.pool[self.index]
+        while self.current < len(self.ranges):
+            version, first, last = self.ranges[self.current]
+            if self.address > last:
+                self.current += 1
+                if self.current < len(self.ranges):
+                    self.address = self.ranges[self.current][1]
+                continue
+            address = self.address
+            self.address += 1
+            if address not in self.reserved[version]:
+                return str(ipaddress.IPv4Address(address) if version == 4 else ipaddress.IPv6Address(address))
+        raise ValueError("The ranges of IP addresses have been exhausted.")
+
+    def reserve(self, address: str) -> bool:
+        """ Keep an address assigned explicitly from being allocated.
+
+        Args:
+            address (str): An IP address, optionally with a prefix length. Addresses
+            that are not valid are ignored.
+
+        Returns:
+            bool: False if the address was already reserved or allocated.
+        """
+        try:
+            ip = ipaddress.ip_interface(address).ip
+        except ValueError:
+            return True
+        value = int(ip)
+        if value in self.reserved[ip.version] or self.is_allocated(ip.version, value):
+            return False
+        self.reserved[ip.version].add(value)
+        return True
+
+    def is_allocated(self, version: int, value: int) -> bool:
+        """ Determine whether next has returned an address, from the ranges it has passed. """
+        for index, (range_version, first, last) in enumerate(self.ranges[:self.current + 1]):
+            if range_version == version and first <= value <= last:
+                return index < self.current or value < self.address
+        return False
 
 #
 #   Define the Midori language's grammar productions.
 #
-parser = Lark("""
+grammar = """
     start: program
 
     program: statement+
@@ -197,28 +366,28 @@ parser = Lark("""
     ?statement: control | host | switch | link | intent | up | ping | sleep | down
 
     ?control: controller | remote_controller
-    controller: "controller" NAME
-    remote_controller: "remote_controller" NAME "host" STRING "port" DEC_NUMBER
+    controller: CONTROLLER NAME
+    remote_controller: REMOTE_CONTROLLER NAME "host" STRING "port" DEC_NUMBER
 
-    host: "host" NAME ["ip" ip_addr] "image" STRING ["mac" STRING] \
+    host: HOST NAME ["ip" ip_addr] "image" STRING ["mac" STRING] \
            ["ports" array] ["port_bindings" int_object] ["env" object] \
            ["cmd" array]
 
-    sleep: "sleep" DEC_NUMBER
-    switch: "switch" NAME+
+    sleep: SLEEP DEC_NUMBER
+    switch: SWITCH NAME+
     cls: "cls" NAME
     delay: "delay" STRING
     bw: "bw" DEC_NUMBER
 
-    link: "link" NAME "src" NAME "dst" NAME \
+    link: LINK NAME "src" NAME "dst" NAME \
            ["port1" DEC_NUMBER] ["port2" DEC_NUMBER] \
            ["cls" NAME ] ["delay" STRING] ["bw" DEC_NUMBER]
 
-    ?intent: "intent" NAME "->" NAME ("->" NAME)* 
+    ?intent: INTENT NAME "->" NAME ("->" NAME)* 
 
-    up: "up"
-    ping: "ping" NAME+
-    down: "down"
+    up: UP
+    ping: PING NAME+
+    down: DOWN
 
     value: name | STRING | DEC_NUMBER
     name: NAME
@@ -233,6 +402,17 @@ parser = Lark("""
 
     string : ESCAPED_STRING
 
+    CONTROLLER: "controller"
+    REMOTE_CONTROLLER: "remote_controller"
+    HOST: "host"
+    SWITCH: "switch"
+    LINK: "link"
+    INTENT: "intent"
+    UP: "up"
+    PING: "ping"
+    SLEEP: "sleep"
+    DOWN: "down"
+
     COMMENT: /#.*/
 
     %import common.ESCAPED_STRING
@@ -240,31 +420,259 @@ parser = Lark("""
     %import common.WS
     %ignore WS
     %ignore COMMENT
-    """,
-    parser="lalr",
-)
+    """
+
+statement_keywords = { "CONTROLLER", "REMOTE_CONTROLLER", "HOST", "SWITCH", "LINK",
+                       "INTENT", "UP", "PING", "SLEEP", "DOWN" }
+""" Terminals that begin a statement. They are kept as the first child of the
+statement's rule to give its position, and are not part of the statement. """
+
+grammar_version = hashlib.sha256 (grammar.encode ()).hexdigest ()
+""" Identifies the grammar. Changes whenever the grammar's text changes. """
+
+def get_defaults_version() -> str:
+    """ Identifies the settings Defaults allocates addresses from. Changes whenever
+    the IP ranges or the MAC prefix do, since they are built into the AST. """
+    settings = [ config.get("compiler", "ip_ranges"), config.get("compiler", "mac_prefix") ]
+    return hashlib.sha256("\0".join(settings).encode()).hexdigest()
+
+def get_parser_cache_path() -> str:
+    """ Get the file the parser's tables are cached in. Defaults to the package directory. """
+    return config.get("compiler", "parser_cache_path") or \
+        os.path.join(os.path.dirname(__file__), "midori.lark.cache")
+
+_parser: Lark = None
+_transformer: Transformer = None
+
+def get_parser(cache: bool = config.getboolean("compiler", "cache_parser")) -> Lark:
+    """ Get the LALR parser, building it on first use.
+
+    The parser applies the transformer as it reduces each rule, so parsing returns
+    the abstract syntax tree, with defaults filled, without building a parse tree.
+
+    Building the parser's tables from the grammar is most of the cost of parsing
+    a small program. With cache, the tables are loaded from the parser cache file.
+    Lark rebuilds and rewrites the file if the grammar, Lark, or Python changed.
+
+    Args:
+        cache (bool): Use the parser cache file.
+
+    Returns:
+        Lark: The parser.
+    """
+    global _parser
+    if not _parser:
+        if cache:
+            try:
+                _parser = Lark(grammar, parser="lalr", transformer=get_transformer(),
+                               cache=get_parser_cache_path())
+            except OSError as e:
+                logger.warning(f"Parser cache {get_parser_cache_path()} is not writable: {e}")
+        if not _parser:
+            _parser = Lark(grammar, parser="lalr", transformer=get_transformer())
+    return _parser
+
+def get_transformer() -> Transformer:
+    """ Build the abstract syntax tree with a transformer created on first use. """
+    global _transformer
+    if not _transformer:
+        transformer = ToAst ()
+        for name, cls in inspect.getmembers(this_module, inspect.isclass):
+            if issubclass(cls, _Ast) and not name.startswith("_"):
+                rule = re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+                if not hasattr(transformer, rule):
+                    setattr(transformer, rule, cls.build)
+        _transformer = transformer
+    return _transformer
+
+def build_parser(path: str = None) -> str:
+    """ Generate the parser cache file, replacing any existing one. Run when
+    installing, so the first parse in each process only loads the tables.
+
+    Args:
+        path (str): The cache file. Defaults to the configured parser cache.
+
+    Returns:
+        str: The cache file's path.
+    """
+    path = path if path else get_parser_cache_path()
+    if os.path.exists(path):
+        os.remove(path)
+    Lark(grammar, parser="lalr", cache=path)
+    return path
+
+def __getattr__(name: str) -> object:
+    """ Build the module's parser and transformer when they are first accessed. """
+    if name == "parser":
+        return get_parser()
+    if name == "transformer":
+        return get_transformer()
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
+current_defaults = contextvars.ContextVar("current_defaults", default=None)
+""" Defaults shared by the chunks of a streamed program. Otherwise each program gets its own. """
+
+class Defaults:
+    """ Sets the values a program leaves out of its statements. Addresses are
+    allocated in declaration order, skipping those reserved by hosts that set
+    their own. A streamed program reserves each chunk's addresses as it is
+    parsed, so it gets the same values as the whole program unless a host sets
+    an address that an earlier chunk was already given.
+
+    Given the program a running network was built from, a host that leaves out
+    its addresses keeps those of the host of the same name, unless another host
+    sets them. Reconfiguring the network then leaves the host in place. """
+    def __init__(self, previous: Program = None) -> None:
+        """ Initialize the address generators.
+
+        Args:
+            previous (Program): The program of the network being reconfigured, if any.
+        """
+        self.ip_generator = IPGenerator (config.get("compiler", "ip_ranges").split())
+        self.mac_generator = MACGenerator (config.get("compiler", "mac_prefix"))
+        self.previous = { s.name : s for s in previous.statements if isinstance(s, Host) } if previous else {}
+        self.kept = {}
+        """ IP and MAC addresses hosts keep from the previous program, and whether the
+        MAC was allocated, by host name. """
+
+    def reserve(self, statements: List[_Ast]) -> None:
+        """ Reserve the addresses hosts set explicitly, warning of any already in use,
+        then those hosts keep from the previous program.
 
-""" Use Lark tools to build the abstract syntax tree. """
-transformer = ast_utils.create_transformer(this_module, ToAst())
+        Args:
+            statements (List[_Ast]): Statements about to be filled.
+        """
+        hosts = [ s for s in statements if isinstance(s, Host) ]
+        for host in hosts:
+            if host.ip_addr and not self.ip_generator.reserve(host.ip_addr):
+                logger.warning(f"IP address {host.ip_addr} of host {host.name} is already in use")
+            if host.mac and not self.mac_generator.reserve(host.mac):
+                logger.warning(f"MAC address {host.mac} of host {host.name} is already in use")
+        for host in hosts:
+            previous = self.previous.get(host.name)
+            if previous:
+                ip = previous.ip_addr if not host.ip_addr and self.ip_generator.reserve(previous.ip_addr) else None
+                mac = previous.mac if not host.mac and self.mac_generator.reserve(previous.mac) else None
+                self.kept[host.name] = (ip, mac, previous.generated_mac)
+
+    def fill(self, statement: _Ast) -> _Ast:
+        """ Set a statement's missing values.
+
+        Args:
+            statement (_Ast): A statement. Only hosts have defaults.
+
+        Returns:
+            _Ast: The statement.
+        """
+        if isinstance(statement, Host):
+            ip, mac, generated_mac = self.kept.pop(statement.name, (None, None, False))
+            statement.ip_addr = statement.ip_addr or ip or self.ip_generator.next()
+            statement.cmd = statement.cmd if statement.cmd else []
+            if not statement.mac:
+                statement.mac, statement.generated_mac = (mac, generated_mac) if mac else (self.mac_generator.next(), True)
+            statement.env = statement.env if statement.env else []
+            statement.ports = statement.ports if statement.ports else []
+            statement.port_bindings = statement.port_bindings if statement.port_bindings else []
+        return statement
+
+statement_start = re.compile(
+    r"\s*(controller|remote_controller|switch|link|intent|up|ping|sleep|down)\b|\s*host\s+[^\W\d]")
+""" Matches a line that begins a statement. Statement keywords are reserved, and
+a host statement's name is not a string like the host of a remote controller. """
 
 class Parser:
     """ The parser performs lexixal analysis, executes gammar productions,
     and generates the abstract syntax tree. """
-    def parse(self, text: str) -> Program:
-        tree = parser.parse(text)
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug(tree.pretty())
-        ast = transformer.transform(tree)
-        """ Until we have a better way to ensure default values are set... """
-        if ast:
-            ip_generator = IPGenerator ()
-            mac_generator = MACGenerator ()
-            for statement in ast.statements:
-                if isinstance(statement, Host):
-                    statement.ip_addr = statement.ip_addr if statement.ip_addr else ip_generator.next()
-                    statement.cmd = statement.cmd if statement.cmd else []
-                    statement.mac = statement.mac if statement.mac else mac_generator.next()
-                    statement.env = statement.env if statement.env else []
-                    statement.ports = statement.ports if statement.ports else []
-                    statement.port_bindings = statement.port_bindings if statement.port_bindings else []
-        return ast
+    def parse(self, text: str, defaults: Defaults = None) -> Program:
+        """ Parse a program's source into its abstract syntax tree, in one pass.
+
+        Args:
+            text (str): The program's source.
+            defaults (Defaults): Fills the program's missing values. A new Defaults if not given.
+
+        Returns:
+            Program: The abstract syntax tree.
+        """
+        if not defaults:
+            return get_parser().parse(text)
+        token = current_defaults.set(defaults)
+        try:
+            return get_parser().parse(text)
+        finally:
+            current_defaults.reset(token)
+
+    def parse_stream(self, stream: TextIO,
+                     chunk_lines: int = config.getint("compiler", "stream_chunk_lines")
+    ) -> Iterator[_Ast]:
+        """ Parse a program from a file object, yielding statements as they are recognized.
+
+        Lines are read until one begins a new statement. The lines before it are
+        parsed and their statements yielded, so memory is bounded by the longest
+        statement rather than the program. If lines that looked complete end in
+        the middle of a statement, more lines are read before parsing them again.
+
+        Args:
+            stream (TextIO): The program's source.
+            chunk_lines (int): Minimum lines parsed at once. Larger chunks parse
+            faster; smaller ones yield statements sooner.
+
+        Returns:
+            Iterator[_Ast]: The program's statements, with defaults filled.
+        """
+        defaults = Defaults ()
+        lines: List[str] = []
+        offset = 0
+        """ Lines of the source before the pending lines. """
+        for line in stream:
+            if lines and len(lines) >= chunk_lines and statement_start.match(line):
+                statements = self._parse_chunk(lines, offset, final=False, defaults=defaults)
+                if statements is not None:
+                    offset += len(lines)
+                    lines = []
+                    yield from statements
+            lines.append(line)
+        if lines:
+            yield from self._parse_chunk(lines, offset, final=True, defaults=defaults)
+
+    def _parse_chunk(self, lines: List[str], offset: int, final: bool, defaults: Defaults) -> Optional[List[_Ast]]:
+        """ Parse consecutive lines of a program, continuing its defaults.
+
+        Returns:
+            List[_Ast]: Statements, or None if the lines end in the middle of a
+            statement and more of the program follows.
+        """
+        token = current_defaults.set(defaults)
+        try:
+            statements = get_parser().parse("".join(lines)).statements
+            for statement in statements:
+                if offset and statement.meta:
+                    statement._line += offset
+            return statements
+        except (UnexpectedEOF, UnexpectedToken) as e:
+            incomplete = isinstance(e, UnexpectedEOF) or e.token.type == "$END"
+            if incomplete and not final:
+                return None
+            self._relocate(e, offset)
+            raise
+        except UnexpectedInput as e:
+            self._relocate(e, offset)
+            raise
+        finally:
+            current_defaults.reset(token)
+
+    def _relocate(self, error: UnexpectedInput, offset: int) -> None:
+        """ Make an error's line number relative to the whole program rather than the chunk. """
+        if getattr(error, "line", None) not in (None, -1):
+            error.line += offset
+        if getattr(error, "token", None) is not None and getattr(error.token, "line", None):
+            error.token.line += offset
+
+def main () -> None:
+    """ Generate the parser cache. """
+    arg_parser = argparse.ArgumentParser(description='Midori Parser')
+    arg_parser.add_argument('-o', '--output', help="The parser cache file", default=None)
+    args = arg_parser.parse_args ()
+    print (f"wrote parser tables to {build_parser (args.output)}")
+
+if __name__ == '__main__':
+    main ()
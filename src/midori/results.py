@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from midori.config import get_config
+from midori.utils import LoggingUtil
+from typing import Dict, Optional, Set
+
+LoggingUtil.setup_logging ()
+
+logger = logging.getLogger (__name__)
+
+config = get_config ()
+
+def get_result_key (network_id: str) -> str:
+    """ Get the Redis key a simulation's result is stored under. """
+    return f"{network_id}.result"
+
+class ResultWaiter:
+    """ Waits for simulation results to be stored in Redis.
+
+    Results are written by workers with SET. Keyspace notifications announce each
+    write on a channel named after the key, so one pattern subscription wakes every
+    request waiting on a result, and a waiting request costs no Redis commands until
+    its result arrives. If the server's notifications can not be enabled, waiting
+    requests read the result every poll_interval seconds instead. """
+    def __init__(self, cache: Redis,
+                 poll_interval: float = config.getfloat ("api", "result_poll_interval")
+    ) -> None:
+        """ Initialize the waiter.
+
+        Args:
+            cache (Redis): An asyncio Redis client for the database results are stored in.
+            poll_interval (float): Seconds between reads of a result when notifications are off.
+        """
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.db = cache.connection_pool.connection_kwargs.get ("db", 0)
+        self.waiting: Dict[str, Set[asyncio.Event]] = {}
+        """ Events of the requests waiting on each result key. """
+        self.notifying = False
+        """ Whether keyspace notifications wake waiting requests. """
+        self.listener: asyncio.Task = None
+
+    async def start (self) -> None:
+        """ Enable keyspace notifications for string commands and subscribe to those
+        for result keys. Flags the server already has are kept. """
+        try:
+            flags = (await self.cache.config_get ("notify-keyspace-events")).get ("notify-keyspace-events", "")
+            if isinstance (flags, bytes):
+                flags = flags.decode ()
+            if not ("K" in flags and ("$" in flags or "A" in flags)):
+                await self.cache.config_set ("notify-keyspace-events", "".join (sorted (set (flags + "K$"))))
+            pubsub = self.cache.pubsub ()
+            await pubsub.psubscribe (f"__keyspace@{self.db}__:{get_result_key ('*')}")
+        except RedisError as e:
+            logger.warning (f"keyspace notifications unavailable, polling for results: {e}")
+            return
+        self.notifying = True
+        self.listener = asyncio.create_task (self.listen (pubsub))
+
+    async def stop (self) -> None:
+        """ Stop listening for notifications. """
+        if self.listener:
+            self.listener.cancel ()
+            self.listener = None
+        self.notifying = False
+
+    async def listen (self, pubsub) -> None:
+        """ Wake the requests waiting on each key written. """
+        prefix = f"__keyspace@{self.db}__:"
+        try:
+            async for message in pubsub.listen ():
+                if message["type"] != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance (channel, bytes):
+                    channel = channel.decode ()
+                for event in self.waiting.get (channel[len(prefix):], ()):
+                    event.set ()
+        except asyncio.CancelledError:
+            await pubsub.close ()
+            raise
+        except Exception as e:
+            """ Requests still waiting read their results on a timer from here on. """
+            logger.error (f"lost keyspace notifications, polling for results: {e}")
+            self.notifying = False
+            for events in self.waiting.values ():
+                for event in events:
+                    event.set ()
+
+    async def wait (self, network_id: str, timeout: float) -> Optional[bytes]:
+        """ Get a simulation's result, waiting for it to be stored if it is not yet.
+
+        Args:
+            network_id (str): The simulation's job identifier.
+            timeout (float): Most seconds to wait.
+
+        Returns:
+            Optional[bytes]: The stored result, or None if it was not stored in time.
+        """
+        key = get_result_key (network_id)
+        event = asyncio.Event ()
+        """ Registered before the first read, so a result stored between the two is not missed. """
+        self.waiting.setdefault (key, set ()).add (event)
+        loop = asyncio.get_running_loop ()
+        deadline = loop.time () + timeout
+        try:
+            while True:
+                event.clear ()
+                value = await self.cache.get (key)
+                remaining = deadline - loop.time ()
+                if value or remaining <= 0:
+                    return value
+                try:
+                    await asyncio.wait_for (event.wait (),
+                                            remaining if self.notifying else min (remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            events = self.waiting[key]
+            events.discard (event)
+            if not events:
+                del self.waiting[key]
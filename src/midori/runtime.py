@@ -1,18 +1,27 @@
+import asyncio
+import httpx
 import json
 import logging
-import os
+import redis
 import requests
 import socket
 import textwrap
+import threading
 import time
 import traceback as tb
-from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from midori.checker import SemanticException, check
 from midori.compiler import Compiler
 from midori.config import get_config
 from midori.graph import MidoriGraph
-from midori.utils import LoggingUtil, Resource, Code
+from midori.parser import Defaults, MACGenerator, Parser, format_mac, parse_mac
+from midori.topology import Topology, get_host_properties, get_link_properties
+from midori.utils import LoggingUtil, Code
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from typing import List, Dict
+from urllib3.util.retry import Retry
+from typing import Generator, List, Dict, Tuple
 
 LoggingUtil.setup_logging ()
 
@@ -32,9 +41,40 @@ class MidoriExecutionError(MidoriException):
     """ A simulation failed due to the failure of a computation or lack of computing resources. """
     pass
 
-class Controller:
-    """ Abstraction for an Openflow SDN controller. For Midori, this 
-    currently means Onos. """
+class LatencyMetrics:
+    """ Latency statistics for calls, grouped by operation. """
+    def __init__(self) -> None:
+        self.calls: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock ()
+
+    def record(self, operation: str, seconds: float) -> None:
+        """ Record the duration of one call.
+
+        Args:
+            operation (str): Name of the operation.
+            seconds (float): How long the call took.
+        """
+        with self._lock:
+            stats = self.calls.setdefault(operation, { "count" : 0, "total" : 0.0, "max" : 0.0 })
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ Get count, mean, max, and total seconds for each operation. """
+        with self._lock:
+            return {
+                operation : {
+                    "count" : stats["count"],
+                    "mean"  : stats["total"] / stats["count"],
+                    "max"   : stats["max"],
+                    "total" : stats["total"]
+                } for operation, stats in self.calls.items()
+            }
+
+class ControllerApi:
+    """ What the synchronous and asynchronous controller clients share: where the
+    API is, its credentials, and latency metrics. Each client adds its transport. """
     def __init__(self,
                  api_host: str,
                  api_port: int,
@@ -45,11 +85,76 @@ class Controller:
         self.api_port = api_port
         self.username = username
         self.password = password
-        
+        self.metrics = LatencyMetrics ()
+        """ Latency of calls to the API. """
+
     def get_api(self, api:str = "") -> str:
         """ Build and API URL. """
         return f"http://{self.api_host}:{self.api_port}/{api}"
 
+    def record(self, metric: str, start: float) -> None:
+        """ Record the latency of a call begun at start, a time.perf_counter value. """
+        elapsed = time.perf_counter () - start
+        self.metrics.record(metric, elapsed)
+        logger.debug(f"{metric} took {elapsed * 1000:.1f}ms")
+
+class Controller(ControllerApi):
+    """ Abstraction for an Openflow SDN controller. For Midori, this 
+    currently means Onos. """
+    def __init__(self,
+                 api_host: str,
+                 api_port: int,
+                 username: str = None,
+                 password: str = None,
+                 pool_size: int = 10,
+                 timeout: float = 10,
+                 retries: int = 3,
+                 backoff_factor: float = 0.5
+    ) -> None:
+        """ Initialize the controller's API client.
+
+        Requests share one session, so connections to the API are kept alive and pooled.
+
+        Args:
+            api_host (str): Host the controller's API is on.
+            api_port (int): Port the controller's API is on.
+            username (str): API user.
+            password (str): API password.
+            pool_size (int): Maximum number of pooled connections.
+            timeout (float): Seconds to wait to connect and for each response.
+            retries (int): Retries for failed connections and server errors.
+            backoff_factor (float): Scales the delay between retries.
+        """
+        super().__init__(api_host=api_host, api_port=api_port,
+                         username=username, password=password)
+        self.timeout = timeout
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=[ 502, 503, 504 ])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session ()
+        self.session.auth = HTTPBasicAuth(self.username, self.password)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, operation: str, metric: str = None, **kwargs) -> requests.Response:
+        """ Call the API through the pooled session, recording latency.
+
+        Args:
+            method (str): HTTP method.
+            operation (str): API path relative to the API root.
+            metric (str): Name to record latency under. Defaults to the method and operation.
+            kwargs: Passed to requests.
+
+        Returns:
+            requests.Response: The response.
+        """
+        start = time.perf_counter ()
+        try:
+            return self.session.request(
+                method, self.get_api(operation), timeout=self.timeout, **kwargs)
+        finally:
+            self.record(metric if metric else f"{method} {operation}", start)
+
     def clean(self) -> None:
         """ Reset the system to a clean state. """
         pass
@@ -57,68 +162,166 @@ class Controller:
     def create_host_intent(self, ingress_device: str, egress_device: str) -> None:
         """ Create a host to host network flow intent. """
         pass
-    
-class Onos(Controller):
-    """ An Onos Openflow SDN controller. """
+
+    def create_host_intents(self, intents: List[Tuple[str, str]]) -> None:
+        """ Create several host to host network flow intents.
+
+        Args:
+            intents (List[Tuple[str, str]]): Ingress and egress device pairs.
+        """
+        for ingress_device, egress_device in intents:
+            self.create_host_intent(ingress_device, egress_device)
+
+    def delete_host_intent(self, ingress_device: str, egress_device: str) -> None:
+        """ Delete a host to host network flow intent. """
+        pass
+
+class AsyncController(ControllerApi):
+    """ Asynchronous abstraction for an Openflow SDN controller. Mirrors Controller
+    for callers running on an event loop. """
     def __init__(self,
-                 api_host: str = config.get("onos", "host"),
-                 api_port: int = config.get("onos", "api_port"),
-                 username: str = config.get("onos", "username"),
-                 password: str = config.get("onos", "password")
+                 api_host: str,
+                 api_port: int,
+                 username: str = None,
+                 password: str = None,
+                 pool_size: int = 10,
+                 timeout: float = 10,
+                 retries: int = 3
     ) -> None:
-        """ Initialize the base class """
+        """ Initialize the controller's API client.
+
+        Args:
+            api_host (str): Host the controller's API is on.
+            api_port (int): Port the controller's API is on.
+            username (str): API user.
+            password (str): API password.
+            pool_size (int): Maximum number of pooled connections.
+            timeout (float): Seconds to wait to connect and for each response.
+            retries (int): Retries for failed connections.
+        """
         super().__init__(api_host=api_host, api_port=api_port,
                          username=username, password=password)
+        self.client = httpx.AsyncClient(
+            auth=(username, password) if username else None,
+            timeout=timeout,
+            transport=httpx.AsyncHTTPTransport(
+                retries=retries,
+                limits=httpx.Limits(max_connections=pool_size,
+                                    max_keepalive_connections=pool_size)))
 
-    def get(self, operation: str, args : Dict = {}, nominal=200) -> Dict:
-        """ Perform a generic get operation on the API. """
-        api_url = self.get_api(operation)
-        logger.info(f"request ==> {api_url}: {json.dumps(args, indent=2)}")
-        if len(args) > 0:
-            query_parameters = "&".join ([ f"{k}={v}" for k, v in args.items () ])
-            api_url = f"{api_url}?{query_parameters}"
-        response = requests.get(
-            api_url,
-            auth=HTTPBasicAuth(self.username, self.password))
-        result = None
-        if response.status_code == nominal and response.text:
-            result = response.json ()
-        else:
-            print(f"Response: {response.text}")
-            print(f"Status code: {response.status_code}")
-        return result
+    async def __aenter__(self) -> "AsyncController":
+        return self
 
-    def delete(self, operation: str, args : Dict = {}, nominal=204) -> Dict:
-        """ Perform a generic delete operation on the API. """
-        api_url = self.get_api(operation)
-        logger.info(f"request ==> {api_url}: {json.dumps(args, indent=2)}")
-        if len(args) > 0:
-            query_parameters = "&".join ([ f"{k}={v}" for k, v in args.items () ])
-            api_url = f"{api_url}?{query_parameters}"
-        response = requests.delete(
-            api_url,
-            auth=HTTPBasicAuth(self.username, self.password))
+    async def __aexit__(self, *args) -> None:
+        await self.close ()
+
+    async def close(self) -> None:
+        """ Close pooled connections. """
+        await self.client.aclose ()
+
+    async def request(self, method: str, operation: str, metric: str = None, **kwargs) -> httpx.Response:
+        """ Call the API, recording latency.
+
+        Args:
+            method (str): HTTP method.
+            operation (str): API path relative to the API root.
+            metric (str): Name to record latency under. Defaults to the method and operation.
+            kwargs: Passed to httpx.
+
+        Returns:
+            httpx.Response: The response.
+        """
+        start = time.perf_counter ()
+        try:
+            return await self.client.request(method, self.get_api(operation), **kwargs)
+        finally:
+            self.record(metric if metric else f"{method} {operation}", start)
+
+    async def clean(self) -> None:
+        """ Reset the system to a clean state. """
+        pass
+
+    async def create_host_intent(self, ingress_device: str, egress_device: str) -> None:
+        """ Create a host to host network flow intent. """
+        pass
+
+    async def create_host_intents(self, intents: List[Tuple[str, str]]) -> None:
+        """ Create several host to host network flow intents.
+
+        Args:
+            intents (List[Tuple[str, str]]): Ingress and egress device pairs.
+        """
+        for ingress_device, egress_device in intents:
+            await self.create_host_intent(ingress_device, egress_device)
+
+class OnosApi:
+    """ The Onos requests Midori makes and how their responses are read, shared by
+    Onos and AsyncOnos, which only differ in how requests are sent. """
+
+    app_id = "org.onosproject.restconf"
+    """ The Onos application intents created by Midori belong to. """
+
+    intents_operation = "onos/v1/intents"
+    delete_metric = "DELETE onos/v1/intents/{app}/{id}"
+    """ Deletes are recorded under one name rather than one per intent. """
+
+    def get_intent_operation(self, intent_id: str) -> str:
+        """ Get the path of one of Midori's intents. """
+        return f"{self.intents_operation}/{self.app_id}/{intent_id}"
+
+    def log_request(self, operation: str, args: Dict) -> None:
+        logger.info(f"request ==> {self.get_api(operation)}: {json.dumps(args, indent=2)}")
+
+    def decode(self, response: object, nominal: int) -> Dict:
+        """ Get the decoded body of a response with the nominal status, logging any other. """
         result = None
         if response.status_code == nominal and response.text:
             result = response.json ()
-        else:
-            print(f"Response: {response.text}")
-            print(f"Status code: {response.status_code}")
+        elif response.status_code != nominal:
+            logger.warning(f"Response: {response.text}")
+            logger.warning(f"Status code: {response.status_code}")
         return result
-    
-    def clean(self) -> None:
-        intents = self.get ("onos/v1/intents")
-        ids = [ intent["id"] for intent in intents["intents"] ]
-        for i in ids:
-            logger.info(f"Deleting intent: {i}")
-            operation = f"onos/v1/intents/org.onosproject.restconf/{i}"
-            self.delete (operation=operation, nominal=204)
-            
-    def create_host_intent(self, ingress_device: str, egress_device: str) -> None:
-        """ Create a host to host intent. """
-        intent_json = {
+
+    def select_intent_ids(self, intents: Dict) -> List[str]:
+        """ Get the ids of the intents belonging to Midori's application from a listing. """
+        intents = intents["intents"] if intents else []
+        return [ intent["id"] for intent in intents if intent.get("appId") == self.app_id ]
+
+    def check_intent_created(self, response: object) -> None:
+        """ Raise an exception unless a response reports an intent created. """
+        if response.status_code != 201:
+            logger.warning(f"Response: {response.text}")
+            logger.warning(f"Status code: {response.status_code}")
+            raise MidoriException(f"Adding intent failed with error: {response.text} and code: {response.status_code}")
+
+    def poll_withdrawal(self, ids: List[str], deadline: float, interval: float) -> Generator[float, List[str], bool]:
+        """ Decide when to list intents again while waiting for some to be withdrawn.
+
+        Send the ids listed to get the seconds to wait before listing them again.
+        The generator returns True once none of the given intents are listed, or
+        False if the deadline would pass first.
+        """
+        pending = set(ids)
+        expires = time.monotonic () + deadline
+        while True:
+            pending &= set((yield))
+            if not pending:
+                return True
+            if time.monotonic () + interval > expires:
+                return False
+            yield interval
+
+    @staticmethod
+    def get_intent_key(ingress_device: str, egress_device: str) -> str:
+        """ Get the key Midori gives a host to host intent, so it can be deleted without looking up its id. """
+        return "-".join([ str(device).split("/")[0] for device in (ingress_device, egress_device) ])
+
+    def get_host_intent(self, ingress_device: str, egress_device: str) -> Dict:
+        """ Build the request body for a host to host intent. """
+        return {
             "type": "HostToHostIntent",
-            "appId": "org.onosproject.restconf",
+            "appId": self.app_id,
+            "key": self.get_intent_key(ingress_device, egress_device),
             "resources": [
                 ingress_device,
                 egress_device
@@ -148,18 +351,209 @@ class Onos(Controller):
             "two": egress_device
         }
 
-        api_url = self.get_api("onos/v1/intents/")
+class Onos(OnosApi, Controller):
+    """ An Onos Openflow SDN controller. """
+
+    def __init__(self,
+                 api_host: str = config.get("onos", "host"),
+                 api_port: int = config.get("onos", "api_port"),
+                 username: str = config.get("onos", "username"),
+                 password: str = config.get("onos", "password"),
+                 pool_size: int = config.getint("onos", "pool_size"),
+                 timeout: float = config.getfloat("onos", "timeout"),
+                 retries: int = config.getint("onos", "retries"),
+                 backoff_factor: float = config.getfloat("onos", "backoff_factor")
+    ) -> None:
+        """ Initialize the base class """
+        super().__init__(api_host=api_host, api_port=api_port,
+                         username=username, password=password,
+                         pool_size=pool_size, timeout=timeout,
+                         retries=retries, backoff_factor=backoff_factor)
+
+    def _call(self, method: str, operation: str, args : Dict, nominal: int, metric: str) -> Dict:
+        """ Perform a generic operation on the API, returning the decoded response. """
+        self.log_request(operation, args)
+        return self.decode(self.request(method, operation, metric=metric, params=args), nominal)
+
+    def get(self, operation: str, args : Dict = {}, nominal=200, metric: str = None) -> Dict:
+        """ Perform a generic get operation on the API. """
+        return self._call("GET", operation, args, nominal, metric)
+
+    def delete(self, operation: str, args : Dict = {}, nominal=204, metric: str = None) -> Dict:
+        """ Perform a generic delete operation on the API. """
+        return self._call("DELETE", operation, args, nominal, metric)
+    
+    def get_intent_ids(self) -> List[str]:
+        """ Get the ids of intents belonging to Midori's application. """
+        return self.select_intent_ids(self.get (self.intents_operation))
+
+    def delete_intent(self, intent_id: str) -> None:
+        """ Withdraw and delete one of Midori's intents. """
+        logger.info(f"Deleting intent: {intent_id}")
+        self.delete (operation=self.get_intent_operation(intent_id), nominal=204, metric=self.delete_metric)
+
+    def delete_host_intent(self, ingress_device: str, egress_device: str) -> None:
+        """ Withdraw and delete the intent between two hosts. """
+        self.delete_intent(self.get_intent_key(ingress_device, egress_device))
+
+    def clean(self,
+              concurrency: int = config.getint("onos", "clean_concurrency"),
+              wait: bool = config.getboolean("onos", "clean_wait"),
+              deadline: float = config.getfloat("onos", "clean_deadline")
+    ) -> None:
+        """ Delete the intents Midori created. Intents of other applications are left alone.
+
+        Args:
+            concurrency (int): Maximum number of deletes in flight at once.
+            wait (bool): Poll until Onos no longer lists the deleted intents.
+            deadline (float): Maximum seconds to wait.
+        """
+        ids = self.get_intent_ids ()
+        if ids:
+            workers = max(1, min(concurrency, len(ids)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self.delete_intent, ids))
+            if wait and not self.wait_for_withdrawal(ids, deadline):
+                logger.warning(f"Intents still present after {deadline} seconds.")
+
+    def wait_for_withdrawal(self, ids: List[str], deadline: float,
+                            interval: float = config.getfloat("onos", "clean_poll_interval")) -> bool:
+        """ Poll until none of the given intents are listed.
+
+        Args:
+            ids (List[str]): Intent ids.
+            deadline (float): Maximum seconds to wait.
+            interval (float): Seconds between polls.
+
+        Returns:
+            bool: True if the intents are gone, False if the deadline passed first.
+        """
+        poll = self.poll_withdrawal(ids, deadline, interval)
+        try:
+            while True:
+                next(poll)
+                time.sleep (poll.send(self.get_intent_ids ()))
+        except StopIteration as done:
+            return done.value
+
+    def create_host_intent(self, ingress_device: str, egress_device: str) -> None:
+        """ Create a host to host intent. """
+        intent_json = self.get_host_intent(ingress_device, egress_device)
+
         logger.error(f"intent =========> {ingress_device}-->{egress_device}\n")
         """ Note: arp forwarding in Onos was required for pings to work: https://groups.google.com/a/onosproject.org/g/onos-dev/c/GrV3xZfaEPs """
-        response = requests.post(
-            api_url,
-            auth=HTTPBasicAuth(self.username, self.password),
-            json=intent_json)
+        self.check_intent_created(self.request("POST", "onos/v1/intents/", json=intent_json))
 
-        if response.status_code != 201:
-            print(f"Response: {response.text}")
-            print(f"Status code: {response.status_code}")
-            raise MidoriException(f"Adding intent failed with error: {response.text} and code: {response.status_code}")
+    def create_host_intents(self, intents: List[Tuple[str, str]],
+                            concurrency: int = config.getint("onos", "intent_concurrency")) -> None:
+        """ Create several host to host intents concurrently.
+
+        The Onos REST API accepts one intent per request, so requests are issued
+        in parallel over the pooled session instead.
+
+        Args:
+            intents (List[Tuple[str, str]]): Ingress and egress device pairs.
+            concurrency (int): Maximum number of requests in flight at once.
+        """
+        if not intents:
+            return
+        workers = max(1, min(concurrency, len(intents)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [ executor.submit(self.create_host_intent, ingress, egress)
+                        for ingress, egress in intents ]
+        errors = [ str(future.exception()) for future in futures if future.exception() ]
+        if errors:
+            raise MidoriException(f"{len(errors)} of {len(intents)} intents failed: {errors}")
+
+class AsyncOnos(OnosApi, AsyncController):
+    """ An Onos Openflow SDN controller with an asynchronous client. """
+
+    def __init__(self,
+                 api_host: str = config.get("onos", "host"),
+                 api_port: int = config.get("onos", "api_port"),
+                 username: str = config.get("onos", "username"),
+                 password: str = config.get("onos", "password"),
+                 pool_size: int = config.getint("onos", "pool_size"),
+                 timeout: float = config.getfloat("onos", "timeout"),
+                 retries: int = config.getint("onos", "retries")
+    ) -> None:
+        """ Initialize the base class """
+        super().__init__(api_host=api_host, api_port=api_port,
+                         username=username, password=password,
+                         pool_size=pool_size, timeout=timeout, retries=retries)
+
+    async def _call(self, method: str, operation: str, args : Dict, nominal: int, metric: str) -> Dict:
+        """ Perform a generic operation on the API, returning the decoded response. """
+        self.log_request(operation, args)
+        return self.decode(await self.request(method, operation, metric=metric, params=args), nominal)
+
+    async def get(self, operation: str, args : Dict = {}, nominal=200, metric: str = None) -> Dict:
+        """ Perform a generic get operation on the API. """
+        return await self._call("GET", operation, args, nominal, metric)
+
+    async def delete(self, operation: str, args : Dict = {}, nominal=204, metric: str = None) -> Dict:
+        """ Perform a generic delete operation on the API. """
+        return await self._call("DELETE", operation, args, nominal, metric)
+
+    async def get_intent_ids(self) -> List[str]:
+        """ Get the ids of intents belonging to Midori's application. """
+        return self.select_intent_ids(await self.get (self.intents_operation))
+
+    async def delete_intent(self, intent_id: str) -> None:
+        """ Withdraw and delete one of Midori's intents. """
+        logger.info(f"Deleting intent: {intent_id}")
+        await self.delete (operation=self.get_intent_operation(intent_id), nominal=204, metric=self.delete_metric)
+
+    async def delete_host_intent(self, ingress_device: str, egress_device: str) -> None:
+        """ Withdraw and delete the intent between two hosts. """
+        await self.delete_intent(self.get_intent_key(ingress_device, egress_device))
+
+    async def clean(self,
+                    concurrency: int = config.getint("onos", "clean_concurrency"),
+                    wait: bool = config.getboolean("onos", "clean_wait"),
+                    deadline: float = config.getfloat("onos", "clean_deadline")
+    ) -> None:
+        """ Delete the intents Midori created. See Onos.clean. """
+        ids = await self.get_intent_ids ()
+        results = await self._gather(concurrency, [ self.delete_intent(i) for i in ids ])
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        if ids and wait and not await self.wait_for_withdrawal(ids, deadline):
+            logger.warning(f"Intents still present after {deadline} seconds.")
+
+    async def wait_for_withdrawal(self, ids: List[str], deadline: float,
+                                  interval: float = config.getfloat("onos", "clean_poll_interval")) -> bool:
+        """ Poll until none of the given intents are listed. See Onos.wait_for_withdrawal. """
+        poll = self.poll_withdrawal(ids, deadline, interval)
+        try:
+            while True:
+                next(poll)
+                await asyncio.sleep (poll.send(await self.get_intent_ids ()))
+        except StopIteration as done:
+            return done.value
+
+    async def create_host_intent(self, ingress_device: str, egress_device: str) -> None:
+        """ Create a host to host intent. """
+        intent_json = self.get_host_intent(ingress_device, egress_device)
+        self.check_intent_created(await self.request("POST", "onos/v1/intents/", json=intent_json))
+
+    async def create_host_intents(self, intents: List[Tuple[str, str]],
+                                  concurrency: int = config.getint("onos", "intent_concurrency")) -> None:
+        """ Create several host to host intents concurrently. See Onos.create_host_intents. """
+        results = await self._gather(concurrency, [
+            self.create_host_intent(ingress, egress) for ingress, egress in intents ])
+        errors = [ str(result) for result in results if isinstance(result, Exception) ]
+        if errors:
+            raise MidoriException(f"{len(errors)} of {len(intents)} intents failed: {errors}")
+
+    async def _gather(self, concurrency: int, calls: List) -> List:
+        """ Await calls with at most concurrency in flight, returning results or exceptions. """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        async def bounded(call):
+            async with semaphore:
+                return await call
+        return await asyncio.gather(*[ bounded(call) for call in calls ], return_exceptions=True)
 
 class ContainernetFactory:
     """ Abstract Containernet specific functionality not available in local dev environments. """
@@ -179,6 +573,276 @@ class ContainernetFactory:
         from mininet.clean import Cleanup
         Cleanup.cleanup()
 
+    def pull_image(self, image: str) -> None:
+        """ Pull an image unless it is already present. """
+        import docker
+        from docker.errors import ImageNotFound
+        from docker.utils import parse_repository_tag
+        client = docker.from_env()
+        try:
+            client.images.get(image)
+        except ImageNotFound:
+            repository, tag = parse_repository_tag(image)
+            client.images.pull(repository, tag=tag or "latest")
+
+    def create_docker(self, name: str, **params) -> object:
+        """ Create a host's container outside of any network. This pulls its image
+        if needed and starts the container, most of the time adding a host takes. """
+        from mininet.node import Docker
+        return Docker(name, **params)
+
+    def add_docker(self, net: object, docker: object, **params) -> object:
+        """ Add a container made by create_docker to a network.
+
+        Containernet's addDocker builds the node through its cls argument. Passing
+        one that returns the existing container has the network record it and give
+        it its defaults, as for a container the network created itself. """
+        def existing(name, **defaults):
+            docker.params.update(defaults)
+            return docker
+        return net.addDocker(docker.name, cls=existing, **params)
+
+class WarmPool:
+    """ Simulation resources kept ready between jobs: a Containernet network built
+    ahead of time, an Onos client with open connections, and new containers.
+
+    A used container keeps the files and processes of its host, so containers are
+    never reused across simulations. Instead, once a simulation stops, new
+    containers are created in the background for the hosts it had, for the next
+    simulation, which is often the same program submitted again or a variant of
+    it. A host takes an idle container created with its name, image, environment,
+    ports, and port bindings, which are fixed when a container is created, and it
+    is added to the network like a container created on demand.
+    """
+    def __init__(self,
+                 size: int = config.getint("pool", "size"),
+                 images: List[str] = config.get("pool", "images").split(),
+                 factory: ContainernetFactory = None,
+                 controller: Controller = None) -> None:
+        """ Initialize the pool. It is filled by start.
+
+        Args:
+            size (int): Most idle containers kept.
+            images (List[str]): Images to pull before the first simulation.
+            factory (ContainernetFactory): Builds networks and containers.
+            controller (Controller): The controller client shared by simulations.
+        """
+        self.size = size
+        self.images = images
+        self.factory = factory if factory else ContainernetFactory ()
+        self.controller = controller
+        self.net = None
+        """ A network built for the next simulation. """
+        self.idle: Dict[Tuple, object] = {}
+        """ Idle containers by match key. """
+        self.wanted: List[Tuple] = []
+        """ Match keys of the hosts of the simulation running, in the order added. """
+        self.pulled = False
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.refilling = None
+        self._lock = threading.Lock ()
+
+    @staticmethod
+    def get_key(name: str,
+                image: str,
+                env: Dict[str, str] = {},
+                ports: List[int] = [],
+                port_bindings: Dict[int, int] = {}) -> Tuple:
+        """ Get the settings a container must have been created with to serve a host. """
+        return (name, image, tuple(sorted(env.items())), tuple(ports), tuple(sorted(port_bindings.items())))
+
+    def start(self) -> None:
+        """ Remove Containernet artifacts left by earlier processes, then fill the pool in the background. """
+        self.factory.cleanup_containernet()
+        self.refill()
+
+    def refill(self) -> None:
+        """ Build the next network and create containers for the last simulation's hosts in the background. """
+        self.wait()
+        with self._lock:
+            wanted, self.wanted = list(dict.fromkeys(self.wanted))[:self.size], []
+        self.refilling = self.executor.submit(self._fill, wanted)
+
+    def wait(self) -> None:
+        """ Wait for a refill in progress to finish. """
+        refilling, self.refilling = self.refilling, None
+        if refilling:
+            try:
+                refilling.result()
+            except Exception as e:
+                logger.warning(f"Filling the warm pool failed: {e}")
+
+    def _fill(self, wanted: List[Tuple]) -> None:
+        if not self.controller:
+            self.controller = Onos ()
+        try:
+            """ Open a connection before a simulation needs one. """
+            self.controller.get_intent_ids()
+        except Exception as e:
+            logger.warning(f"Warming the controller connection failed: {e}")
+        if not self.net:
+            self.net = self.factory.get_containernet()
+        if not self.pulled:
+            self.pulled = True
+            for image in self.images:
+                try:
+                    self.factory.pull_image(image)
+                except Exception as e:
+                    logger.warning(f"Pulling {image} failed: {e}")
+        for key in [ key for key in self.idle if key not in wanted ]:
+            self.idle.pop(key).terminate()
+        for key in wanted:
+            if key not in self.idle:
+                try:
+                    self.idle[key] = self._create(key)
+                except Exception as e:
+                    logger.warning(f"Creating an idle container for {key[0]} failed: {e}")
+
+    def _create(self, key: Tuple) -> object:
+        """ Create a container outside of any network. """
+        name, image, env, ports, port_bindings = key
+        self.created += 1
+        return self.factory.create_docker(name, dimage=image, environment=dict(env),
+                                          ports=list(ports), port_bindings=dict(port_bindings))
+
+    def get_net(self) -> object:
+        """ Get a network for a simulation, built ahead of time if possible. """
+        with self._lock:
+            self.wait()
+            net, self.net = self.net, None
+        return net if net else self.factory.get_containernet()
+
+    def get_controller(self) -> Controller:
+        """ Get the shared controller client, with latency metrics for a new simulation. """
+        with self._lock:
+            self.wait()
+            if not self.controller:
+                self.controller = Onos ()
+            self.controller.metrics = LatencyMetrics ()
+            return self.controller
+
+    def take(self,
+             name: str,
+             image: str,
+             env: Dict[str, str] = {},
+             ports: List[int] = [],
+             port_bindings: Dict[int, int] = {}) -> object:
+        """ Take the idle container created for a host, to add to a network.
+
+        Returns:
+            object: The container, or None if none matches the host.
+        """
+        key = self.get_key(name, image, env, ports, port_bindings)
+        with self._lock:
+            self.wait()
+            self.wanted.append(key)
+            container = self.idle.pop(key, None)
+            if container:
+                self.hits += 1
+                return container
+            self.misses += 1
+            """ An idle container made for another host of this name holds the name the host's container needs. """
+            stale = [ self.idle.pop(other) for other in list(self.idle) if other[0] == name ]
+        for container in stale:
+            container.terminate()
+        return None
+
+    def summary(self) -> Dict[str, int]:
+        """ Get counts of containers taken from the pool, created on demand, and idle. """
+        return {
+            "hits"  : self.hits,
+            "misses": self.misses,
+            "idle"  : len(self.idle)
+        }
+
+warm_pool: WarmPool = None
+""" The process's warm pool, if enabled. """
+
+def get_warm_pool() -> WarmPool:
+    """ Get the warm pool, starting it on first use.
+
+    Returns:
+        WarmPool: The pool, or None if pool.size is zero.
+    """
+    global warm_pool
+    if not warm_pool and config.getint("pool", "size") > 0:
+        warm_pool = WarmPool ()
+        warm_pool.start()
+    return warm_pool
+
+class MACBlock:
+    """ A block of MAC addresses for one simulation.
+
+    Programs are allocated MAC addresses under the configured prefix in the same
+    order each time they are compiled, so that compiled programs can be cached.
+    The network a program builds instead has those addresses moved into a block
+    of its own. The prefix leaves room for a limited number of blocks, 256 with
+    the default prefix and block size. Block 0 holds the addresses as programs
+    are given them, and the others are taken in turn from a counter in Redis,
+    which every worker shares and which outlasts restarts. Once each has been
+    taken, blocks are taken again from the first, so only that many simulations,
+    less one, running at once are sure to have addresses of their own. """
+    def __init__(self,
+                 index: int,
+                 block_bits: int = config.getint("runtime", "mac_block_bits"),
+                 prefix: str = None
+    ) -> None:
+        """ Initialize the block.
+
+        Args:
+            index (int): The block's number. Block 0 leaves addresses as they are.
+            block_bits (int): Bits of address suffix in each block.
+            prefix (str): Leading octets of the addresses programs are given. Defaults to compiler.mac_prefix.
+        """
+        generator = MACGenerator(prefix if prefix else config.get("compiler", "mac_prefix"))
+        if not 0 < block_bits < generator.bits:
+            raise ValueError(f"MAC address blocks of {block_bits} bits do not fit in {generator.bits} bits after the prefix")
+        self.count = 1 << (generator.bits - block_bits)
+        """ Blocks the prefix holds. """
+        if not 0 <= index < self.count:
+            raise ValueError(f"MAC address block {index} is not one of the {self.count} blocks under the prefix")
+        self.index = index
+        self.block_bits = block_bits
+        self.prefix = generator.prefix
+        self.mask = (1 << generator.bits) - 1
+        self.offset = index << block_bits
+
+    @staticmethod
+    def allocate(client: redis.Redis = None,
+                 key: str = config.get("runtime", "mac_block_key"),
+                 block_bits: int = config.getint("runtime", "mac_block_bits"),
+                 prefix: str = None) -> "MACBlock":
+        """ Take the next block from the counter in Redis, skipping block 0.
+
+        Raises:
+            MidoriException: If Redis can not be reached. Addresses chosen any other
+            way could be those of a running simulation.
+        """
+        try:
+            client = client if client else redis.Redis(
+                host=config.get("redis", "host"), port=config.getint("redis", "port"))
+            number = client.incr(key)
+        except redis.exceptions.RedisError as e:
+            raise MidoriException(f"Could not take a MAC address block from Redis: {e}") from e
+        count = MACBlock(0, block_bits, prefix).count
+        return MACBlock(1 + (number - 1) % (count - 1), block_bits, prefix)
+
+    def translate(self, mac: str) -> str:
+        """ Get the address a host allocated mac by its program has in this simulation.
+
+        Raises:
+            ValueError: If the program was allocated more addresses than a block holds.
+        """
+        value = parse_mac(mac) if mac else None
+        if value is None or value & ~self.mask != self.prefix:
+            return mac
+        if (value & self.mask) >> self.block_bits:
+            raise ValueError(f"MAC address {mac} is beyond the {1 << self.block_bits} addresses of a block")
+        return format_mac(self.prefix | self.offset | (value & self.mask))
+
 @dataclass
 class Node:
     node: object
@@ -196,14 +860,50 @@ class Context:
     """ 
     An execution context for a Midori simulation. Provides acces to system 
     services including an SDN control plane, a graph database, logging services.
+
+    The network is modeled in memory by a Topology, which answers path and
+    neighbor queries. The graph database, if used, only persists it.
     """ 
     def __init__(self, controller: Controller = None,
-                 graph: MidoriGraph = None
+                 graph: MidoriGraph = None,
+                 container_concurrency: int = config.getint("runtime", "container_concurrency"),
+                 batch_intents: bool = config.getboolean("runtime", "batch_intents"),
+                 persist_graph: bool = config.getboolean("runtime", "persist_graph"),
+                 incremental_graph: bool = config.getboolean("redis", "incremental"),
+                 pool: WarmPool = None,
+                 mac_block: MACBlock = None,
+                 factory: ContainernetFactory = None
     ) -> None:
-        containernet_factory = ContainernetFactory() 
-        self.net = containernet_factory.get_containernet()
-        self.controller = controller if controller else Onos ()
-        self.graph = graph if graph else MidoriGraph ()
+        self.pool = pool
+        """ Supplies the network, controller, and containers if set. """
+        self.factory = pool.factory if pool else factory if factory else ContainernetFactory()
+        """ Builds the network and containers. """
+        if pool:
+            self.net = pool.get_net()
+            self.controller = controller if controller else pool.get_controller()
+        else:
+            self.net = self.factory.get_containernet()
+            self.controller = controller if controller else Onos ()
+        self.running = False
+        """ Whether the network has been started and not stopped. """
+        self.stopped = False
+        self.graph = graph if graph else MidoriGraph () if persist_graph else None
+        """ Optional persistence for the topology. """
+        self.incremental_graph = incremental_graph
+        """ Sync the graph with the topology at commit instead of cleaning it and adding each node and edge. """
+        self.topology = Topology ()
+        """ The simulated network. """
+        self.container_concurrency = container_concurrency
+        """ Maximum number of containers add_containers creates at once. """
+        self.batch_intents = batch_intents
+        """ Hold intents added before the network starts until flush_intents, instead
+        of submitting each one immediately. Once it is running, intents are always
+        submitted as they are added, so the statements after them can use them. """
+        self.pending_intents: List[Tuple[str, str]] = []
+        self.mac_block = mac_block if mac_block else MACBlock.allocate()
+        """ Where the MAC addresses programs are given are moved to in this simulation. """
+        self.macs: Dict[str, str] = {}
+        """ The address each host added has in this simulation, by its address in the program. """
         self.messages = []
     
     def log (self, message: str) -> None:
@@ -218,32 +918,93 @@ class Context:
     def clean(self) -> None:
         """ Clean up the workspace from prior runs. """
         self.controller.clean()
-        self.graph.clean()
+        if self.graph and not self.incremental_graph:
+            self.graph.clean()
 
     def commit(self) -> None:
         """ Commit any pending changes. """
-        self.graph.commit()
-
-    def _get_container_properties(self,
-                                  name: str,
-                                  ip: str,
-                                  image: str,
-                                  mac: str,
-                                  env: Dict[str, str] = {},
-                                  ports: List[int] = [],
-                                  port_bindings: Dict[int, int] = {},
-                                  cmd: List[str] = []) -> None:
-        return {
-            "name"          : name,
-            "ip"            : ip,
-            "image"         : image,
-            "mac"           : mac,
-            "ports"         : ports,
-            "port_bindings" : [ f"{k}:{v}" for k, v in port_bindings.items() ],
-            "env"           : [ f"{k}:{v}" for k, v in env.items() ],
-            "cmd"           : cmd
-        }
+        if self.graph and self.incremental_graph:
+            diff = self.graph.sync(self.topology)
+            self.log(f"** Synced property graph: {diff}\n")
+        elif self.graph:
+            self.graph.commit()
+
+    @property
+    def graph_writer(self) -> MidoriGraph:
+        """ The graph, if nodes and edges are written to it as they are added. """
+        return None if self.incremental_graph else self.graph
+
+    def start(self) -> None:
+        """ Start the network. """
+        self.net.start()
+        self.running = True
+
+    def stop(self) -> None:
+        """ Stop the network, removing its containers. """
+        self.net.stop()
+        self.running = False
+        self.stopped = True
+
+    def shortest_path(self, src: str, dst: str, weight: str = None) -> List[str]:
+        """ Find a shortest path between two hosts or switches. See Topology.shortest_path. """
+        return self.topology.shortest_path(src, dst, weight=weight)
     
+    def _create_docker(self,
+                       name: str,
+                       ip: str,
+                       image: str,
+                       mac: str,
+                       env: Dict[str, str] = {},
+                       ports: List[int] = [],
+                       port_bindings: Dict[int, int] = {},
+                       cmd: List[str] = []) -> object:
+        """ Create the container for a host, or take one from the warm pool, outside
+        of the network. Only Docker is touched, so this may run on several threads. """
+        self.log(f"*** Adding host:{name} ip:{ip} img:{image} mac:{mac} ports:{ports} bindings:{port_bindings} env:{env}\n")
+        docker = self.pool.take(name=name, image=image, env=env, ports=ports,
+                                port_bindings=port_bindings) if self.pool else None
+        return docker if docker else self.factory.create_docker(
+            name, ip=ip, dimage=image, mac=mac, ports=ports, port_bindings=port_bindings, environment=env)
+
+    def _add_docker(self,
+                    docker: object,
+                    name: str,
+                    ip: str,
+                    image: str,
+                    mac: str,
+                    env: Dict[str, str] = {},
+                    ports: List[int] = [],
+                    port_bindings: Dict[int, int] = {},
+                    cmd: List[str] = []) -> object:
+        """ Add a host's container to the network. This changes the network's hosts
+        and address bookkeeping, so it runs on one thread, in program order. """
+        return self.factory.add_docker(
+            self.net, docker, ip=ip, dimage=image, mac=mac, ports=ports, port_bindings=port_bindings, environment=env)
+
+    def _add_host_node(self, **container) -> object:
+        """ Add a host to the topology and the graph. """
+        node_properties = get_host_properties(**container)
+        self.topology.add_host(container["name"], node_properties)
+        return self.graph_writer.add_host(
+            alias=container["name"], properties=node_properties) if self.graph_writer else None
+
+    def _place_mac(self, generated_mac: bool = False, **container) -> Dict:
+        """ Give a container the MAC address its host has in this simulation. An
+        allocated address is moved into the simulation's block. One the program
+        gave is used as is. Intents between hosts look up the address by the one
+        in the program.
+
+        Args:
+            generated_mac (bool): Whether the program's address was allocated.
+            container: Keyword arguments to add_container.
+
+        Returns:
+            Dict: The container's arguments with its address in this simulation.
+        """
+        mac = container["mac"]
+        container["mac"] = self.macs[mac] = self.mac_block.translate(mac) if generated_mac else mac
+        return container
+
     def add_container(self,
                       name: str,
                       ip: str,
@@ -252,21 +1013,42 @@ class Context:
                       env: Dict[str, str] = {},
                       ports: List[int] = [],
                       port_bindings: Dict[int, int] = {},
-                      cmd: List[str] = []) -> Host:        
-        self.log(f"*** Adding host:{name} ip:{ip} img:{image} mac:{mac} ports:{ports} bindings:{port_bindings} env:{env}\n")
-        container = self.net.addDocker(
-            name, ip=ip, dimage=image, mac=mac, ports=ports, port_bindings=port_bindings, environment=env)
-        node_properties = self._get_container_properties(
-            name=name, ip=ip, image=image, mac=mac, env=env, ports=ports, port_bindings=port_bindings, cmd=cmd)
-        graph_node = self.graph.add_host(
-            alias=name, properties=node_properties)
-        return Host(container, graph_node)
+                      cmd: List[str] = [],
+                      generated_mac: bool = False) -> Host:        
+        container = self._place_mac(name=name, ip=ip, image=image, mac=mac, env=env,
+                                    ports=ports, port_bindings=port_bindings, cmd=cmd, generated_mac=generated_mac)
+        docker = self._add_docker(self._create_docker(**container), **container)
+        return Host(docker, self._add_host_node(**container))
+
+    def add_containers(self, containers: List[Dict]) -> List[Host]:
+        """ Create several containers concurrently.
+
+        Containers are created on a thread pool bounded by container_concurrency.
+        They are then added to the network, and their nodes to the graph, one at a
+        time in the order given, so neither depends on which container finished
+        first, and Containernet's bookkeeping is only changed from this thread.
+
+        Args:
+            containers (List[Dict]): Keyword arguments to add_container for each host.
+
+        Returns:
+            List[Host]: The hosts, in the order given.
+        """
+        if not containers:
+            return []
+        containers = [ self._place_mac(**container) for container in containers ]
+        workers = max(1, min(self.container_concurrency, len(containers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            dockers = list(executor.map(lambda container: self._create_docker(**container), containers))
+        return [ Host(self._add_docker(docker, **container), self._add_host_node(**container))
+                 for docker, container in zip(dockers, containers) ]
 
     def add_switch(self,                   
                    name : str) -> Switch:
         self.log(f"*** Adding switch {name}\n")
         switch = self.net.addSwitch (name)
-        gnode = self.graph.add_switch(alias=name, properties={"name":name})
+        self.topology.add_switch(name)
+        gnode = self.graph_writer.add_switch(alias=name, properties={"name":name}) if self.graph_writer else None
         return Switch(switch, gnode)
 
     def add_link(self,
@@ -278,58 +1060,201 @@ class Context:
                  delay : str = None,
                  bw : int = None) -> object:
         self.log(f"** Adding link src:{src.node.name} dst:{dst.node.name} p1:{port1} p2:{port2} cls:{cls} del:{delay} bw:{bw}\n")
-        self.net.addLink(src.node, dst.node, port1=port1, port2=port2, cls=cls, delay=delay, bw=bw)
-        self.graph.add_edge(
-            subject=src.gnode, predicate="linked_to", object=dst.gnode,
-            properties={ "port1" : port1, "port2" : port2, "cls" : cls, "delay" : delay, "bw" : bw })
+        link = self.net.addLink(src.node, dst.node, port1=port1, port2=port2, cls=cls, delay=delay, bw=bw)
+        properties = get_link_properties(port1=port1, port2=port2, cls=cls, delay=delay, bw=bw)
+        self.topology.add_link(src.node.name, dst.node.name, properties)
+        if self.graph_writer:
+            self.graph_writer.add_edge(
+                subject=src.gnode, predicate="linked_to", object=dst.gnode,
+                properties=properties)
+        return link
 
     def add_host2host_intent(self,
                              src: Host,
                              src_mac: str,
                              dst: Host,
                              dst_mac : str) -> None:
+        src_mac, dst_mac = self.macs.get(src_mac, src_mac), self.macs.get(dst_mac, dst_mac)
         ingress_host_id = f"{src_mac}/None"
         egress_host_id = f"{dst_mac}/None"
         self.log (f"** Adding host-to-host intent: {src.node.name}->{dst.node.name} srcmac: {ingress_host_id} dst_mac:{egress_host_id}\n")
-        response = self.controller.create_host_intent(
-            ingress_device=ingress_host_id,
-            egress_device=egress_host_id)
-        name = f"{src.node.name }_to_{dst.node.name}"
-        intent_node = self.graph.add_intent(alias=name, properties={"name":name})
-        self.graph.add_edge(subject=intent_node, predicate="from", object=src.gnode)
-        self.graph.add_edge(subject=intent_node, predicate="to", object=dst.gnode)
+        if self.batch_intents and not self.running and not self.stopped:
+            self.pending_intents.append((ingress_host_id, egress_host_id))
+        else:
+            self.controller.create_host_intent(
+                ingress_device=ingress_host_id,
+                egress_device=egress_host_id)
+        self.topology.add_intent(src.node.name, dst.node.name)
+        if self.graph_writer:
+            name = f"{src.node.name }_to_{dst.node.name}"
+            intent_node = self.graph_writer.add_intent(alias=name, properties={"name":name})
+            self.graph_writer.add_edge(subject=intent_node, predicate="from", object=src.gnode)
+            self.graph_writer.add_edge(subject=intent_node, predicate="to", object=dst.gnode)
+
+    def remove_host2host_intent(self,
+                                src: Host,
+                                src_mac: str,
+                                dst: Host,
+                                dst_mac: str) -> None:
+        """ Withdraw an intent between two hosts, or drop it if it has not been submitted yet. """
+        src_mac, dst_mac = self.macs.get(src_mac, src_mac), self.macs.get(dst_mac, dst_mac)
+        ingress_host_id = f"{src_mac}/None"
+        egress_host_id = f"{dst_mac}/None"
+        self.log (f"** Removing host-to-host intent: {src.node.name}->{dst.node.name}\n")
+        if (ingress_host_id, egress_host_id) in self.pending_intents:
+            self.pending_intents.remove((ingress_host_id, egress_host_id))
+        else:
+            self.controller.delete_host_intent(ingress_host_id, egress_host_id)
+        self.topology.remove_intent(src.node.name, dst.node.name)
+
+    def remove_link(self, src: Node, dst: Node) -> None:
+        """ Remove the link between two hosts or switches. """
+        self.log(f"** Removing link src:{src.node.name} dst:{dst.node.name}\n")
+        self.net.removeLink(node1=src.node, node2=dst.node)
+        self.topology.remove_link(src.node.name, dst.node.name)
+
+    def remove_container(self, host: Host) -> None:
+        """ Stop and remove a host's container, along with its links and intents in the topology. """
+        self.log(f"*** Removing host:{host.node.name}\n")
+        self.net.removeDocker(host.node.name)
+        self.topology.remove_node(host.node.name)
+
+    def remove_switch(self, switch: Switch) -> None:
+        """ Stop and remove a switch, along with its links in the topology. """
+        self.log(f"*** Removing switch {switch.node.name}\n")
+        self.net.delSwitch(switch.node)
+        self.topology.remove_node(switch.node.name)
+
+    def start_added(self, switches: List[Switch], hosts: List[Host], links: List[object]) -> None:
+        """ Bring up nodes and links added to a running network.
+
+        Ports of new links are attached to switches that were already running, new
+        switches are started and connected to the controller, and new hosts' interfaces
+        are configured.
+
+        Args:
+            switches (List[Switch]): Switches added since the network started.
+            hosts (List[Host]): Hosts added since the network started.
+            links (List[object]): Links added since the network started.
+        """
+        added = { switch.node.name for switch in switches }
+        for link in links:
+            for intf in (link.intf1, link.intf2):
+                if hasattr(intf.node, "attach") and intf.node.name not in added:
+                    intf.node.attach(intf)
+        for switch in switches:
+            switch.node.start(self.net.controllers)
+        for host in hosts:
+            host.node.configDefault()
+
+    def flush_intents(self) -> None:
+        """ Submit the intents held since the last flush to the controller in one batch. """
+        if self.pending_intents:
+            intents, self.pending_intents = self.pending_intents, []
+            self.log (f"** Submitting {len(intents)} host-to-host intents.\n")
+            self.controller.create_host_intents(intents)
+
+live_simulation = None
+""" The interpreter of a simulation left running by its program, which a later job may reconfigure. """
 
 def run_simulation(network):
+    """ Run a simulation job.
 
-    """ Create an execution context for the simulation. """
-    context = Context()
-    context.clean()
+    Args:
+        network (dict): The job. Includes the program's source and optionally a
+        mode, either "interpret" to walk the AST or "codegen" to execute generated
+        Python. The mode defaults to the runtime.mode setting. If reconfigure is
+        set and an interpreted simulation is still running, it is changed into the
+        new program's network instead of being torn down and rebuilt.
+
+    Returns:
+        dict: Timing, error, and log information about the simulation.
+    """
+    global live_simulation
+    start = time.time ()
+    mode = network.get("mode") or config.get("runtime", "mode")
+    interpreter = live_simulation if network.get("reconfigure") and mode != "codegen" else None
+
+    """ Compile and check the program before touching Containernet, so a program
+    with errors is rejected without stopping or changing the running simulation. """
+    try:
+        if interpreter:
+            """ Hosts that leave out their addresses keep the ones they have, so the
+            program is parsed for this network rather than taken from the compile cache. """
+            program = Parser().parse(network["source"], defaults=Defaults(previous=interpreter.program))
+            check(program)
+        else:
+            compiled = Compiler().compile(source=network["source"], emit=mode == "codegen")
+    except SemanticException as e:
+        return make_result(start=start, end=time.time(), error=str(e), log=[])
+    except Exception:
+        return make_result(start=start, end=time.time(), error=tb.format_exc(), log=[])
+
+    if live_simulation and not interpreter:
+        live_simulation.context.stop()
+    live_simulation = None
+    pool = get_warm_pool()
+
+    """ Create an execution context for the simulation, or reuse the running one. """
+    if interpreter:
+        context = interpreter.context
+        context.messages = []
+    else:
+        try:
+            mac_block = MACBlock.allocate()
+        except MidoriException as e:
+            return make_result(start=start, end=time.time(), error=str(e), log=[])
+        context = Context(pool=pool, mac_block=mac_block)
+        context.clean()
     exception = None
     
     try:
-        start = time.time ()
         logger.debug(f"Simulating network: {network}")
 
-        """ Compile the network. """
-        midori = Compiler()
-        network_python = midori.process(source=network["source"])
+        if interpreter:
+            """ Apply only the differences to the running network. """
+            interpreter.reconfigure(program)
+        else:
+            if network.get("reconfigure"):
+                context.log(f"** No running simulation to reconfigure. Starting a new one.\n")
 
-        """ Load the generated network's python implementation as a module."""
-        logger.debug(f"Generated code: {network_python}")
-        mininet_network = Code.importCode(network_python)
+            """ Delete all Containernet artifacts of previous simulation. The warm pool
+            did so when it started, and recycles containers when a simulation stops. """
+            if not pool:
+                containernet_factory = ContainernetFactory() 
+                containernet_factory.cleanup_containernet()
 
-        """ Delete all Containernet artifacts of previous simulation. """
-        containernet_factory = ContainernetFactory() 
-        containernet_factory.cleanup_containernet()
+            """ Execute the simulation network. """
+            if mode == "codegen":
+                """ Load the generated network's python implementation as a module."""
+                logger.debug(f"Generated code: {compiled.python}")
+                mininet_network = Code.importCode(compiled.get_code())
+                mininet_network.run_network(context)
+            else:
+                """ Imported here because the interpreter depends on this module. """
+                from midori.interpreter import Interpreter
+                interpreter = Interpreter(context)
+                interpreter.run(compiled.ast)
 
-        """ Execute the simulation network. """
-        mininet_network.run_network(context)
-        context.controller.clean()
+        if interpreter and interpreter.running:
+            """ The program did not bring the network down. Keep it for reconfiguration. """
+            live_simulation = interpreter
+        else:
+            context.controller.clean()
         
     except Exception:
         exception = tb.format_exc()
         print(exception)
 
+    if pool and not live_simulation:
+        """ Stop the simulation's network, then prepare containers for the next one. """
+        if not context.stopped:
+            context.stop()
+        context.log(f"warm pool: {json.dumps(pool.summary())}")
+        pool.refill()
+
+    context.log(f"controller latency: {json.dumps(context.controller.metrics.summary())}")
+
     """ Generate a response. """
     return make_result(start=start, end=time.time(),
                        error=exception, log=context.messages)
@@ -69,6 +69,11 @@ def mock_mininet(monkeypatch):
             return MockContainernet()
         def cleanup_containernet (self):
             pass
+        def create_docker(self, name, **kwargs):
+            FakeNode = namedtuple('FakeNode', 'name')
+            return FakeNode(name)
+        def add_docker(self, net, docker, **kwargs):
+            return net.addDocker(docker.name, **kwargs)
         
     class MockContainernet:
         def addDocker(self, *args, **kwargs):
@@ -89,6 +94,7 @@ def mock_mininet(monkeypatch):
     def mock_get_containernet(controller_host, controller_port):
         return MockContainernet()
     monkeypatch.setattr("midori.runtime.ContainernetFactory", ContainernetFactory)
+    monkeypatch.setattr("midori.runtime.MACBlock.allocate", lambda *args, **kwargs: midori.runtime.MACBlock(1))
     print(f"monkeypatched runtime containernet.")
 
 @pytest.fixture(scope="function")
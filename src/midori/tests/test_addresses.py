@@ -0,0 +1,75 @@
+import itertools
+import pytest
+from midori.parser import Defaults, Host, IPGenerator, MACGenerator, Parser
+
+def get_hosts (source: str) -> list:
+    return [ s for s in Parser ().parse (source).statements if isinstance(s, Host) ]
+
+def test_ip_generator_counts_through_range () -> None:
+    generator = IPGenerator ("10.0.0.0/8")
+    addresses = [ generator.next () for i in range(300) ]
+    assert addresses[0] == "10.0.0.1"
+    assert addresses[254:257] == [ "10.0.0.255", "10.0.1.0", "10.0.1.1" ]
+    assert len(set(addresses)) == 300
+
+def test_ip_generator_moves_to_next_range () -> None:
+    generator = IPGenerator ([ "192.168.0.0/30", "fd00::/126" ])
+    assert [ generator.next () for i in range(5) ] == [
+        "192.168.0.1", "192.168.0.2", "fd00::1", "fd00::2", "fd00::3" ]
+    with pytest.raises (ValueError):
+        generator.next ()
+
+def test_ip_generator_skips_reserved () -> None:
+    generator = IPGenerator ("10.0.0.0/24")
+    assert generator.reserve ("10.0.0.2/24")
+    assert generator.reserve ("fd00::1")
+    assert not generator.reserve ("10.0.0.2")
+    assert [ generator.next () for i in range(3) ] == [ "10.0.0.1", "10.0.0.3", "10.0.0.4" ]
+    """ Addresses already handed out collide, as do IPv4 and IPv6 only with their own version. """
+    assert not generator.reserve ("10.0.0.3")
+    assert generator.reserve ("10.0.0.200")
+    assert generator.reserve ("::a00:5")
+
+def test_program_skips_later_explicit_addresses () -> None:
+    source = 'host a image "x"\nhost b ip "10.0.0.1" image "x"\nhost c image "x"\n'
+    assert [ host.ip_addr for host in get_hosts (source) ] == [ "10.0.0.2", "10.0.0.1", "10.0.0.3" ]
+
+def test_program_addresses_beyond_one_subnet () -> None:
+    source = "".join ([ f'host h{i} image "x"\n' for i in range(600) ])
+    addresses = [ host.ip_addr for host in get_hosts (source) ]
+    assert len(set(addresses)) == 600
+    assert addresses[-1] == "10.0.2.88"
+
+def test_mac_generator_is_locally_administered () -> None:
+    generator = MACGenerator ("02:00:00")
+    assert [ generator.next () for i in range(2) ] == [ "02:00:00:00:00:01", "02:00:00:00:00:02" ]
+    generator.counter = itertools.count (255)
+    assert [ generator.next () for i in range(2) ] == [ "02:00:00:00:00:ff", "02:00:00:00:01:00" ]
+    generator.counter = itertools.count (1 << 24)
+    with pytest.raises (ValueError):
+        generator.next ()
+    with pytest.raises (ValueError):
+        MACGenerator ("01:00:5e")
+
+def test_mac_generator_skips_reserved () -> None:
+    generator = MACGenerator ("02:42")
+    assert generator.reserve ("02:42:00:00:00:02")
+    assert not generator.reserve ("02-42-00-00-00-02")
+    assert [ generator.next () for i in range(2) ] == [ "02:42:00:00:00:01", "02:42:00:00:00:03" ]
+
+def test_programs_get_the_same_macs () -> None:
+    source = 'host a image "x"\nhost b image "x" mac "02:00:00:00:00:01"\n'
+    first = [ host.mac for host in get_hosts (source) ]
+    second = [ host.mac for host in get_hosts (source) ]
+    assert first == second == [ "02:00:00:00:00:02", "02:00:00:00:00:01" ]
+    assert [ host.generated_mac for host in get_hosts (source) ] == [ True, False ]
+
+def test_reconfigured_hosts_keep_addresses () -> None:
+    previous = Parser ().parse ('host a image "x"\nhost b image "x"\nhost c image "x"\n')
+    source = 'host z image "x"\nhost b image "y"\nhost a ip "10.0.0.9" image "x"\nhost d ip "10.0.0.3" image "x"\n'
+    hosts = Parser ().parse (source, defaults=Defaults (previous=previous)).statements
+    assert [ (host.name, host.ip_addr, host.mac) for host in hosts ] == [
+        ("z", "10.0.0.1", "02:00:00:00:00:03"),
+        ("b", "10.0.0.2", "02:00:00:00:00:02"),
+        ("a", "10.0.0.9", "02:00:00:00:00:01"),
+        ("d", "10.0.0.3", "02:00:00:00:00:04") ]
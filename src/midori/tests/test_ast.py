@@ -0,0 +1,35 @@
+import io
+import pickle
+import pytest
+from midori.parser import Host, Link, Parser, Position
+from midori.tests.test_stream import make_program
+
+def test_statements_have_no_dict () -> None:
+    for statement in Parser ().parse (make_program (3)).statements:
+        assert not hasattr (statement, "__dict__")
+        with pytest.raises (AttributeError):
+            statement.line = 1
+
+def test_statement_positions () -> None:
+    statements = Parser ().parse (make_program (3)).statements
+    assert statements[0].meta == Position (1, 1)
+    hosts = [ s for s in statements if isinstance(s, Host) ]
+    assert [ host.meta.line for host in hosts ] == [ 4, 9, 14 ]
+    up, ping = statements[-3:-1]
+    assert up.meta == Position (3 + 3 * 5 + 2, 1)
+    assert ping.meta == Position (up.meta.line, 4)
+
+def test_stream_positions_match_parse () -> None:
+    source = make_program (20)
+    expected = [ s.meta for s in Parser ().parse (source).statements ]
+    streamed = Parser ().parse_stream (io.StringIO (source), chunk_lines=1)
+    assert [ s.meta for s in streamed ] == expected
+
+def test_pickle_keeps_positions () -> None:
+    statements = Parser ().parse (make_program (3)).statements
+    restored = pickle.loads (pickle.dumps (statements))
+    assert restored == statements
+    assert [ s.meta for s in restored ] == [ s.meta for s in statements ]
+    link = Link ("l1", "h1", "s1")
+    assert link.meta is None
+    assert pickle.loads (pickle.dumps (link)).meta is None
@@ -0,0 +1,94 @@
+import os
+import pytest
+import midori.compiler
+from midori.compiler import Watcher, compile_file, compile_files, find_sources, summarize
+from midori.tests.test_checker import INVALID, VALID
+
+def write (path, text: str) -> str:
+    path.parent.mkdir (parents=True, exist_ok=True)
+    path.write_text (text)
+    return str(path)
+
+@pytest.fixture
+def sources (tmp_path):
+    return [
+        write (tmp_path / "src" / "a.midori", VALID),
+        write (tmp_path / "src" / "nested" / "b.midori", VALID.replace ("host b", "host b2").replace ("src b", "src b2").replace ("-> b", "-> b2").replace ("ping a b", "ping a b2")),
+        write (tmp_path / "src" / "bad.midori", INVALID) ]
+
+def test_find_sources (sources, tmp_path) -> None:
+    found = find_sources ([ str(tmp_path / "src"), str(tmp_path / "src" / "*.midori") ])
+    assert sorted (found) == sorted (sources)
+
+@pytest.mark.parametrize("jobs", [ 1, 2 ])
+def test_compile_files (sources, tmp_path, jobs) -> None:
+    out = tmp_path / "out"
+    results = compile_files (sources, output_dir=str(out), jobs=jobs)
+    assert [ r.status for r in results ] == [ "compiled", "compiled", "failed" ]
+    assert (out / "a.py").exists () and (out / "nested" / "b.py").exists ()
+    assert "12 semantic error(s)" in results[2].error
+    assert summarize (results, 1.0).startswith ("compiled 2, unchanged 0, failed 1 in 1.00s")
+
+    """ Only changed and failed sources are compiled again. """
+    write (tmp_path / "src" / "a.midori", VALID + "# changed\n")
+    results = compile_files (sources, output_dir=str(out), jobs=jobs)
+    assert [ r.status for r in results ] == [ "compiled", "unchanged", "failed" ]
+    results = compile_files (sources, output_dir=str(out), jobs=jobs, force=True)
+    assert [ r.status for r in results ] == [ "compiled", "compiled", "failed" ]
+
+def test_compile_files_next_to_sources (sources) -> None:
+    results = compile_files (sources[:1], jobs=1, dry_run=True)
+    assert results[0].status == "compiled"
+    assert not os.path.exists (results[0].output)
+    results = compile_files (sources[:1], jobs=1)
+    assert results[0].output == sources[0].replace (".midori", ".py")
+    assert os.path.exists (results[0].output)
+    assert os.path.exists (os.path.join (os.path.dirname (sources[0]), ".midori-manifest.json"))
+
+def test_compile_files_address_settings (sources, tmp_path, monkeypatch) -> None:
+    """ A change to the address settings compiles every source again. """
+    out = tmp_path / "out"
+    watcher = Watcher ([ str(tmp_path / "src") ], output_dir=str(out))
+    watcher.poll ()
+    assert watcher.poll () == []
+    monkeypatch.setenv ("COMPILER_IP_RANGES", "192.168.0.0/24")
+    results = compile_files (sources, output_dir=str(out), jobs=1)
+    assert [ r.status for r in results ] == [ "compiled", "compiled", "failed" ]
+    monkeypatch.setenv ("COMPILER_MAC_PREFIX", "0a:bb:cc")
+    assert sorted ([ r.status for r in watcher.poll () ]) == [ "compiled", "compiled", "failed" ]
+
+def test_compile_file_stream (sources, tmp_path) -> None:
+    """ A streamed program that fails its check leaves no output, and keeps the one
+    an earlier compile wrote. """
+    out = tmp_path / "out"
+    out.mkdir ()
+    output = str(out / "a.py")
+    result = compile_file (sources[0], output, stream=True, debug=True)
+    assert result.status == "compiled" and midori.compiler._batch_compiler.debug
+    compiled = (out / "a.py").read_text ()
+    assert compile_file (sources[2], str(out / "bad.py"), stream=True).status == "failed"
+    assert compile_file (sources[2], output, stream=True).status == "failed"
+    assert not midori.compiler._batch_compiler.debug
+    assert sorted (os.listdir (out)) == [ "a.py" ]
+    assert (out / "a.py").read_text () == compiled
+
+def test_watcher (sources, tmp_path) -> None:
+    out = tmp_path / "out"
+    watcher = Watcher ([ str(tmp_path / "src") ], output_dir=str(out))
+    results = watcher.poll ()
+    assert sorted ([ (r.source, r.status) for r in results ]) == sorted ([
+        (sources[0], "compiled"), (sources[1], "compiled"), (sources[2], "failed") ])
+    assert watcher.poll () == []
+
+    """ Only sources that changed or appeared are compiled, keeping the layout of the outputs. """
+    write (tmp_path / "src" / "nested" / "b.midori", VALID + "# changed\n")
+    added = write (tmp_path / "src" / "c.midori", VALID)
+    results = watcher.poll ()
+    assert sorted ([ (r.source, r.status) for r in results ]) == sorted ([
+        (sources[1], "compiled"), (added, "compiled") ])
+    assert (out / "nested" / "b.py").exists () and (out / "c.py").exists ()
+
+    """ A touched source whose text is the same is not compiled again. """
+    os.utime (sources[0], ns=(0, 0))
+    assert [ r.status for r in watcher.poll () ] == [ "unchanged" ]
+    assert watcher.poll () == []
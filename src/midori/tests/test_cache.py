@@ -0,0 +1,52 @@
+import os
+from midori.cache import CompileCache
+from midori.compiler import Compiler
+from midori.utils import Resource
+
+def read_example (name: str) -> str:
+    return Resource.read_file (os.path.join (
+        os.path.dirname (__file__), "..", "..", "..", "examples", name))
+
+def test_compile_cache_memory () -> None:
+    compiler = Compiler (cache=CompileCache (size=1, path=None))
+    alpha = read_example ("onos-alpha.midori")
+    beta = read_example ("onos-beta.midori")
+    first = compiler.process (source=alpha)
+    assert compiler.process (source=alpha) == first
+    assert (compiler.cache.hits, compiler.cache.misses) == (1, 1)
+    """ The size limit evicts the least recently used entry. """
+    compiler.process (source=beta)
+    compiler.process (source=alpha)
+    assert (compiler.cache.hits, compiler.cache.misses) == (1, 3)
+
+def test_compile_cache_disk (tmp_path) -> None:
+    source = read_example ("net.midori")
+    first = Compiler (cache=CompileCache (size=4, path=str(tmp_path)))
+    output = first.process (source=source)
+    second = Compiler (cache=CompileCache (size=4, path=str(tmp_path)))
+    result = second.compile (source)
+    assert result.python == output
+    assert result.ast == first.compile (source).ast
+    assert (second.cache.hits, second.cache.misses) == (1, 0)
+
+def test_compile_cache_address_settings (tmp_path, monkeypatch) -> None:
+    """ Addresses are built into the AST, so a change to their settings compiles again. """
+    source = 'host a image "ubuntu"\n'
+    first = Compiler (cache=CompileCache (size=4, path=str(tmp_path))).compile (source)
+    monkeypatch.setenv ("COMPILER_IP_RANGES", "192.168.0.0/24")
+    monkeypatch.setenv ("COMPILER_MAC_PREFIX", "0a:bb:cc")
+    compiler = Compiler (cache=CompileCache (size=4, path=str(tmp_path)))
+    host = compiler.compile (source).ast.statements[0]
+    assert (compiler.cache.hits, compiler.cache.misses) == (0, 1)
+    assert (host.ip_addr, host.mac) == ("192.168.0.1", "0a:bb:cc:00:00:01")
+    assert first.ast.statements[0].ip_addr == "10.0.0.1"
+
+def test_compile_cache_code_object (tmp_path) -> None:
+    source = read_example ("net.midori")
+    first = Compiler (cache=CompileCache (size=4, path=str(tmp_path))).compile (source)
+    second = Compiler (cache=CompileCache (size=4, path=str(tmp_path))).compile (source)
+    assert second.bytecode == first.bytecode
+    assert second.get_code () is second.get_code ()
+    assert "run_network" in second.get_code ().co_names
+    """ The code object is not stored or compared. """
+    assert second.code is second.get_code () and second == first
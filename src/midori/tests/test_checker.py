@@ -0,0 +1,87 @@
+import io
+import pytest
+import midori.runtime
+from midori.cache import CompileCache
+from midori.checker import Checker, SemanticException, check
+from midori.compiler import Compiler
+from midori.parser import Parser
+
+VALID = """controller c0
+host a ip "10.0.0.1" image "ubuntu" port_bindings { 80 : 8080 }
+host b ip "10.0.0.2" image "ubuntu"
+switch s1 s2
+link l1 src a dst s1 port1 1 port2 1
+link l2 src s1 dst s2 port1 2
+link l3 src b dst s2
+intent a -> b
+up
+ping a b
+down
+"""
+
+INVALID = """controller c0
+controller c0
+host a ip "10.0.0.1" image "ubuntu" mac "02:00:00:00:00:01" port_bindings { 80 : 8080 }
+host b ip "10.0.0.1/24" image "ubuntu" mac "02-00-00-00-00-01" port_bindings { 81 : 8080 }
+switch s1 a
+link l1 src a dst s1 port2 1
+link l1 src s1 dst b port1 1
+link l3 src b dst s9
+intent a -> s1 -> c
+host c ip "10.0.0.300" image "ubuntu" mac "nope"
+ping a c
+"""
+
+def test_valid_program () -> None:
+    assert Checker ().check (Parser ().parse (VALID)) == []
+
+def test_reports_every_error_with_its_line () -> None:
+    errors = Checker ().check (Parser ().parse (INVALID))
+    assert [ str(error) for error in errors ] == [
+        "line 2: controller c0 is already declared at line 1",
+        "line 4: host b's IP address 10.0.0.1/24 is also used by host a",
+        "line 4: host b's MAC address 02-00-00-00-00-01 is also used by host a",
+        "line 4: port 8080, bound by host b, is also used by host a",
+        "line 5: switch a is already declared as a host at line 3",
+        "line 7: link l1 is already declared at line 6",
+        "line 7: port 1 of s1, used by link l1, is also used by link l1",
+        "line 8: link l3 refers to undeclared host or switch s9",
+        "line 9: intent a s1 c refers to s1, a switch, not a host",
+        "line 9: intent a s1 c refers to c before it is declared at line 10",
+        "line 10: host c has an invalid IP address 10.0.0.300",
+        "line 10: host c has an invalid MAC address nope" ]
+
+def test_stream_is_checked_as_it_passes () -> None:
+    statements = Checker ().check_stream (Parser ().parse_stream (io.StringIO (INVALID), chunk_lines=1))
+    assert next(statements).name == "c0"
+    with pytest.raises (SemanticException) as error:
+        list(statements)
+    assert len(error.value.errors) == 12
+
+def test_compile_rejects_invalid_program () -> None:
+    compiler = Compiler (cache=CompileCache (size=1, path=None))
+    with pytest.raises (SemanticException) as error:
+        compiler.compile (INVALID)
+    assert str(error.value).startswith ("12 semantic error(s):\n  line 2: controller c0")
+    with pytest.raises (SemanticException):
+        check (Parser ().parse (INVALID))
+    """ Nothing is cached for a program with errors. """
+    assert compiler.compile (VALID).python
+
+def test_worker_rejects_invalid_program (monkeypatch) -> None:
+    stopped = []
+    class Live:
+        class context:
+            def stop ():
+                stopped.append (True)
+        program = Parser ().parse (VALID)
+    def no_context (*args, **kwargs):
+        raise AssertionError ("a context was created")
+    monkeypatch.setattr (midori.runtime, "Context", no_context)
+    monkeypatch.setattr (midori.runtime, "live_simulation", Live)
+    for reconfigure in [ False, True ]:
+        result = midori.runtime.run_simulation ({ "source" : INVALID, "reconfigure" : reconfigure })
+        assert result["error"].startswith ("12 semantic error(s)")
+        assert result["log"] == []
+    """ The running simulation was left alone. """
+    assert stopped == [] and midori.runtime.live_simulation is Live
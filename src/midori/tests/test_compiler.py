@@ -88,13 +88,13 @@ class TestCompiler(TestBase):
     def get_expected(self) -> List[str]:
         return [            
             """d1 = context.add_container(
-        name="d1",ip="10.0.0.251", image="ubuntu:trusty", mac="00:00:00:00:00:01",
+        name="d1",ip="10.0.0.251", image="ubuntu:trusty", mac="02:00:00:00:00:01",
         env={ },
         ports=[],
         port_bindings = {  },
         cmd=[])""",
             """d2 = context.add_container(
-        name="d2",ip="10.0.0.252", image="ubuntu:trusty", mac="00:00:00:00:00:02",
+        name="d2",ip="10.0.0.252", image="ubuntu:trusty", mac="02:00:00:00:00:02",
         env={ },
         ports=[],
         port_bindings = {  },
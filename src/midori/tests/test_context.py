@@ -0,0 +1,265 @@
+import pytest
+import random
+import redis
+import threading
+import time
+from collections import namedtuple
+from midori.interpreter import Interpreter
+from midori.parser import Parser
+from midori.runtime import ContainernetFactory, Context, Controller, Host, MACBlock, MidoriException, WarmPool
+
+class SlowFactory(ContainernetFactory):
+    """ Creates containers with random latency, recording peak concurrency. """
+    def __init__(self) -> None:
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock ()
+    def create_docker(self, name, **params):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep (random.uniform (0.01, 0.03))
+        with self.lock:
+            self.active -= 1
+        return FakeDocker (name, **params)
+    def get_containernet(self):
+        return RecordingNet ()
+
+class RecordingNet:
+    """ Records the hosts added and the threads they were added from. """
+    def __init__(self) -> None:
+        self.hosts = []
+        self.threads = set ()
+    def addDocker(self, name, cls, **params):
+        self.threads.add (threading.get_ident ())
+        docker = cls (name, **params)
+        self.hosts.append (docker)
+        return docker
+
+class RecordingGraph:
+    def __init__(self) -> None:
+        self.hosts = []
+    def add_host(self, alias, properties):
+        self.hosts.append(alias)
+        return alias
+    def add_intent(self, alias, properties):
+        return alias
+    def add_edge(self, subject, predicate, object):
+        pass
+
+class BatchController(Controller):
+    def __init__(self) -> None:
+        self.batches = []
+    def create_host_intent(self, ingress_device, egress_device):
+        raise AssertionError("intents should be submitted in batches")
+    def create_host_intents(self, intents):
+        self.batches.append(intents)
+
+def make_context (concurrency: int) -> Context:
+    return Context (controller=BatchController (), graph=RecordingGraph (), container_concurrency=concurrency,
+                    batch_intents=True, persist_graph=True, incremental_graph=False,
+                    mac_block=MACBlock (0), factory=SlowFactory ())
+
+def test_add_containers () -> None:
+    context = make_context (concurrency=3)
+    names = [ f"h{i}" for i in range(12) ]
+    hosts = context.add_containers ([
+        { "name" : name, "ip" : f"10.0.0.{i+1}", "image" : "ubuntu", "mac" : f"02:00:00:00:00:{i+1:02x}" }
+        for i, name in enumerate(names) ])
+    assert [ host.node.name for host in hosts ] == names
+    assert [ host.gnode for host in hosts ] == names
+    assert context.graph.hosts == names
+    assert [ docker.name for docker in context.net.hosts ] == names
+    assert context.net.threads == { threading.get_ident () }
+    assert 1 < context.factory.peak <= 3
+
+def test_flush_intents () -> None:
+    context = make_context (concurrency=1)
+    a, b, c = [ Host(namedtuple('FakeNode', 'name')(name), name) for name in "abc" ]
+    context.add_host2host_intent (src=a, src_mac="02:00:00:00:00:01", dst=b, dst_mac="02:00:00:00:00:02")
+    context.add_host2host_intent (src=b, src_mac="02:00:00:00:00:02", dst=c, dst_mac="02:00:00:00:00:03")
+    assert context.controller.batches == []
+    context.flush_intents ()
+    context.flush_intents ()
+    assert context.controller.batches == [[
+        ("02:00:00:00:00:01/None", "02:00:00:00:00:02/None"),
+        ("02:00:00:00:00:02/None", "02:00:00:00:00:03/None")
+    ]]
+
+class CounterRedis:
+    def __init__(self, value: int) -> None:
+        self.value = value
+    def incr(self, key):
+        self.value += 1
+        return self.value
+
+class DownRedis:
+    def incr(self, key):
+        raise redis.exceptions.ConnectionError ("connection refused")
+
+def test_mac_block () -> None:
+    """ Each simulation takes the next block from the shared counter, skipping
+    block 0, and starts again from the first after the last. """
+    counter = CounterRedis (2)
+    first, second = MACBlock.allocate (counter), MACBlock.allocate (counter)
+    assert (first.index, second.index, first.count) == (3, 4, 256)
+    assert first.translate ("02:00:00:00:00:01") == "02:00:00:03:00:01"
+    assert second.translate ("02:00:00:00:00:01") == "02:00:00:04:00:01"
+    assert first.translate ("02:42:00:00:00:01") == "02:42:00:00:00:01"
+    assert MACBlock (0).translate ("02:00:00:00:00:01") == "02:00:00:00:00:01"
+    counter.value = 254
+    assert [ MACBlock.allocate (counter).index for i in range(3) ] == [ 255, 1, 2 ]
+    with pytest.raises (ValueError):
+        MACBlock (256)
+    """ A program allocated more addresses than a block holds is not moved into the next. """
+    with pytest.raises (ValueError):
+        first.translate ("02:00:00:01:00:00")
+    with pytest.raises (MidoriException):
+        MACBlock.allocate (DownRedis ())
+
+def test_generated_macs_move () -> None:
+    """ Allocated addresses are moved into the simulation's block, in containers and
+    intents. Addresses the program gives are used as is. """
+    events = []
+    context = make_context (concurrency=1)
+    context.mac_block = MACBlock (3)
+    context.net, context.controller = EventNet (events), EventController (events)
+    context.commit = lambda: None
+    Interpreter (context).run (Parser ().parse ("""
+    host a image "ubuntu"
+    host b image "ubuntu" mac "02:00:00:00:00:01"
+    host c image "ubuntu" mac "0a:00:00:00:00:01"
+    intent a -> b
+    intent b -> c
+    up down
+    """))
+    assert [ docker.params["mac"] for docker in context.net.hosts ] == [
+        "02:00:00:03:00:02", "02:00:00:00:00:01", "0a:00:00:00:00:01" ]
+    assert events[0] == ("intents", [ ("02:00:00:03:00:02/None", "02:00:00:00:00:01/None"),
+                                      ("02:00:00:00:00:01/None", "0a:00:00:00:00:01/None") ])
+
+class EventNet(RecordingNet):
+    """ Records when the network starts, pings, and stops. """
+    def __init__(self, events: list) -> None:
+        super().__init__()
+        self.events = events
+    def addSwitch(self, name):
+        return FakeDocker (name)
+    def addLink(self, *args, **kwargs):
+        pass
+    def start(self) -> None:
+        self.events.append (("start",))
+    def ping(self, nodes) -> None:
+        self.events.append (("ping", [ node.name for node in nodes ]))
+    def stop(self) -> None:
+        self.events.append (("stop",))
+
+class EventController(Controller):
+    def __init__(self, events: list) -> None:
+        self.events = events
+    def create_host_intent(self, ingress_device, egress_device):
+        self.events.append (("intent", ingress_device, egress_device))
+    def create_host_intents(self, intents):
+        self.events.append (("intents", intents))
+
+def test_intents_after_up () -> None:
+    """ Intents are held until up, then submitted as they are added. """
+    events = []
+    context = make_context (concurrency=1)
+    context.net, context.controller = EventNet (events), EventController (events)
+    context.commit = lambda: None
+    Interpreter (context).run (Parser ().parse ("""
+    host a image "ubuntu" mac "02:00:00:00:00:01"
+    host b image "ubuntu" mac "02:00:00:00:00:02"
+    host c image "ubuntu" mac "02:00:00:00:00:03"
+    intent a -> b
+    up
+    intent b -> c
+    ping b c
+    down
+    """))
+    assert events == [
+        ("intents", [ ("02:00:00:00:00:01/None", "02:00:00:00:00:02/None") ]),
+        ("start",),
+        ("intent", "02:00:00:00:00:02/None", "02:00:00:00:00:03/None"),
+        ("ping", [ "b", "c" ]),
+        ("stop",) ]
+
+class FakeDocker:
+    def __init__(self, name, **params) -> None:
+        self.name = name
+        self.params = params
+        self.terminated = False
+    def terminate(self) -> None:
+        self.terminated = True
+
+class FakeNet:
+    def __init__(self) -> None:
+        self.hosts = []
+        self.nameToNode = {}
+    def addDocker(self, name, cls=FakeDocker, **params):
+        docker = cls (name, **params)
+        self.hosts.append (docker)
+        self.nameToNode[name] = docker
+        return docker
+    def stop(self) -> None:
+        for host in self.hosts:
+            host.terminate ()
+
+class FakeFactory(ContainernetFactory):
+    def __init__(self) -> None:
+        self.nets = 0
+        self.cleanups = 0
+        self.pulled = []
+    def get_containernet(self) -> FakeNet:
+        self.nets += 1
+        return FakeNet ()
+    def cleanup_containernet(self) -> None:
+        self.cleanups += 1
+    def pull_image(self, image) -> None:
+        self.pulled.append (image)
+    def create_docker(self, name, **params) -> FakeDocker:
+        return FakeDocker (name, **params)
+
+class WarmController(Controller):
+    def __init__(self) -> None:
+        self.warmed = 0
+    def get_intent_ids(self):
+        self.warmed += 1
+        return []
+
+def test_warm_pool () -> None:
+    factory, controller = FakeFactory (), WarmController ()
+    pool = WarmPool (size=2, images=[ "ubuntu" ], factory=factory, controller=controller)
+    pool.start ()
+    host = { "ip" : "10.0.0.1", "image" : "ubuntu", "mac" : "02:00:00:00:00:01" }
+    web = { **host, "image" : "nginx", "ports" : [ 80 ] }
+
+    context = Context (controller=None, persist_graph=False, pool=pool, mac_block=MACBlock (0))
+    assert (factory.cleanups, factory.nets, controller.warmed, factory.pulled) == (1, 1, 1, [ "ubuntu" ])
+    assert context.controller is controller
+    used = [ context.add_container (name=name, **settings).node
+             for name, settings in [ ("h1", host), ("h2", host), ("web", web) ] ]
+    assert pool.summary () == { "hits" : 0, "misses" : 3, "idle" : 0 }
+
+    """ Containers are removed with the network. New ones are created for the
+    first hosts of the simulation, up to the size of the pool. """
+    context.stop ()
+    pool.refill ()
+    pool.wait ()
+    assert all ([ docker.terminated for docker in used ])
+    assert pool.summary () == { "hits" : 0, "misses" : 3, "idle" : 2 }
+
+    """ A host takes the new container made for it, and the network records it
+    through addDocker. An idle container for a host of the same name, but other
+    settings, is removed so the host's own container can have the name. """
+    context = Context (controller=None, persist_graph=False, pool=pool, mac_block=MACBlock (0))
+    assert factory.nets == 2
+    h1 = context.add_container (name="h1", **{ **host, "ip" : "10.0.0.9" }).node
+    assert h1 not in used and not h1.terminated
+    assert h1.params["dimage"] == "ubuntu" and h1.params["ip"] == "10.0.0.9"
+    assert context.net.nameToNode["h1"] is h1 and context.net.hosts == [ h1 ]
+    idle_h2 = pool.idle[pool.get_key ("h2", "ubuntu")]
+    h2 = context.add_container (name="h2", **web).node
+    assert idle_h2.terminated and h2 is not idle_h2 and h2.params["dimage"] == "nginx"
+    assert pool.summary () == { "hits" : 1, "misses" : 4, "idle" : 0 }
@@ -0,0 +1,172 @@
+from midori.graph import MidoriGraph, diff_graph, get_params_header, get_topology_graph
+from midori.topology import Topology
+from redis.commands.graph.edge import Edge
+from redis.commands.graph.node import Node
+
+class RecordingPipeline:
+    def __init__(self, client) -> None:
+        self.client = client
+        self.commands = []
+    def execute_command(self, *args) -> None:
+        self.commands.append(args)
+    def execute(self, raise_on_error: bool = True) -> list:
+        self.client.round_trips.append(self.commands)
+        return [ [] for command in self.commands ]
+
+class RecordingClient:
+    def __init__(self) -> None:
+        self.round_trips = []
+    def pipeline(self, transaction: bool = True) -> RecordingPipeline:
+        return RecordingPipeline(self)
+
+class DeleteResult:
+    def __init__(self, nodes_deleted: int) -> None:
+        self.nodes_deleted = nodes_deleted
+
+def make_graph (batch_size: int) -> MidoriGraph:
+    graph = MidoriGraph (graph="test", host="localhost", port=6379, batch_size=batch_size, pipeline=True)
+    graph.client = RecordingClient ()
+    return graph
+
+def test_commit_batches_writes () -> None:
+    graph = make_graph (batch_size=4)
+    hosts = [ graph.add_host (f"h{i}", { "ip" : f"10.0.0.{i}" }) for i in range(10) ]
+    switch = graph.add_switch ("s1")
+    for host in hosts:
+        graph.add_edge (host, "linked_to", switch, { "port1" : 1 })
+    graph.commit ()
+
+    assert len(graph.client.round_trips) == 1
+    queries = [ command[2] for command in graph.client.round_trips[0] ]
+    assert queries[0] == "CREATE INDEX ON :`Host`(name)"
+    assert queries[1] == "CREATE INDEX ON :`Switch`(name)"
+    creates = [ q for q in queries if "CREATE (n:`Host`:`Node`" in q ]
+    assert len(creates) == 3
+    assert creates[0].startswith ('CYPHER rows=[{name:"h0",ip:"10.0.0.0"},')
+    links = [ q for q in queries if "linked_to" in q ]
+    assert len(links) == 3
+    assert "MATCH (a:`Host` {name: row.__src}), (b:`Switch` {name: row.__dst})" in links[0]
+    """ Nodes are written before the edges that match them. """
+    assert queries.index (links[0]) > queries.index (creates[-1])
+
+    """ Buffers are emptied by commit and labels are indexed once. """
+    graph.add_host ("h10")
+    graph.commit ()
+    assert [ command[2] for command in graph.client.round_trips[1] ] == [
+        'CYPHER rows=[{name:"h10"}] UNWIND $rows AS row CREATE (n:`Host`:`Node` {`name`: row.`name`})' ]
+
+def test_params_header () -> None:
+    assert get_params_header ({ "rows" : [ { "name" : 'a"b\\c', "up" : True, "bw" : None, "delay" : 1.5 } ], "ports" : (1, 2) }) == \
+        'CYPHER rows=[{name:"a\\"b\\\\c",up:true,bw:null,delay:1.5}] ports=[1,2] '
+
+def test_clean_deletes_in_batches () -> None:
+    graph = make_graph (batch_size=100)
+    remaining = [ 250 ]
+    queries = []
+    def query (text, params=None):
+        queries.append (text)
+        deleted = min(remaining[0], 100)
+        remaining[0] -= deleted
+        return DeleteResult (deleted)
+    graph.graph.query = query
+    graph.clean ()
+    assert queries == [ "MATCH (n) WITH n LIMIT 100 DELETE n" ] * 3
+
+def test_prepared_queries_are_cached_per_version () -> None:
+    graph = make_graph (batch_size=10)
+    calls = []
+    def query (text, params=None, read_only=False):
+        calls.append ((text, params, read_only))
+        return len(calls)
+    graph.graph.query = query
+
+    first = graph.get_shortest_path ('d"1', "d2")
+    assert graph.get_shortest_path ('d"1', "d2") == first
+    graph.get_shortest_path ("d2", 'd"1')
+    assert len(calls) == 2
+    assert calls[0] == (MidoriGraph.queries["shortest_path"], { "src" : 'd"1', "dst" : "d2" }, True)
+
+    graph.add_switch ("s1")
+    graph.commit ()
+    assert graph.get_shortest_path ('d"1', "d2") != first
+    graph.get_hosts_behind_switch ("s1")
+    graph.get_neighbors ("s1")
+    assert len(calls) == 5
+
+class StoredResult:
+    def __init__(self, result_set: list) -> None:
+        self.result_set = result_set
+
+def store (graph: MidoriGraph, topology: Topology) -> None:
+    """ Answer the graph's reads as if it held a topology. """
+    nodes, edges = get_topology_graph (topology)
+    def query (text, params=None, read_only=False):
+        if text == "MATCH (n) RETURN n":
+            return StoredResult ([ [ Node (label=list(labels), properties=properties) ]
+                                   for labels, properties in nodes.values() ])
+        return StoredResult ([ [ src, relation, dst, Edge (Node (), relation, Node (), properties=properties) ]
+                               for (src, relation, dst), properties in edges.items() ])
+    graph.graph.query = query
+
+def make_topology (hosts: int) -> Topology:
+    topology = Topology ()
+    topology.add_switch ("s1")
+    for i in range(hosts):
+        topology.add_host (f"h{i}", { "ip" : f"10.0.0.{i}", "mac" : None, "cmd" : [] })
+        topology.add_link (f"h{i}", "s1", { "port1" : None, "delay" : "1ms" })
+    topology.add_intent ("h0", "h1")
+    return topology
+
+def test_diff_graph () -> None:
+    old, new = make_topology (4), make_topology (4)
+    assert not diff_graph (get_topology_graph (old), get_topology_graph (new))
+
+    new.add_host ("h1", { "ip" : "10.0.1.1", "cmd" : [] })
+    new.remove_node ("h2")
+    new.add_host ("h4", { "ip" : "10.0.0.4" })
+    new.add_link ("h4", "s1", { "delay" : "5ms" })
+    new.add_link ("h3", "s1", { "delay" : "2ms", "bw" : 10 })
+    new.add_intent ("h0", "h1")
+    new.add_intent ("h1", "h0")
+    new.add_switch ("h0")
+    new.remove_link ("h1", "s1")
+    diff = diff_graph (get_topology_graph (old), get_topology_graph (new))
+
+    assert diff.update_nodes == { "h1" : (("Host", "Node"), { "ip" : "10.0.1.1" }) }
+    """ h0 changed from a host to a switch, so it is replaced along with its edges. """
+    assert diff.remove_nodes == { "h0" : ("Host", "Node"), "h2" : ("Host", "Node") }
+    assert sorted(diff.add_nodes) == [ "h0", "h1_to_h0", "h4" ]
+    assert diff.remove_edges == [ ("h1", "linked_to", "s1") ]
+    assert diff.update_edges == { ("h3", "linked_to", "s1") : { "bw" : 10, "delay" : "2ms" } }
+    assert sorted(diff.add_edges) == [
+        ("h0", "linked_to", "s1"), ("h0_to_h1", "from", "h0"), ("h1_to_h0", "from", "h1"), ("h1_to_h0", "to", "h0"),
+        ("h4", "linked_to", "s1") ]
+
+def test_sync_writes_only_changes () -> None:
+    graph = make_graph (batch_size=100)
+    old = make_topology (50)
+    store (graph, old)
+    new = make_topology (50)
+    new.add_host ("h7", { "ip" : "10.0.9.7", "cmd" : [] })
+    new.remove_node ("h8")
+    new.add_host ("h50", { "ip" : "10.0.0.50", "cmd" : [] })
+    new.add_link ("h50", "s1", { "delay" : "1ms" })
+    diff = graph.sync (new)
+    assert str(diff) == "nodes +1 -1 ~1, edges +1 -0 ~0"
+
+    assert len(graph.client.round_trips) == 1
+    assert [ command[2] for command in graph.client.round_trips[0] ] == [
+        'CYPHER rows=[{__name:"h8"}] UNWIND $rows AS row MATCH (n:`Host` {name: row.__name}) DELETE n',
+        'CYPHER rows=[{__name:"h7",ip:"10.0.9.7"}] UNWIND $rows AS row ' +
+        'MATCH (n:`Host` {name: row.__name}) SET n.`ip` = row.`ip`',
+        "CREATE INDEX ON :`Host`(name)",
+        'CYPHER rows=[{name:"h50",ip:"10.0.0.50",cmd:[]}] UNWIND $rows AS row ' +
+        'CREATE (n:`Host`:`Node` {`cmd`: row.`cmd`, `ip`: row.`ip`, `name`: row.`name`})',
+        'CYPHER rows=[{__src:"h50",__dst:"s1",delay:"1ms"}] UNWIND $rows AS row ' +
+        'MATCH (a:`Host` {name: row.__src}), (b:`Switch` {name: row.__dst}) ' +
+        'CREATE (a)-[:`linked_to` {`delay`: row.`delay`}]->(b)' ]
+
+    """ Nothing is written when the graph already matches. """
+    store (graph, new)
+    assert not graph.sync (new)
+    assert len(graph.client.round_trips) == 1
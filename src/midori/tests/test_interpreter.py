@@ -0,0 +1,181 @@
+import os
+import sys
+import pytest
+from types import ModuleType
+from midori.compiler import Compiler
+from midori.cache import CompileCache
+from midori.interpreter import Interpreter
+from midori.runtime import Host, Switch
+from midori.utils import Code, Resource
+
+class Recorder:
+    """ Records calls made against a context, its network, and its nodes. """
+    def __init__(self) -> None:
+        self.calls = []
+        self.net = RecordingNet(self)
+    def log(self, message: str) -> None:
+        pass
+    def commit(self) -> None:
+        self.calls.append(("commit",))
+    def start(self) -> None:
+        self.calls.append(("start",))
+    def stop(self) -> None:
+        self.calls.append(("stop",))
+    def add_container(self, **kwargs) -> Host:
+        self.calls.append(("add_container", sorted(kwargs.items())))
+        return Host(RecordingNode(self, kwargs["name"]), None)
+    def add_containers(self, containers) -> list:
+        self.calls.append(("add_containers", [ container["name"] for container in containers ]))
+        return [ Host(RecordingNode(self, container["name"]), None) for container in containers ]
+    def add_switch(self, name: str) -> Switch:
+        self.calls.append(("add_switch", name))
+        return Switch(RecordingNode(self, name), None)
+    def add_link(self, src, dst, **kwargs) -> None:
+        kwargs = { k : v.__name__ if isinstance(v, type) else v for k, v in kwargs.items() if v }
+        self.calls.append(("add_link", src.node.name, dst.node.name, sorted(kwargs.items())))
+    def add_host2host_intent(self, src, src_mac, dst, dst_mac) -> None:
+        self.calls.append(("intent", src.node.name, src_mac, dst.node.name, dst_mac))
+    def flush_intents(self) -> None:
+        self.calls.append(("flush_intents",))
+    def remove_host2host_intent(self, src, src_mac, dst, dst_mac) -> None:
+        self.calls.append(("remove_intent", src.node.name, dst.node.name))
+    def remove_link(self, src, dst) -> None:
+        self.calls.append(("remove_link", src.node.name, dst.node.name))
+    def remove_container(self, host) -> None:
+        self.calls.append(("remove_container", host.node.name))
+    def remove_switch(self, switch) -> None:
+        self.calls.append(("remove_switch", switch.node.name))
+    def start_added(self, switches, hosts, links) -> None:
+        self.calls.append(("start_added", [ s.node.name for s in switches ], [ h.node.name for h in hosts ]))
+
+class RecordingNet:
+    def __init__(self, recorder: Recorder) -> None:
+        self.recorder = recorder
+    def start(self) -> None:
+        self.recorder.calls.append(("start",))
+    def stop(self) -> None:
+        self.recorder.calls.append(("stop",))
+    def ping(self, nodes) -> None:
+        self.recorder.calls.append(("ping", [ node.name for node in nodes ]))
+
+class RecordingNode:
+    def __init__(self, recorder: Recorder, name: str) -> None:
+        self.recorder = recorder
+        self.name = name
+    def cmd(self, command: str) -> None:
+        self.recorder.calls.append(("cmd", self.name, command))
+
+class TCLink:
+    pass
+
+class Containernet:
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+    def addController(self, *args, **kwargs) -> None:
+        pass
+
+@pytest.fixture(scope="function")
+def mock_mininet_modules(monkeypatch):
+    modules = {
+        "mininet.net"  : [ "Containernet" ],
+        "mininet.node" : [ "Controller", "RemoteController" ],
+        "mininet.cli"  : [ "CLI" ],
+        "mininet.link" : [ "TCLink" ],
+        "mininet.log"  : [ "setLogLevel", "info" ]
+    }
+    for name, attributes in modules.items():
+        module = ModuleType(name)
+        for attribute in attributes:
+            setattr(module, attribute, globals().get(attribute, lambda *args, **kwargs: None))
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.setitem(sys.modules, "mininet", ModuleType("mininet"))
+
+def compile_example (example: str):
+    source = Resource.read_file (os.path.join (
+        os.path.dirname (__file__), "..", "..", "..", "examples", example))
+    return Compiler (cache=CompileCache (size=1, path=None)).compile (source)
+
+@pytest.mark.parametrize("example", [ "net.midori", "onos-alpha.midori", "onos-beta.midori" ])
+def test_interpreter_matches_codegen (mock_mininet_modules, example) -> None:
+    compiled = compile_example (example)
+
+    generated = Recorder ()
+    Code.importCode (compiled.get_code ()).run_network (generated)
+    interpreted = Recorder ()
+    Interpreter (interpreted, batch_containers=False).run (compiled.ast)
+
+    assert interpreted.calls
+    assert interpreted.calls == generated.calls
+
+def test_interpreter_batches_hosts (mock_mininet_modules) -> None:
+    compiled = compile_example ("onos-alpha.midori")
+    single = Recorder ()
+    Interpreter (single, batch_containers=False).run (compiled.ast)
+    batched = Recorder ()
+    Interpreter (batched, batch_containers=True).run (compiled.ast)
+
+    assert batched.calls[0] == ("add_containers", [ "db", "blog", "api", "web" ])
+    assert [ call for call in single.calls if call[0] != "add_container" ] == batched.calls[1:]
+
+def compile_source (source: str):
+    return Compiler (cache=CompileCache (size=1, path=None)).compile (source).ast
+
+def test_interpreter_reconfigures_running_network (mock_mininet_modules) -> None:
+    before = compile_source ("""
+        host a image "ubuntu" mac "02:00:00:00:00:01"
+        host b image "ubuntu" mac "02:00:00:00:00:02"
+        host c image "ubuntu" mac "02:00:00:00:00:03"
+        switch s1 s2
+        link l1 src a dst s1
+        link l2 src b dst s1
+        link l3 src c dst s2 delay "1ms"
+        link l4 src s1 dst s2
+        intent a->b
+        intent b->c
+        up""")
+    after = compile_source ("""
+        host a image "ubuntu" mac "02:00:00:00:00:01"
+        host b image "ubuntu" mac "02:00:00:00:00:0b"
+        host d image "ubuntu" mac "02:00:00:00:00:04" cmd [ "serve" ]
+        switch s1 s2 s3
+        link l1 src a dst s1
+        link l2 src b dst s1
+        link l4 src s1 dst s2
+        link l5 src d dst s3
+        link l6 src s3 dst s2
+        intent a->b
+        intent a->d
+        up
+        ping a d
+        down""")
+    context = Recorder ()
+    interpreter = Interpreter (context, batch_containers=True)
+    interpreter.run (before)
+    assert interpreter.running
+    context.calls = []
+
+    diff = interpreter.reconfigure (after)
+    assert str(diff) == "hosts +2 -2, switches +1 -0, links +3 -2, intents +2 -2"
+    assert context.calls == [
+        ("remove_intent", "a", "b"),
+        ("remove_intent", "b", "c"),
+        ("remove_link", "b", "s1"),
+        ("remove_link", "c", "s2"),
+        ("remove_container", "b"),
+        ("remove_container", "c"),
+        ("add_switch", "s3"),
+        ("add_containers", [ "b", "d" ]),
+        ("add_link", "b", "s1", []),
+        ("add_link", "d", "s3", []),
+        ("add_link", "s3", "s2", []),
+        ("start_added", [ "s3" ], [ "b", "d" ]),
+        ("cmd", "d", "serve"),
+        ("intent", "a", "02:00:00:00:00:01", "b", "02:00:00:00:00:0b"),
+        ("intent", "a", "02:00:00:00:00:01", "d", "02:00:00:00:00:04"),
+        ("flush_intents",),
+        ("commit",),
+        ("ping", [ "a", "d" ]),
+        ("stop",)
+    ]
+    assert not interpreter.running
+    assert not interpreter.reconfigure (after)
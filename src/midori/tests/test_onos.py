@@ -0,0 +1,146 @@
+import json
+import re
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from midori.runtime import AsyncOnos, Onos, MidoriException
+
+class OnosStandIn (ThreadingHTTPServer):
+    """ A local stand-in for the parts of the Onos REST API Midori uses. """
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), OnosHandler)
+        self.intents = {}
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock ()
+
+    def add_intent(self, app_id: str, one: str, two: str) -> str:
+        with self.lock:
+            intent_id = hex(len(self.requests) + len(self.intents) + 0x100)
+            self.intents[intent_id] = { "id" : intent_id, "appId" : app_id, "one" : one, "two" : two }
+            return intent_id
+
+class OnosHandler (BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup ()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def reply(self, status: int, body: object = None, headers: dict = {}) -> None:
+        data = json.dumps(body).encode () if body is not None else b""
+        self.send_response (status)
+        self.send_header ("Content-Type", "application/json")
+        self.send_header ("Content-Length", str(len(data)))
+        for k, v in headers.items ():
+            self.send_header (k, v)
+        self.end_headers ()
+        self.wfile.write (data)
+
+    def do_GET(self) -> None:
+        self.server.requests.append (("GET", self.path))
+        if self.path.split("?")[0] == "/onos/v1/intents":
+            with self.server.lock:
+                self.reply (200, { "intents" : list(self.server.intents.values ()) })
+        else:
+            self.reply (404)
+
+    def do_DELETE(self) -> None:
+        self.server.requests.append (("DELETE", self.path))
+        match = re.match (r"^/onos/v1/intents/([^/]+)/([^/?]+)$", self.path)
+        with self.server.lock:
+            if match and self.server.intents.get (match.group(2), {}).get ("appId") == match.group(1):
+                del self.server.intents[match.group(2)]
+                self.reply (204)
+            else:
+                self.reply (404)
+
+    def do_POST(self) -> None:
+        self.server.requests.append (("POST", self.path))
+        body = json.loads (self.rfile.read (int(self.headers["Content-Length"])))
+        if self.path == "/onos/v1/intents/" and body.get ("one") and body.get ("two"):
+            intent_id = self.server.add_intent (body["appId"], body["one"], body["two"])
+            self.reply (201, headers={
+                "Location" : f"http://{self.headers['Host']}/onos/v1/intents/{body['appId']}/{intent_id}" })
+        else:
+            self.reply (400, { "message" : "bad intent" })
+
+@pytest.fixture(scope="function")
+def onos_server():
+    server = OnosStandIn ()
+    thread = threading.Thread (target=server.serve_forever, daemon=True)
+    thread.start ()
+    yield server
+    server.shutdown ()
+    server.server_close ()
+
+def make_onos (server: OnosStandIn, **kwargs) -> Onos:
+    host, port = server.server_address
+    return Onos (api_host=host, api_port=port, username="onos", password="rocks", **kwargs)
+
+def test_onos_reuses_connections (onos_server) -> None:
+    onos = make_onos (onos_server)
+    onos.create_host_intent ("00:00:00:00:00:01/None", "00:00:00:00:00:02/None")
+    onos.create_host_intent ("00:00:00:00:00:02/None", "00:00:00:00:00:03/None")
+    assert len(onos.get ("onos/v1/intents")["intents"]) == 2
+    onos.clean (concurrency=1)
+    assert onos_server.intents == {}
+    assert onos_server.connections == 1
+
+    metrics = onos.metrics.summary ()
+    assert metrics["POST onos/v1/intents/"]["count"] == 2
+    assert metrics["DELETE onos/v1/intents/{app}/{id}"]["count"] == 2
+    assert metrics["GET onos/v1/intents"]["max"] > 0
+
+def test_onos_failed_intent (onos_server) -> None:
+    onos = make_onos (onos_server)
+    with pytest.raises (MidoriException):
+        onos.create_host_intent ("00:00:00:00:00:01/None", None)
+
+def test_onos_clean_only_midori_intents (onos_server) -> None:
+    for i in range(20):
+        onos_server.add_intent (Onos.app_id, f"{i}/None", f"{i+1}/None")
+    other = onos_server.add_intent ("org.onosproject.fwd", "a/None", "b/None")
+    onos = make_onos (onos_server)
+    onos.clean (concurrency=4, wait=True, deadline=5)
+    assert list(onos_server.intents) == [ other ]
+    assert onos.metrics.summary ()["DELETE onos/v1/intents/{app}/{id}"]["count"] == 20
+
+def test_onos_wait_for_withdrawal_deadline (onos_server) -> None:
+    intent_id = onos_server.add_intent (Onos.app_id, "a/None", "b/None")
+    onos = make_onos (onos_server)
+    assert not onos.wait_for_withdrawal ([ intent_id ], deadline=0.2, interval=0.05)
+    assert onos.wait_for_withdrawal ([ "0x1" ], deadline=0.2, interval=0.05)
+
+def test_onos_create_host_intents (onos_server) -> None:
+    onos = make_onos (onos_server)
+    pairs = [ (f"{i}/None", f"{i+1}/None") for i in range(16) ]
+    onos.create_host_intents (pairs, concurrency=4)
+    assert sorted((intent["one"], intent["two"]) for intent in onos_server.intents.values ()) == sorted(pairs)
+    with pytest.raises (MidoriException):
+        onos.create_host_intents ([ ("a/None", "b/None"), ("c/None", None) ])
+
+def make_async_onos (server: OnosStandIn, **kwargs) -> AsyncOnos:
+    host, port = server.server_address
+    return AsyncOnos (api_host=host, api_port=port, username="onos", password="rocks", **kwargs)
+
+@pytest.mark.asyncio
+async def test_async_onos (onos_server) -> None:
+    other = onos_server.add_intent ("org.onosproject.fwd", "a/None", "b/None")
+    async with make_async_onos (onos_server) as onos:
+        await onos.create_host_intent ("00:00:00:00:00:01/None", "00:00:00:00:00:02/None")
+        await onos.create_host_intents ([ (f"{i}/None", f"{i+1}/None") for i in range(10) ], concurrency=4)
+        intents = await onos.get ("onos/v1/intents")
+        assert len(intents["intents"]) == 12
+        await onos.clean (concurrency=4, wait=True, deadline=5)
+        assert list(onos_server.intents) == [ other ]
+        assert onos.metrics.summary ()["POST onos/v1/intents/"]["count"] == 11
+        with pytest.raises (MidoriException):
+            await onos.create_host_intents ([ ("c/None", None) ])
+    assert onos_server.connections <= 4
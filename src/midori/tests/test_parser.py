@@ -12,8 +12,8 @@ class TestParser(TestBase):
         return {
             "Controller" : [ "Controller(name='c0')" ],
             "Host" : [
-                "Host(name='d1', ip_addr='10.0.0.251', image='ubuntu:trusty', mac='00:00:00:00:00:01', ports=[], port_bindings=[], env=[], cmd=[])",
-                "Host(name='d2', ip_addr='10.0.0.252', image='ubuntu:trusty', mac='00:00:00:00:00:02', ports=[], port_bindings=[], env=[], cmd=[])"
+                "Host(name='d1', ip_addr='10.0.0.251', image='ubuntu:trusty', mac='02:00:00:00:00:01', ports=[], port_bindings=[], env=[], cmd=[])",
+                "Host(name='d2', ip_addr='10.0.0.252', image='ubuntu:trusty', mac='02:00:00:00:00:02', ports=[], port_bindings=[], env=[], cmd=[])"
             ],
             "Switch" : [ "Switch(name=['s1', 's2'])" ],
             "Link" : [
@@ -0,0 +1,31 @@
+import os
+import midori.parser
+from midori.parser import Parser, build_parser, get_parser
+
+SOURCE = 'host h1 image "ubuntu" switch s1 link l1 src h1 dst s1 up down'
+
+def test_parser_is_built_on_first_use (monkeypatch) -> None:
+    monkeypatch.setattr (midori.parser, "_parser", None)
+    monkeypatch.setattr (midori.parser, "_transformer", None)
+    program = Parser ().parse (SOURCE)
+    assert midori.parser._parser is not None and midori.parser._transformer is not None
+    assert midori.parser.parser is midori.parser._parser
+    assert [ s.__class__.__name__ for s in program.statements ] == [ "Host", "Switch", "Link", "Up", "Down" ]
+
+def test_parser_loads_cached_tables (monkeypatch, tmp_path) -> None:
+    path = str(tmp_path / "midori.lark.cache")
+    monkeypatch.setenv ("COMPILER_PARSER_CACHE_PATH", path)
+    expected = Parser ().parse (SOURCE)
+
+    assert build_parser () == path
+    built = os.path.getmtime (path)
+    monkeypatch.setattr (midori.parser, "_parser", None)
+    assert Parser ().parse (SOURCE) == expected
+    """ The tables were loaded, not rebuilt. """
+    assert os.path.getmtime (path) == built
+
+def test_parser_without_writable_cache (monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv ("COMPILER_PARSER_CACHE_PATH", str(tmp_path / "missing" / "midori.lark.cache"))
+    monkeypatch.setattr (midori.parser, "_parser", None)
+    assert get_parser () is not None
+    assert not os.path.exists (tmp_path / "missing")
@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from redis.exceptions import ResponseError
+from midori.client import MidoriClient
+from midori.results import ResultWaiter
+
+class FakeRedis:
+    """ Stores values and publishes keyspace notifications for them, like a Redis
+    server with notify-keyspace-events enabled. """
+    def __init__(self, notify: bool = True) -> None:
+        self.values = {}
+        self.notify = notify
+        self.flags = ""
+        self.gets = 0
+        self.queues = []
+        self.connection_pool = SimpleNamespace (connection_kwargs={ "db" : 0 })
+
+    async def config_get (self, name):
+        if not self.notify:
+            raise ResponseError ("unknown command 'CONFIG'")
+        return { name : self.flags }
+
+    async def config_set (self, name, value):
+        self.flags = value
+
+    def pubsub (self):
+        return FakePubSub (self)
+
+    async def get (self, key):
+        self.gets += 1
+        return self.values.get (key)
+
+    async def set (self, key, value):
+        self.values[key] = value
+        if "K" in self.flags:
+            for queue in self.queues:
+                queue.put_nowait ({ "type" : "pmessage", "channel" : f"__keyspace@0__:{key}".encode (), "data" : b"set" })
+
+class FakePubSub:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.queue = asyncio.Queue ()
+        redis.queues.append (self.queue)
+
+    async def psubscribe (self, pattern):
+        self.queue.put_nowait ({ "type" : "psubscribe", "channel" : pattern.encode (), "data" : 1 })
+
+    async def listen (self):
+        while True:
+            yield await self.queue.get ()
+
+    async def close (self):
+        pass
+
+async def store_later (redis: FakeRedis, key: str, value: bytes, seconds: float) -> None:
+    await asyncio.sleep (seconds)
+    await redis.set (key, value)
+
+@pytest.mark.parametrize("notify", [ True, False ])
+def test_wait (notify) -> None:
+    async def run ():
+        redis = FakeRedis (notify=notify)
+        waiter = ResultWaiter (redis, poll_interval=0.05)
+        await waiter.start ()
+        assert waiter.notifying == notify
+        assert ("K" in redis.flags and "$" in redis.flags) == notify
+
+        """ A stored result is returned at once, a missing one after the timeout. """
+        await redis.set ("a.result", b"{}")
+        assert await waiter.wait ("a", timeout=1) == b"{}"
+        assert await waiter.wait ("b", timeout=0.1) is None
+
+        """ A result stored while waiting is returned when it is stored. """
+        redis.gets = 0
+        loop = asyncio.get_running_loop ()
+        start = loop.time ()
+        stored = asyncio.create_task (store_later (redis, "c.result", b'{"ok": 1}', 0.2))
+        results = await asyncio.gather (waiter.wait ("c", timeout=5), waiter.wait ("c", timeout=5))
+        await stored
+        assert results == [ b'{"ok": 1}', b'{"ok": 1}' ]
+        assert loop.time () - start < 1
+        assert waiter.waiting == {}
+        if notify:
+            """ Each request reads once before waiting and once when woken. """
+            assert redis.gets == 4
+        await waiter.stop ()
+    asyncio.run (run ())
+
+class FakeResponse:
+    def __init__(self, status_code: int, value: object) -> None:
+        self.status_code = status_code
+        self.value = value
+
+    def json (self):
+        return self.value
+
+def test_client_falls_back_to_polling (monkeypatch) -> None:
+    requests = []
+    def get (url, params=None, timeout=None):
+        requests.append (url.rsplit ("/", 1)[-1])
+        if url.endswith ("/wait"):
+            return FakeResponse (404, { "detail" : "Not Found" })
+        return FakeResponse (200, { "ok" : 1 } if len(requests) > 2 else None)
+    client = MidoriClient ()
+    monkeypatch.setattr (client.session, "get", get)
+    monkeypatch.setattr ("midori.client.time.sleep", lambda seconds: None)
+    assert client.get_result ("job", timeout=10) == { "ok" : 1 }
+    assert requests == [ "wait", "result", "result" ]
+    assert not client.long_poll
+
+def test_client_waits (monkeypatch) -> None:
+    requests = []
+    def get (url, params=None, timeout=None):
+        requests.append (params["timeout"])
+        return FakeResponse (200, { "ok" : 1 } if len(requests) > 1 else None)
+    client = MidoriClient ()
+    monkeypatch.setattr (client.session, "get", get)
+    assert client.get_result ("job", timeout=60) == { "ok" : 1 }
+    assert len(requests) == 2 and requests[0] <= 60
+    assert client.long_poll
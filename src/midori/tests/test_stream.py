@@ -0,0 +1,75 @@
+import io
+import os
+import pytest
+from lark.exceptions import UnexpectedInput
+from midori.cache import CompileCache
+from midori.compiler import Compiler
+from midori.interpreter import Interpreter
+from midori.parser import Parser
+from midori.utils import Resource
+from midori.tests.test_interpreter import Recorder, mock_mininet_modules
+
+def read_example (example: str) -> str:
+    return Resource.read_file (os.path.join (
+        os.path.dirname (__file__), "..", "..", "..", "examples", example))
+
+def make_program (hosts: int) -> str:
+    """ A program with multi-line hosts, several statements on a line, and a
+    remote controller whose host begins a line. """
+    lines = [ "remote_controller c0", '    host "onos" port 6633', "switch s0" ]
+    for i in range(hosts):
+        lines += [ f'host h{i} image "ubuntu"', f'  env {{ "INDEX" : "{i}",', '    "ROLE" : "web" }',
+                   f'  cmd [ "echo {i}" ]', f"link l{i} src h{i} dst s0" ]
+    lines += [ f"intent h0 -> h{hosts - 1}", "up ping h0 h1", "# done", "down" ]
+    return "\n".join (lines) + "\n"
+
+@pytest.mark.parametrize("chunk_lines", [ 1, 7, 1000 ])
+def test_parse_stream_matches_parse (chunk_lines) -> None:
+    for source in [ make_program (40), read_example ("onos-alpha.midori"), read_example ("net.midori") ]:
+        expected = Parser ().parse (source).statements
+        assert list(Parser ().parse_stream (io.StringIO (source), chunk_lines=chunk_lines)) == expected
+
+def test_parse_stream_is_incremental () -> None:
+    read = []
+    class Source (io.StringIO):
+        def __next__ (self):
+            line = super().__next__ ()
+            read.append (line)
+            return line
+    statements = Parser ().parse_stream (Source (make_program (1000)), chunk_lines=1)
+    next(statements)
+    next(statements)
+    """ The controller and switch are yielded after reading the first host's line. """
+    assert len(read) == 4
+
+def test_parse_stream_reports_program_lines () -> None:
+    source = make_program (20).replace ('link l15 src', 'link l15 source')
+    with pytest.raises (UnexpectedInput) as error:
+        list(Parser ().parse_stream (io.StringIO (source), chunk_lines=1))
+    assert error.value.line == 3 + 15 * 5 + 5
+
+def test_process_stream_matches_process () -> None:
+    source = make_program (30)
+    compiler = Compiler (cache=CompileCache (size=1, path=None))
+    output = io.StringIO ()
+    compiler.process_stream (io.StringIO (source), output)
+    assert output.getvalue () == compiler.process (source)
+
+def test_run_stream (mock_mininet_modules) -> None:
+    source = make_program (10)
+    whole = Recorder ()
+    Interpreter (whole, batch_containers=False).run (Parser ().parse (source))
+    streamed = Recorder ()
+    Interpreter (streamed, batch_containers=False).run_stream (Parser ().parse_stream (io.StringIO (source)))
+    assert streamed.calls == whole.calls
+
+    """ Consecutive hosts are created together. """
+    source = "".join ([ f'host h{i} image "ubuntu"\n' for i in range(10) ]) + "switch s0 up\n"
+    batched = Recorder ()
+    Interpreter (batched, batch_containers=True, stream_batch_size=4).run_stream (
+        Parser ().parse_stream (io.StringIO (source)))
+    added = [ call for call in batched.calls if call[0] == "add_containers" ]
+    assert added == [ ("add_containers", [ "h0", "h1", "h2", "h3" ]),
+                      ("add_containers", [ "h4", "h5", "h6", "h7" ]),
+                      ("add_containers", [ "h8", "h9" ]) ]
+    assert batched.calls[-5:] == [ ("add_switch", "s0"), ("flush_intents",), ("commit",), ("start",), ("flush_intents",) ]
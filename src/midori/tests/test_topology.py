@@ -0,0 +1,113 @@
+import os
+import pytest
+from midori.cache import CompileCache
+from midori.compiler import Compiler
+from midori.interpreter import Interpreter
+from midori.runtime import ContainernetFactory, Context, MACBlock
+from midori.topology import Topology, diff_topology, parse_delay
+from midori.utils import Resource
+
+def compile_example (example: str):
+    source = Resource.read_file (os.path.join (
+        os.path.dirname (__file__), "..", "..", "..", "examples", example))
+    return Compiler (cache=CompileCache (size=1, path=None)).compile (source, emit=False).ast
+
+def make_topology () -> Topology:
+    """ Two paths from h1 to h2: s1-s2-s3 is short and slow, s1-s4-s5-s3 is long and fast. """
+    topology = Topology ()
+    for host in [ "h1", "h2", "h3" ]:
+        topology.add_host (host)
+    for switch in [ "s1", "s2", "s3", "s4", "s5" ]:
+        topology.add_switch (switch)
+    topology.add_link ("h1", "s1", { "delay" : "1ms" })
+    topology.add_link ("s1", "s2", { "delay" : "50ms", "bw" : 1 })
+    topology.add_link ("s3", "s2", { "delay" : "50ms", "bw" : 1 })
+    topology.add_link ("s1", "s4", { "delay" : "2ms", "bw" : 100 })
+    topology.add_link ("s4", "s5", { "delay" : "2ms", "bw" : 100 })
+    topology.add_link ("s5", "s3", { "delay" : "2ms", "bw" : 100 })
+    topology.add_link ("h2", "s3", { "delay" : "1ms" })
+    return topology
+
+def test_shortest_paths () -> None:
+    topology = make_topology ()
+    assert topology.shortest_path ("h1", "h2") == [ "h1", "s1", "s2", "s3", "h2" ]
+    assert topology.shortest_path ("h1", "h2", weight="delay") == [ "h1", "s1", "s4", "s5", "s3", "h2" ]
+    assert topology.shortest_path ("h1", "h2", weight="bw") == [ "h1", "s1", "s4", "s5", "s3", "h2" ]
+    assert topology.get_path_switches ("h2", "h1") == [ "s3", "s2", "s1" ]
+    assert topology.get_hosts_behind_switch ("s3") == [ "h2" ]
+    assert topology.shortest_path ("h1", "h3") is None
+    assert not topology.is_connected ("h1", "h3")
+
+    topology.remove_node ("s2")
+    assert topology.shortest_path ("h1", "h2") == [ "h1", "s1", "s4", "s5", "s3", "h2" ]
+
+def test_diff_topology () -> None:
+    old, new = make_topology (), make_topology ()
+    assert not diff_topology (old, new)
+
+    new.add_host ("h1", { "ip" : "10.0.0.9" })
+    new.remove_node ("s5")
+    new.add_switch ("s6")
+    new.add_link ("s4", "s6", { "delay" : "1ms" })
+    new.add_link ("s6", "s3", { "delay" : "1ms" })
+    new.add_link ("s1", "s2", { "delay" : "50ms" })
+    new.add_intent ("h2", "h3")
+    diff = diff_topology (old, new)
+    assert (diff.remove_hosts, diff.add_hosts) == ([ "h1" ], [ "h1" ])
+    assert (diff.remove_switches, diff.add_switches) == ([ "s5" ], [ "s6" ])
+    """ Links of the replaced host are replaced with it. """
+    assert diff.remove_links == [ ("h1", "s1"), ("s1", "s2"), ("s4", "s5"), ("s5", "s3") ]
+    assert diff.add_links == [ ("h1", "s1"), ("s1", "s2"), ("s4", "s6"), ("s6", "s3") ]
+    assert (diff.remove_intents, diff.add_intents) == ([], [ ("h2", "h3") ])
+
+def test_parse_delay () -> None:
+    assert parse_delay ("100ms") == 100
+    assert parse_delay ("1.5s") == 1500
+    assert parse_delay ("250us") == 0.25
+    assert parse_delay ("7") == 7
+    assert parse_delay (None) == 0
+    with pytest.raises (ValueError):
+        parse_delay ("fast")
+
+class FakeNode:
+    def __init__(self, name):
+        self.name = name
+    def cmd(self, command):
+        pass
+
+class FakeNet:
+    def addDocker(self, name, **kwargs):
+        return FakeNode(name)
+    def addSwitch(self, name):
+        return FakeNode(name)
+    def addLink(self, *args, **kwargs):
+        pass
+    def start(self):
+        pass
+    def ping(self, nodes):
+        pass
+    def stop(self):
+        pass
+
+class FakeFactory(ContainernetFactory):
+    def get_containernet(self):
+        return FakeNet ()
+    def create_docker(self, name, **params):
+        return FakeNode(name)
+
+class FakeController:
+    def create_host_intents(self, intents):
+        pass
+
+def test_context_topology_matches_program () -> None:
+    program = compile_example ("onos-alpha.midori")
+    context = Context (controller=FakeController (), container_concurrency=2, batch_intents=True,
+                       persist_graph=False, incremental_graph=True, mac_block=MACBlock (0), factory=FakeFactory ())
+    Interpreter (context).run (program)
+
+    expected = Topology.from_program (program)
+    assert context.topology.hosts == expected.hosts
+    assert context.topology.switches == expected.switches
+    assert context.topology.links == expected.links
+    assert context.topology.intents == expected.intents
+    assert context.shortest_path ("blog", "db") == [ "blog", "s2", "s1", "db" ]
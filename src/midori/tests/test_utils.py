@@ -0,0 +1,18 @@
+import os
+from midori.utils import Resource
+
+def test_template_is_reused () -> None:
+    first = Resource.get_template ("network.jinja2")
+    second = Resource.get_template ("network.jinja2")
+    assert first is second
+
+def test_template_reloads_when_modified () -> None:
+    first = Resource.get_template ("network.jinja2")
+    path = first.filename
+    stat = os.stat (path)
+    try:
+        os.utime (path, (stat.st_atime, stat.st_mtime + 10))
+        second = Resource.get_template ("network.jinja2")
+        assert first is not second
+    finally:
+        os.utime (path, (stat.st_atime, stat.st_mtime))
@@ -0,0 +1,308 @@
+import heapq
+import json
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from midori.parser import Program, Host, Switch, Link, Intent
+from midori.utils import LoggingUtil
+from typing import Dict, List, Optional, Tuple
+
+LoggingUtil.setup_logging ()
+
+logger = logging.getLogger (__name__)
+
+def get_container(statement: Host) -> Dict:
+    """ Get the arguments to Context.add_container for a host statement.
+
+    Args:
+        statement (Host): A host from the abstract syntax tree.
+
+    Returns:
+        Dict: Container name, addresses, image, environment, ports, and commands.
+    """
+    return {
+        "name"          : statement.name,
+        "ip"            : statement.ip_addr,
+        "image"         : statement.image,
+        "mac"           : statement.mac,
+        "env"           : { json.loads(k) : str(v) for k, v in statement.env },
+        "ports"         : list(statement.ports),
+        "port_bindings" : dict(statement.port_bindings),
+        "cmd"           : statement.cmd,
+        "generated_mac" : statement.generated_mac
+    }
+
+def get_host_properties(name: str,
+                        ip: str,
+                        image: str,
+                        mac: str,
+                        env: Dict[str, str] = {},
+                        ports: List[int] = [],
+                        port_bindings: Dict[int, int] = {},
+                        cmd: List[str] = [],
+                        generated_mac: bool = False) -> Dict:
+    """ Get the properties recorded for a host, given its container arguments.
+    Whether its MAC address was allocated is not recorded. """
+    return {
+        "name"          : name,
+        "ip"            : ip,
+        "image"         : image,
+        "mac"           : mac,
+        "ports"         : ports,
+        "port_bindings" : [ f"{k}:{v}" for k, v in port_bindings.items() ],
+        "env"           : [ f"{k}:{v}" for k, v in env.items() ],
+        "cmd"           : cmd
+    }
+
+def get_link_properties(port1: int = None,
+                        port2: int = None,
+                        cls: object = None,
+                        delay: str = None,
+                        bw: int = None) -> Dict:
+    """ Get the properties recorded for a link. A link class is recorded by name. """
+    return {
+        "port1" : port1,
+        "port2" : port2,
+        "cls"   : cls.__name__ if isinstance(cls, type) else cls,
+        "delay" : delay,
+        "bw"    : bw
+    }
+
+DELAY_UNITS = { "s" : 1000.0, "ms" : 1.0, "us" : 0.001 }
+""" Milliseconds per unit of a tc style delay like 100ms. """
+
+def parse_delay(delay: str) -> float:
+    """ Convert a link delay like "100ms" or "1s" to milliseconds. A bare number is milliseconds.
+
+    Args:
+        delay (str): The delay.
+
+    Returns:
+        float: Milliseconds. Zero if the link has no delay.
+    """
+    if not delay:
+        return 0.0
+    match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*(s|ms|us)?\s*", str(delay))
+    if not match:
+        raise ValueError(f"Unrecognized link delay: {delay}")
+    return float(match.group(1)) * DELAY_UNITS[match.group(2) or "ms"]
+
+class Topology:
+    """ An in-memory model of a simulated network's hosts, switches, links, and intents.
+
+    Links are indexed in both directions, so paths and neighbors are found without
+    a round trip to the graph database. """
+    def __init__(self) -> None:
+        self.hosts: Dict[str, Dict] = {}
+        """ Host properties by host name. """
+        self.switches: Dict[str, Dict] = {}
+        """ Switch properties by switch name. """
+        self.links: Dict[Tuple[str, str], Dict] = {}
+        """ Link properties by source and destination name. """
+        self.intents: Dict[Tuple[str, str], Dict] = {}
+        """ Intent properties by source and destination host name. """
+        self.adjacency: Dict[str, Dict[str, Dict]] = {}
+        """ For each node, its neighbors and the properties of the link to each. """
+
+    @classmethod
+    def from_program(cls, program: Program) -> "Topology":
+        """ Build the topology a program declares.
+
+        Args:
+            program (Program): The program's abstract syntax tree.
+
+        Returns:
+            Topology: The program's hosts, switches, links, and intents.
+        """
+        topology = cls ()
+        for statement in program.statements:
+            if isinstance(statement, Host):
+                topology.add_host(statement.name,
+                                  get_host_properties(**get_container(statement)))
+            elif isinstance(statement, Switch):
+                for name in statement.name:
+                    topology.add_switch(name)
+            elif isinstance(statement, Link):
+                topology.add_link(statement.src, statement.dst, get_link_properties(
+                    port1=statement.port1 if statement.port1 else None,
+                    port2=statement.port2 if statement.port2 else None,
+                    cls=statement.cls if statement.cls else None,
+                    delay=statement.delay if statement.delay else None,
+                    bw=int(statement.bw) if statement.bw else None))
+            elif isinstance(statement, Intent):
+                for src, dst in zip(statement.name, statement.name[1:]):
+                    topology.add_intent(src, dst)
+        return topology
+
+    def add_host(self, name: str, properties: Dict = {}) -> None:
+        """ Add or replace a host. """
+        self.hosts[name] = { "name" : name, **properties }
+        self.adjacency.setdefault(name, {})
+
+    def add_switch(self, name: str, properties: Dict = {}) -> None:
+        """ Add or replace a switch. """
+        self.switches[name] = { "name" : name, **properties }
+        self.adjacency.setdefault(name, {})
+
+    def add_link(self, src: str, dst: str, properties: Dict = {}) -> None:
+        """ Add or replace the link between two hosts or switches. """
+        self.links[(src, dst)] = properties
+        self.adjacency.setdefault(src, {})[dst] = properties
+        self.adjacency.setdefault(dst, {})[src] = properties
+
+    def add_intent(self, src: str, dst: str) -> None:
+        """ Add a host to host intent. """
+        name = f"{src}_to_{dst}"
+        self.intents[(src, dst)] = { "name" : name }
+
+    def remove_link(self, src: str, dst: str) -> None:
+        """ Remove the link between two nodes, if there is one. """
+        self.links.pop((src, dst), None)
+        self.adjacency.get(src, {}).pop(dst, None)
+        self.adjacency.get(dst, {}).pop(src, None)
+
+    def remove_node(self, name: str) -> None:
+        """ Remove a host or switch along with its links and intents. """
+        for neighbor in list(self.adjacency.get(name, {})):
+            self.remove_link(name, neighbor)
+            self.remove_link(neighbor, name)
+        self.adjacency.pop(name, None)
+        self.hosts.pop(name, None)
+        self.switches.pop(name, None)
+        for key in [ key for key in self.intents if name in key ]:
+            self.remove_intent(*key)
+
+    def remove_intent(self, src: str, dst: str) -> None:
+        """ Remove a host to host intent, if there is one. """
+        self.intents.pop((src, dst), None)
+
+    def neighbors(self, name: str) -> List[str]:
+        """ Get the names of the nodes linked to a node. """
+        return list(self.adjacency.get(name, {}))
+
+    def get_hosts_behind_switch(self, switch: str) -> List[str]:
+        """ Get the hosts linked directly to a switch. """
+        return [ name for name in self.neighbors(switch) if name in self.hosts ]
+
+    def _get_cost(self, link: Dict, weight: str) -> float:
+        if weight == "delay":
+            return parse_delay(link.get("delay"))
+        if weight == "bw":
+            """ Prefer wide links. A link without a limit costs nothing. """
+            return 1.0 / link["bw"] if link.get("bw") else 0.0
+        raise ValueError(f"Unknown path weight: {weight}")
+
+    def shortest_path(self, src: str, dst: str, weight: str = None) -> Optional[List[str]]:
+        """ Find a shortest path between two nodes.
+
+        Args:
+            src (str): Name of the first node.
+            dst (str): Name of the last node.
+            weight (str): None for the fewest hops, "delay" for the least total link
+            delay, or "bw" to prefer high bandwidth links. Ties go to fewer hops.
+
+        Returns:
+            List[str]: Node names from src to dst, or None if they are not connected.
+        """
+        if src not in self.adjacency or dst not in self.adjacency:
+            return None
+        if weight:
+            return self._dijkstra(src, dst, weight)
+        previous = { src : None }
+        queue = deque([ src ])
+        while queue:
+            name = queue.popleft()
+            if name == dst:
+                return self._get_path(previous, dst)
+            for neighbor in self.adjacency[name]:
+                if neighbor not in previous:
+                    previous[neighbor] = name
+                    queue.append(neighbor)
+        return None
+
+    def _dijkstra(self, src: str, dst: str, weight: str) -> Optional[List[str]]:
+        best = { src : (0.0, 0) }
+        previous = { src : None }
+        heap = [ (0.0, 0, src) ]
+        while heap:
+            cost, hops, name = heapq.heappop(heap)
+            if name == dst:
+                return self._get_path(previous, dst)
+            if (cost, hops) > best[name]:
+                continue
+            for neighbor, link in self.adjacency[name].items():
+                candidate = (cost + self._get_cost(link, weight), hops + 1)
+                if neighbor not in best or candidate < best[neighbor]:
+                    best[neighbor] = candidate
+                    previous[neighbor] = name
+                    heapq.heappush(heap, (*candidate, neighbor))
+        return None
+
+    def _get_path(self, previous: Dict[str, str], dst: str) -> List[str]:
+        path = []
+        name = dst
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1]
+
+    def get_path_switches(self, src: str, dst: str) -> List[str]:
+        """ Get the switches on a shortest path between two hosts, as an intent between them would traverse. """
+        path = self.shortest_path(src, dst)
+        return [ name for name in path if name in self.switches ] if path else []
+
+    def is_connected(self, src: str, dst: str) -> bool:
+        """ Determine whether any path joins two nodes. """
+        return self.shortest_path(src, dst) is not None
+
+@dataclass
+class TopologyDiff:
+    """ The changes that turn one topology into another. A host, switch, link, or
+    intent that changed is removed and added again. """
+    add_hosts: List[str] = field(default_factory=list)
+    remove_hosts: List[str] = field(default_factory=list)
+    add_switches: List[str] = field(default_factory=list)
+    remove_switches: List[str] = field(default_factory=list)
+    add_links: List[Tuple[str, str]] = field(default_factory=list)
+    remove_links: List[Tuple[str, str]] = field(default_factory=list)
+    add_intents: List[Tuple[str, str]] = field(default_factory=list)
+    remove_intents: List[Tuple[str, str]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return any([ self.add_hosts, self.remove_hosts, self.add_switches, self.remove_switches,
+                     self.add_links, self.remove_links, self.add_intents, self.remove_intents ])
+
+    def __str__(self) -> str:
+        return f"hosts +{len(self.add_hosts)} -{len(self.remove_hosts)}, " + \
+            f"switches +{len(self.add_switches)} -{len(self.remove_switches)}, " + \
+            f"links +{len(self.add_links)} -{len(self.remove_links)}, " + \
+            f"intents +{len(self.add_intents)} -{len(self.remove_intents)}"
+
+def _diff_items(old: Dict, new: Dict, replaced: set = set()) -> Tuple[List, List]:
+    """ Get the keys to remove from old and add from new. An item changes if its
+    properties differ or, for links and intents, if one of its nodes is replaced. """
+    def changed(key) -> bool:
+        return old[key] != new[key] or \
+            (isinstance(key, tuple) and any(name in replaced for name in key))
+    remove = [ key for key in old if key not in new or changed(key) ]
+    add = [ key for key in new if key not in old or changed(key) ]
+    return add, remove
+
+def diff_topology(old: Topology, new: Topology) -> TopologyDiff:
+    """ Compute the changes that turn a running network into a new one.
+
+    Args:
+        old (Topology): The running network.
+        new (Topology): The network it should become.
+
+    Returns:
+        TopologyDiff: Nodes, links, and intents to remove and add.
+    """
+    diff = TopologyDiff ()
+    diff.add_hosts, diff.remove_hosts = _diff_items(old.hosts, new.hosts)
+    diff.add_switches, diff.remove_switches = _diff_items(old.switches, new.switches)
+    replaced = set(diff.remove_hosts) | set(diff.remove_switches)
+    diff.add_links, diff.remove_links = _diff_items(old.links, new.links, replaced)
+    diff.add_intents, diff.remove_intents = _diff_items(old.intents, new.intents, replaced)
+    return diff
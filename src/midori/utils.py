@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import json
 import logging
 import logging.config
@@ -7,8 +8,9 @@ import string
 import sys
 import traceback
 import yaml
-from jinja2 import Template, Environment
-from types import ModuleType
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template
+from types import CodeType, ModuleType
+from typing import Iterator, Union
 
 logger = logging.getLogger (__name__)
 
@@ -25,11 +27,13 @@ class Code:
     """ Tools for working programmatically with source code. """
     
     @staticmethod
-    def importCode(code: str, name: str="tmp", add_to_sys_modules: bool=False) -> ModuleType:
-        """ Import a module given its source code as a string and the name of the module.
+    def importCode(code: Union[str, CodeType], name: str="tmp", add_to_sys_modules: bool=False) -> ModuleType:
+        """ Import a module given its source code, or its compiled code object, and the name of the module.
+
+        Passing a code object skips compiling the source again.
 
         Args:
-           code (str): The Python source code of the module. 
+           code (Union[str, CodeType]): The Python source code of the module, or a code object compiled from it.
            name (str): The name of the module.
            add_to_sys_modules (bool): Add this module to system modules, making it visible for import by others.
         
@@ -102,17 +106,92 @@ class Resource:
             result = yaml.dump (obj, stream)
         return result
 
+    _template_env: Environment = None
+    """ Shared Jinja2 environment. Compiled templates are cached here across renders. """
+
+    @staticmethod
+    def get_template_env () -> Environment:
+        """ Get the environment used to load and compile templates.
+
+        Templates are loaded from the package directory. The environment keeps
+        compiled templates in memory and their bytecode on disk. With auto_reload,
+        a template is recompiled when its modification time changes.
+
+        Returns:
+            Environment: The shared Jinja2 environment.
+        """
+        if not Resource._template_env:
+            jinja_env = Environment(
+                loader=FileSystemLoader (os.path.dirname (__file__)),
+                bytecode_cache=FileSystemBytecodeCache (),
+                extensions=['jinja2.ext.do'],
+                auto_reload=True)
+            jinja_env.globals['now'] = datetime.datetime.utcnow
+            Resource._template_env = jinja_env
+        return Resource._template_env
+
+    @staticmethod
+    def get_template (template_path: str) -> Template:
+        """ Get a compiled template, loading it only if it is new or has changed.
+
+        Args:
+            template_path (str): Path to the template relative to the package.
+
+        Returns:
+            Template: A compiled template.
+        """
+        return Resource.get_template_env().get_template (template_path)
+
+    _template_versions: dict = {}
+    """ Template content hashes keyed by template path. """
+
+    @staticmethod
+    def get_template_version (template_path: str) -> str:
+        """ Get a hash of a template's text. The hash is recomputed only when the
+        template is reloaded.
+
+        Args:
+            template_path (str): Path to the template relative to the package.
+
+        Returns:
+            str: A hex digest identifying the template's current text.
+        """
+        template = Resource.get_template (template_path)
+        known_template, version = Resource._template_versions.get (template_path, (None, None))
+        if known_template is not template:
+            version = hashlib.sha256 (
+                Resource.read_file (template.filename).encode ()).hexdigest ()
+            Resource._template_versions[template_path] = (template, version)
+        return version
+
     @staticmethod
     def render (template_path: str, context: dict) -> str:
-        template_path = os.path.join (
-            os.path.dirname (__file__),
-            template_path)
-        template_text = Resource.read_file (template_path)
-        jinja_env = Environment(extensions=['jinja2.ext.do'])
-        template = Template (template_text)
-        template.globals['now'] = datetime.datetime.utcnow
+        """ Render a template with a context.
+
+        Args:
+            template_path (str): Path to the template relative to the package.
+            context (dict): Variables to render the template with.
+
+        Returns:
+            str: The rendered text.
+        """
+        template = Resource.get_template (template_path)
         return template.render (**context)
 
+    @staticmethod
+    def generate (template_path: str, context: dict) -> Iterator[str]:
+        """ Render a template a piece at a time, consuming the context's iterables as it goes.
+
+        Args:
+            template_path (str): Path to the template relative to the package.
+            context (dict): Variables to render the template with.
+
+        Returns:
+            Iterator[str]: Consecutive pieces of the rendered text.
+        """
+        template = Resource.get_template (template_path)
+        return template.generate (**context)
+
     @staticmethod
     def render_file (template_path: str,
                      context: dict,